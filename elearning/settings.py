@@ -206,6 +206,17 @@ MESSAGE_TAGS = {
 
 PAGINATION_PAGE_SIZE = 2
 
+# Personal notifications are inserted in batches of NOTIFICATION_BATCH_SIZE rows
+NOTIFICATION_BATCH_SIZE = 500
+
+# Notification tasks failing on a database error are retried with backoff,
+# skipping the notifications already created for the event
+NOTIFICATION_TASK_MAX_RETRIES = 3
+
+# Materials added to a course within MATERIAL_NOTIFICATION_DIGEST_WINDOW seconds
+# of the first one are notified together. 0 notifies each material right away
+MATERIAL_NOTIFICATION_DIGEST_WINDOW = 60
+
 MEDIA_URL = "/media/"
 
 MEDIA_ROOT = BASE_DIR / "media"
@@ -214,6 +225,103 @@ CELERY_BROKER_URL = "redis://localhost:6379/0"
 
 CELERY_RESULT_BACKEND = "redis://localhost:6379/1"
 
+# Shared by the web and Celery processes, so that cached counters stay in sync
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/3",
+    }
+}
+
+# Unread notification counts are cached per user for UNREAD_NOTIFICATION_COUNT_TTL
+# seconds, and the counts changed recently are reconciled with the database
+# every UNREAD_NOTIFICATION_RECONCILE_INTERVAL seconds
+UNREAD_NOTIFICATION_COUNT_TTL = 60 * 60
+
+UNREAD_NOTIFICATION_RECONCILE_INTERVAL = 60 * 10
+
+# Notifications viewed in the list are logged in the cache, and marked as read
+# in bulk every NOTIFICATION_READ_FLUSH_INTERVAL seconds
+NOTIFICATION_READ_FLUSH_INTERVAL = 10
+
+# Notifications are deleted once read for NOTIFICATION_READ_RETENTION_DAYS days,
+# or unread for NOTIFICATION_UNREAD_RETENTION_DAYS days, NOTIFICATION_PURGE_BATCH_SIZE
+# rows at a time. With NOTIFICATION_ARCHIVE_ENABLED, personal notifications are
+# copied to NotificationArchive before being deleted
+NOTIFICATION_READ_RETENTION_DAYS = 90
+
+NOTIFICATION_UNREAD_RETENTION_DAYS = 365
+
+NOTIFICATION_PURGE_BATCH_SIZE = 1000
+
+NOTIFICATION_ARCHIVE_ENABLED = False
+
+CELERY_BEAT_SCHEDULE = {
+    "reconcile-unread-notification-counts": {
+        "task": "userportal.tasks.reconcile_unread_notification_counts",
+        "schedule": UNREAD_NOTIFICATION_RECONCILE_INTERVAL,
+    },
+    "flush-notification-reads": {
+        "task": "userportal.tasks.flush_notification_reads",
+        "schedule": NOTIFICATION_READ_FLUSH_INTERVAL,
+    },
+    "purge-expired-notifications": {
+        "task": "userportal.tasks.purge_expired_notifications",
+        "schedule": 60 * 60 * 24,
+    },
+}
+
+# Number of users suggested by the user autocomplete API
+USER_AUTOCOMPLETE_LIMIT = 10
+
+# Course titles and teacher names are suggested from a per-process index, updated
+# on course changes and built again after COURSE_SUGGESTION_MAX_AGE seconds
+COURSE_SUGGESTION_MAX_AGE = 60 * 10
+COURSE_SUGGESTION_LIMIT = 10
+
+# The academic terms are cached per process, and read again when a term starts
+# or ends, or after ACADEMIC_TERM_CACHE_MAX_AGE seconds for changes made elsewhere
+ACADEMIC_TERM_CACHE_MAX_AGE = 60 * 5
+
+# Live Q&A questions are buffered per room and saved in bulk once either
+# threshold is reached (number of questions / seconds since the oldest one)
+LIVE_QA_BUFFER_MAX_SIZE = 50
+
+LIVE_QA_BUFFER_FLUSH_INTERVAL = 2
+
+# Maximum number of questions sent in a single history frame
+LIVE_QA_HISTORY_PAGE_SIZE = 100
+
+# Recent question history cached per process: rooms kept (least recently
+# used evicted first) and latest questions kept per room
+LIVE_QA_CACHE_MAX_ROOMS = 100
+
+LIVE_QA_CACHE_MAX_QUESTIONS = 500
+
+# Seconds a user's permission to join a live Q&A session is cached
+LIVE_QA_PERMISSION_CACHE_TTL = 60
+
+# Seconds to wait after a Q&A session ends before its questions are archived,
+# so that questions still buffered by other processes are saved first
+LIVE_QA_ARCHIVE_DELAY = 30
+
+# Questions per chunk of a Q&A archive, so that a history page decompresses
+# only the chunks it reads
+LIVE_QA_ARCHIVE_CHUNK_SIZE = 200
+
+# Token bucket rate limits of live Q&A questions: burst size and questions per
+# second, for each connection and for each room across every worker
+LIVE_QA_CONNECTION_RATE_LIMIT_BURST = 5
+
+LIVE_QA_CONNECTION_RATE_LIMIT = 1
+
+LIVE_QA_ROOM_RATE_LIMIT_BURST = 50
+
+LIVE_QA_ROOM_RATE_LIMIT = 20
+
+# Live Q&A participant counts are broadcast at most once per interval (seconds)
+LIVE_QA_PRESENCE_BROADCAST_INTERVAL = 5
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
@@ -4,6 +4,7 @@ from django.contrib.auth.admin import UserAdmin
 from django.forms import ModelForm
 
 from userportal.models import *
+from userportal.repositories import UserRepository
 
 AuthUser = get_user_model()
 
@@ -35,6 +36,12 @@ class PortalUserAdmin(UserAdmin):
         ),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Look up the search tokens of the users instead of scanning the table
+        if not search_term.strip():
+            return queryset, False
+        return UserRepository.filter_by_keywords(queryset, search_term), False
+
 
 class BaseProfileAdminForm(ModelForm):
     INVALID_USER_TYPE_MSG = "Invalid user type for this profile."
@@ -93,5 +100,8 @@ admin.site.register(Enrollment)
 admin.site.register(Feedback)
 admin.site.register(Material)
 admin.site.register(Notification)
+admin.site.register(NotificationArchive)
+admin.site.register(BroadcastNotification)
 admin.site.register(QASession)
 admin.site.register(QAQuestion)
+admin.site.register(QAQuestionArchive)
@@ -9,4 +9,10 @@ urlpatterns = [
     path("users/me/", UserProfileView.as_view(), name="user-profile"),
     # User List
     path("users/", UserListView.as_view(), name="user-list"),
+    # User Autocomplete
+    path(
+        "users/autocomplete/",
+        UserAutocompleteView.as_view(),
+        name="user-autocomplete",
+    ),
 ]
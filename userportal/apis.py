@@ -6,7 +6,7 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.generics import GenericAPIView, ListAPIView
 from rest_framework.mixins import RetrieveModelMixin, UpdateModelMixin
 
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
@@ -14,6 +14,7 @@ from django.contrib.auth import get_user_model
 from userportal.serializers import *
 from userportal.api_examples import *
 from userportal.filters import UserFilter
+from userportal.repositories import UserRepository
 from userportal.api_permissions import IsTeacherGroupOrAdminUser
 
 
@@ -83,3 +84,27 @@ class UserListView(ListAPIView):
     queryset = get_user_model().objects.filter(is_staff=False, is_superuser=False)
     serializer_class = UserSerializer
     filterset_class = UserFilter
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            "q", str, description="Start of the words of the usernames or names"
+        )
+    ]
+)
+class UserAutocompleteView(ListAPIView):
+    """
+    API endpoint that suggests the non-staff and non-superuser users having a
+    word that starts with each word typed. Requires token authentication.
+    Only accessible to teachers and admins.
+    """
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsTeacherGroupOrAdminUser]
+    serializer_class = UserAutocompleteSerializer
+    pagination_class = None
+    filter_backends = []
+
+    def get_queryset(self):
+        return UserRepository.autocomplete(self.request.query_params.get("q", ""))
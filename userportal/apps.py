@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UserportalConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "userportal"
+
+    def ready(self):
+        # Connect the model and Celery signal handlers
+        from userportal import signals, metrics  # noqa: F401
@@ -0,0 +1,237 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Tuple
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from userportal.models import QAQuestion
+from userportal.constants import *
+from userportal.utils import chunked
+
+logger = logging.getLogger(__name__)
+
+
+class QAQuestionBuffer:
+    """
+    Per-process write-behind buffer for live Q&A questions.
+
+    Questions are collected per room and persisted with a single bulk_create
+    once the room holds `max_size` questions or its oldest pending question
+    is older than `flush_interval` seconds.
+    """
+
+    def __init__(self, max_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[QAQuestion]] = defaultdict(list)
+        # Questions taken out of the buffer whose bulk_create has not finished yet
+        self._in_flight: Dict[str, List[QAQuestion]] = defaultdict(list)
+        self._first_buffered_at: Dict[str, float] = {}
+        self._buffered = 0
+        self._flushed = 0
+        self._dropped = 0
+
+    def add(self, question: QAQuestion) -> bool:
+        """Buffer a question. Return True if its room is due for a flush."""
+        room_name = question.room_name
+        with self._lock:
+            self._pending[room_name].append(question)
+            self._first_buffered_at.setdefault(room_name, time.monotonic())
+            self._buffered += 1
+            return self._is_due(room_name)
+
+    def is_due(self, room_name: str) -> bool:
+        """Check if the room has reached the size or time threshold."""
+        with self._lock:
+            return self._is_due(room_name)
+
+    def _is_due(self, room_name: str) -> bool:
+        if not self._pending.get(room_name):
+            return False
+        age = time.monotonic() - self._first_buffered_at[room_name]
+        return len(self._pending[room_name]) >= self.max_size or (
+            age >= self.flush_interval
+        )
+
+    def pending(self, room_name: str) -> List[QAQuestion]:
+        """Get the questions of the room that are not persisted yet, oldest first."""
+        with self._lock:
+            return list(self._in_flight.get(room_name, [])) + list(
+                self._pending.get(room_name, [])
+            )
+
+    def flush(self, room_name: str = None) -> int:
+        """
+        Persist the buffered questions of the given room, or of every room
+        if no room is given. Return the number of questions saved.
+        """
+        with self._lock:
+            room_names = [room_name] if room_name else list(self._pending)
+            batches = {}
+            for name in room_names:
+                questions = self._pending.pop(name, [])
+                self._first_buffered_at.pop(name, None)
+                if questions:
+                    self._in_flight[name].extend(questions)
+                    batches[name] = questions
+
+        saved = 0
+        for name, questions in batches.items():
+            try:
+                QAQuestion.objects.bulk_create(questions)
+                saved += len(questions)
+            except Exception as e:
+                logger.error(
+                    ERR_FAILED_TO_FLUSH_QUESTIONS.format(
+                        count=len(questions), room_name=name, exception=str(e)
+                    ),
+                    exc_info=True,
+                )
+                with self._lock:
+                    self._dropped += len(questions)
+            finally:
+                done = {id(question) for question in questions}
+                with self._lock:
+                    in_flight = [q for q in self._in_flight[name] if id(q) not in done]
+                    if in_flight:
+                        self._in_flight[name] = in_flight
+                    else:
+                        del self._in_flight[name]
+        with self._lock:
+            self._flushed += saved
+        return saved
+
+    def stats(self) -> Dict[str, int]:
+        """Get the buffered, flushed and dropped message counters."""
+        with self._lock:
+            return {
+                "buffered": self._buffered,
+                "flushed": self._flushed,
+                "dropped": self._dropped,
+                "pending": sum(len(q) for q in self._pending.values()),
+            }
+
+
+qa_question_buffer = QAQuestionBuffer(
+    max_size=settings.LIVE_QA_BUFFER_MAX_SIZE,
+    flush_interval=settings.LIVE_QA_BUFFER_FLUSH_INTERVAL,
+)
+
+
+class NotificationReadBuffer:
+    """
+    Read marks of notifications, shared by every process through the cache.
+
+    Each page view appends an entry to a log kept in the cache: a sequence
+    number is taken with cache.incr, and the entry is stored under its own key.
+    The log is drained by a periodic task, which applies the marks in bulk.
+    Entries are kept until drained. Repeated views of the same unread
+    notifications are logged once.
+    """
+
+    # Entries read from the cache at once when draining
+    DRAIN_CHUNK_SIZE = 500
+
+    # Seconds after which a sequence whose entry is still missing is skipped:
+    # its writer failed between taking the sequence and storing the entry
+    STALL_TIMEOUT = 60
+
+    # Seconds after which the lock of a drain that failed to release it expires
+    DRAIN_LOCK_TIMEOUT = 60
+
+    def __init__(self, prefix: str, timeout: float):
+        self.prefix = prefix
+        # Duplicate markers outlive several flushes, then expire
+        self.timeout = timeout
+
+    def add(
+        self, user_id: int, personal_ids: Iterable[int], broadcast_ids: Iterable[int]
+    ) -> bool:
+        """
+        Log the notifications read by the user.
+        Return False if the same notifications were already logged.
+        """
+        entry = (user_id, sorted(personal_ids), sorted(broadcast_ids))
+        digest = hashlib.sha1(json.dumps(entry).encode()).hexdigest()
+        if not cache.add(self._key(f"seen:{digest}"), 1, self.timeout):
+            return False
+        cache.set(self._key(self._next_sequence()), entry, None)
+        return True
+
+    def claim_flush(self, max_age: float) -> bool:
+        """
+        Return True if the log was not drained for `max_age` seconds, and no
+        other caller claimed a flush within that time.
+        """
+        drained_at = cache.get(self._key("drained_at"), 0)
+        if time.time() - drained_at < max_age:
+            return False
+        return cache.add(self._key("flush_claimed"), 1, max_age)
+
+    def drain(self) -> List[Tuple[int, List[int], List[int]]]:
+        """
+        Take the logged entries not drained yet, oldest first. Nothing is taken
+        while another drain runs, so that each entry is taken once.
+        """
+        lock_key = self._key("draining")
+        if not cache.add(lock_key, 1, self.DRAIN_LOCK_TIMEOUT):
+            return []
+        try:
+            return self._drain()
+        finally:
+            cache.delete(lock_key)
+
+    def _drain(self) -> List[Tuple[int, List[int], List[int]]]:
+        now = time.time()
+        cache.set(self._key("drained_at"), now, None)
+        last = cache.get(self._key("sequence"), 0)
+        position = cache.get(self._key("drained"), 0)
+        stalled_sequence, stalled_at = cache.get(self._key("stall"), (None, now))
+        entries = []
+        for sequences in chunked(range(position + 1, last + 1), self.DRAIN_CHUNK_SIZE):
+            keys = [self._key(sequence) for sequence in sequences]
+            found = cache.get_many(keys)
+            drained_keys = []
+            for sequence, key in zip(sequences, keys):
+                if key not in found and (
+                    sequence != stalled_sequence
+                    or now - stalled_at < self.STALL_TIMEOUT
+                ):
+                    # The entry may still be being written: retry it on the
+                    # next drains, and skip it once missing for STALL_TIMEOUT
+                    if sequence != stalled_sequence:
+                        cache.set(self._key("stall"), (sequence, now), None)
+                    break
+                if key in found:
+                    entries.append(found[key])
+                    drained_keys.append(key)
+                position = sequence
+            cache.delete_many(drained_keys)
+            cache.set(self._key("drained"), position, None)
+            if position != sequences[-1]:
+                break
+        return entries
+
+    def _next_sequence(self) -> int:
+        key = self._key("sequence")
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The sequence does not expire, it is only missing at first
+            cache.add(key, 0, None)
+            return cache.incr(key)
+
+    def _key(self, name) -> str:
+        return f"{self.prefix}{name}"
+
+
+notification_read_buffer = NotificationReadBuffer(
+    prefix=NOTIFICATION_READ_BUFFER_PREFIX,
+    timeout=settings.NOTIFICATION_READ_FLUSH_INTERVAL * 10,
+)
@@ -0,0 +1,289 @@
+import bisect
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from userportal.models import AcademicTerm, QAQuestion
+
+
+class _RoomHistory:
+    """Recent questions of a room, oldest first."""
+
+    def __init__(self):
+        self.questions: List[QAQuestion] = []
+        self.timestamps: List[datetime] = []
+        self.keys = set()
+        # False once older questions have been left out of the history
+        self.complete = True
+        # True until the history has been read from the database
+        self.loading = True
+
+    @staticmethod
+    def key(timestamp: str, sender: str, text: str) -> Tuple[str, str, str]:
+        return timestamp, sender, text
+
+    def add(self, question: QAQuestion) -> None:
+        key = self.key(question.timestamp.isoformat(), question.sender, question.text)
+        if key in self.keys:
+            return
+        index = bisect.bisect_right(self.timestamps, question.timestamp)
+        self.questions.insert(index, question)
+        self.timestamps.insert(index, question.timestamp)
+        self.keys.add(key)
+
+    def trim(self, max_questions: int) -> None:
+        while len(self.questions) > max_questions:
+            oldest = self.questions.pop(0)
+            self.timestamps.pop(0)
+            self.keys.discard(
+                self.key(oldest.timestamp.isoformat(), oldest.sender, oldest.text)
+            )
+            self.complete = False
+
+
+class QAQuestionCache:
+    """
+    Per-process cache of the recent question history of live Q&A rooms,
+    shared by every consumer of the process.
+
+    Each room keeps its latest `max_questions` questions. Beyond `max_rooms`
+    rooms, the least recently used room is evicted. A room is only kept up to
+    date by the fan-out while a consumer of this process is subscribed to it,
+    so it is removed once its last local consumer leaves.
+    """
+
+    def __init__(self, max_rooms: int, max_questions: int):
+        self.max_rooms = max_rooms
+        self.max_questions = max_questions
+        self._lock = threading.Lock()
+        self._rooms: OrderedDict[str, _RoomHistory] = OrderedDict()
+        # Number of consumers of this process receiving the fan-out of each room
+        self._subscribers: Dict[str, int] = {}
+
+    def subscribe(self, room_name: str) -> None:
+        """Count a consumer of this process receiving the questions of the room."""
+        with self._lock:
+            self._subscribers[room_name] = self._subscribers.get(room_name, 0) + 1
+
+    def unsubscribe(self, room_name: str) -> None:
+        """
+        Uncount a consumer of the room. Once none is left, the history is no
+        longer kept up to date, so it is removed.
+        """
+        with self._lock:
+            count = self._subscribers.get(room_name, 0) - 1
+            if count > 0:
+                self._subscribers[room_name] = count
+            else:
+                self._subscribers.pop(room_name, None)
+                self._rooms.pop(room_name, None)
+
+    def is_loaded(self, room_name: str) -> bool:
+        """Check if the history of the room has been read into the cache."""
+        with self._lock:
+            history = self._rooms.get(room_name)
+            return history is not None and not history.loading
+
+    def begin_load(self, room_name: str) -> None:
+        """
+        Start caching the room before its history is read from the database,
+        so that questions received in the meantime are not missed.
+        """
+        with self._lock:
+            self._get_or_create(room_name)
+
+    def _get_or_create(self, room_name: str) -> _RoomHistory:
+        history = self._rooms.get(room_name)
+        if history is None:
+            history = self._rooms[room_name] = _RoomHistory()
+        self._rooms.move_to_end(room_name)
+        while len(self._rooms) > self.max_rooms:
+            self._rooms.popitem(last=False)
+        return history
+
+    def load(self, room_name: str, questions: List[QAQuestion], complete: bool) -> None:
+        """
+        Cache the latest questions of the room read from the database.
+        `complete` is False if older questions were left out of `questions`.
+        """
+        with self._lock:
+            history = self._get_or_create(room_name)
+            for question in questions:
+                history.add(question)
+            history.complete = history.complete and complete
+            history.loading = False
+            history.trim(self.max_questions)
+
+    def add_message(
+        self, room_name: str, message: str, sender: str, timestamp: str
+    ) -> None:
+        """
+        Add a question received through the group fan-out to the history of the room.
+        Each consumer of the room receives the same question, so adding it is idempotent.
+        """
+        with self._lock:
+            history = self._rooms.get(room_name)
+            if not history or history.key(timestamp, sender, message) in history.keys:
+                return
+            history.add(
+                QAQuestion(
+                    room_name=room_name,
+                    text=message,
+                    sender=sender,
+                    timestamp=datetime.fromisoformat(timestamp),
+                )
+            )
+            history.trim(self.max_questions)
+
+    def fetch_after(
+        self,
+        room_name: str,
+        cursor: Optional[Tuple[datetime, Optional[int]]],
+        limit: int,
+    ) -> Optional[Tuple[List[QAQuestion], bool]]:
+        """
+        Get a page of the questions posted after the cursor, and whether more
+        questions follow the page. Return None if the cache cannot answer,
+        either because the room is not cached or the cursor is older than
+        the cached history.
+        """
+        with self._lock:
+            history = self._rooms.get(room_name)
+            if history is None or history.loading:
+                return None
+            self._rooms.move_to_end(room_name)
+            if not cursor:
+                if not history.complete:
+                    return None
+                questions = history.questions
+            else:
+                timestamp, pk = cursor
+                if not history.complete and (
+                    not history.timestamps or timestamp < history.timestamps[0]
+                ):
+                    return None
+                start = bisect.bisect_left(history.timestamps, timestamp)
+                end = bisect.bisect_right(history.timestamps, timestamp)
+                # Questions sharing the cursor timestamp are ordered by id
+                questions = [
+                    q
+                    for q in history.questions[start:end]
+                    if pk is not None and q.id is not None and q.id > pk
+                ] + history.questions[end:]
+            return questions[:limit], len(questions) > limit
+
+    def invalidate(self, room_name: str) -> None:
+        """Remove the history of the room from the cache."""
+        with self._lock:
+            self._rooms.pop(room_name, None)
+
+    def clear(self) -> None:
+        """Remove every room and subscriber from the cache."""
+        with self._lock:
+            self._rooms.clear()
+            self._subscribers.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of cached rooms and questions."""
+        with self._lock:
+            return {
+                "rooms": len(self._rooms),
+                "questions": sum(len(h.questions) for h in self._rooms.values()),
+            }
+
+
+qa_question_cache = QAQuestionCache(
+    max_rooms=settings.LIVE_QA_CACHE_MAX_ROOMS,
+    max_questions=settings.LIVE_QA_CACHE_MAX_QUESTIONS,
+)
+
+
+class AcademicTermCalendar:
+    """
+    Per-process calendar of the academic terms.
+
+    Every term is read at once, and the current, next and previous terms are
+    found with bisect. They are kept until the next start or end of a term,
+    the only times they can change. The terms are read again when one is saved
+    or deleted in this process, and after `max_age` seconds at the latest, for
+    the changes made by other processes.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = timedelta(seconds=max_age)
+        self._lock = threading.Lock()
+        self._terms: List[AcademicTerm] = []
+        self._starts: List[datetime] = []
+        self._terms_by_end: List[AcademicTerm] = []
+        self._ends: List[datetime] = []
+        self._loaded_at: Optional[datetime] = None
+        self._expires_at: Optional[datetime] = None
+        # Current, next and previous terms
+        self._resolved: Tuple[Optional[AcademicTerm], ...] = (None, None, None)
+
+    def current(self) -> Optional[AcademicTerm]:
+        """Get the term in progress, the latest started if several are."""
+        return self._resolve()[0]
+
+    def next(self) -> Optional[AcademicTerm]:
+        """Get the first term not started yet."""
+        return self._resolve()[1]
+
+    def previous(self) -> Optional[AcademicTerm]:
+        """Get the last term ended."""
+        return self._resolve()[2]
+
+    def invalidate(self) -> None:
+        """Read the terms again on the next call."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _resolve(self) -> Tuple[Optional[AcademicTerm], ...]:
+        now = timezone.now()
+        with self._lock:
+            if self._loaded_at is None or now - self._loaded_at >= self.max_age:
+                self._load(now)
+            elif now < self._expires_at:
+                return self._resolved
+
+            # Terms started are before `started`, terms ended before `ended`
+            started = bisect.bisect_right(self._starts, now)
+            ended = bisect.bisect_left(self._ends, now)
+            current = next(
+                (
+                    term
+                    for term in reversed(self._terms[:started])
+                    if term.end_datetime >= now
+                ),
+                None,
+            )
+            self._resolved = (
+                current,
+                self._terms[started] if started < len(self._terms) else None,
+                self._terms_by_end[ended - 1] if ended else None,
+            )
+            # The terms change when the next term starts, or when the next term
+            # to end is over
+            boundaries = [self._loaded_at + self.max_age]
+            if started < len(self._starts):
+                boundaries.append(self._starts[started])
+            if ended < len(self._ends):
+                boundaries.append(self._ends[ended] + timedelta(microseconds=1))
+            self._expires_at = min(boundaries)
+            return self._resolved
+
+    def _load(self, now: datetime) -> None:
+        self._terms = list(AcademicTerm.objects.order_by("start_datetime", "id"))
+        self._starts = [term.start_datetime for term in self._terms]
+        self._terms_by_end = sorted(self._terms, key=lambda term: term.end_datetime)
+        self._ends = [term.end_datetime for term in self._terms_by_end]
+        self._loaded_at = now
+
+
+academic_term_calendar = AcademicTermCalendar(
+    max_age=settings.ACADEMIC_TERM_CACHE_MAX_AGE,
+)
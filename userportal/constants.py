@@ -50,12 +50,28 @@ ERR_ONLY_AUTHORIZED_CAN_MANAGE_QA_SESSIONS = _(
 )
 ERR_INVALID_JSON = _("Invalid JSON received")
 ERR_FAILED_TO_SEND_NOTIFICATION = _(
-    "Failed to send notifications to users. Error: {exception}."
+    "Failed to send notification batch {batch} of {count} users. Error: {exception}."
 )
 ERR_FAILED_TO_END_SESSION = _("Failed to end the QA session. Error: {exception}.")
 ERR_UPDATE_USER_ACTIVE_STATUS_FAIL = _(
     "Failed to update the active status of user {username}."
 )
+ERR_FAILED_TO_FLUSH_QUESTIONS = _(
+    "Failed to save {count} buffered questions for room {room_name}. Error: {exception}."
+)
+ERR_RATE_LIMITER_UNAVAILABLE = _(
+    "Rate limiter is unavailable, message let through. Error: {exception}."
+)
+ERR_PRESENCE_UNAVAILABLE = _("Presence counts are unavailable. Error: {exception}.")
+ERR_TASK_METRICS_UNAVAILABLE = _(
+    "Task metrics could not be recorded. Error: {exception}."
+)
+ERR_FAILED_TO_PUBLISH_NOTIFICATION = _(
+    "Failed to push notifications to {count} groups. Error: {exception}."
+)
+ERR_COURSE_SEARCH_FAILED = _(
+    "Course search index is unavailable, falling back to a plain lookup. Error: {exception}."
+)
 
 # Warning messages
 ALREADY_ENROLLED_MSG = _("You are already enrolled in this course.")
@@ -68,6 +84,21 @@ ACTIVE_QA_SESSION_EXISTS = _(
 USER_ALREADY_CHANGED_MSG = _("User {username} is already {action}.")
 QA_SESSION_EMPTY_MSG = _("Empty message received and ignored")
 QA_SESSION_ENDED_MSG = _("Message received after session end and ignored")
+QA_SESSION_RATE_LIMITED_MSG = _("Message received over the rate limit and dropped")
+NOTIFICATION_BATCH_SENT_MSG = _(
+    "Sent notification batch {batch} of {count} users, {total} sent so far"
+)
+UNREAD_NOTIFICATION_COUNTS_RECONCILED_MSG = _(
+    "Corrected {count} cached unread notification counts"
+)
+NOTIFICATION_EVENT_ALREADY_SENT_MSG = _(
+    "Notifications of event {event_key} were already sent"
+)
+EXPIRED_NOTIFICATIONS_PURGED_MSG = _("Purged {count} expired notifications")
+NOTIFICATION_READS_FLUSHED_MSG = _(
+    "Applied {entries} logged notification reads ({personal} personal, {broadcast} broadcast)"
+)
+QA_QUESTIONS_ARCHIVED_MSG = _("Archived {count} questions of room {room_name}")
 SIGNUP_REQUIRED_FOR_ENROLLMENT_MESSAGE = _("Please sign up to enroll in this course.")
 
 # Success messages
@@ -89,6 +120,9 @@ QA_SESSION_END_SUCCESS_MSG = _("QA session ended successfully.")
 MATERIAL_CREATED_NOTIFICATION_MSG = _(
     "A new material {material_title} has been added to the course {course_title}."
 )
+MATERIAL_DIGEST_NOTIFICATION_MSG = _(
+    "{count} new materials have been added to the course {course_title}."
+)
 MATERIAL_CREATED_NOTIFICATION_LINK_TEXT = _("View material")
 STUDENT_ENROLLED_NOTIFICATION_MSG = _(
     "Student {username} has enrolled in your upcoming course {course_title}."
@@ -98,16 +132,45 @@ LIVE_QA_START_NOTIFICATION_MSG = _(
     "A live Q&A session has started for the course {course_title}."
 )
 LIVE_QA_START_NOTIFICATION_LINK_TEXT = _("Join the session")
+NOTIFICATION_KIND_PERSONAL = "personal"
+NOTIFICATION_KIND_BROADCAST = "broadcast"
+UNREAD_NOTIFICATION_COUNT_CACHE_KEY = "unread_notifications:{user_id}"
+LIVE_QA_START_EVENT_KEY = "live_qa_start:{room_name}"
+MATERIAL_CREATED_EVENT_KEY = "material_created:{material_id}"
+MATERIAL_DIGEST_CACHE_KEY = "material_digest:{course_id}"
+STUDENT_ENROLLED_EVENT_KEY = "student_enrolled:{enrollment_id}"
+NOTIFICATION_READ_BUFFER_PREFIX = "notification_reads:"
+NOTIFICATION_USER_GROUP = "notifications_user_{user_id}"
+NOTIFICATION_OFFERING_GROUP = "notifications_offering_{offering_id}"
+MESSAGE_TYPE_NOTIFICATION = "notification.message"
+MESSAGE_TYPE_NOTIFICATION_COUNT = "notification.count"
+
+# Constants for course search
+COURSE_SEARCH_TABLE = "userportal_coursesearch"
+
+# Constants for task metrics
+TASK_METRICS_PREFIX = "task_metrics:"
+TASK_ENQUEUED_AT_HEADER = "enqueued_at"
 
 # Constants for live Q&A session
 LIVE_QA_PREFIX = "liveqa_"
 MESSAGE_TYPE_CLOSE = "close.connection"
+MESSAGE_TYPE_QUESTIONS_DELETED = "questions.deleted"
 MESSAGE_TYPE_QUESTION = "question.message"
 MESSAGE_TYPE_QUESTION_LIST = "question.list"
+MESSAGE_TYPE_RATE_LIMITED = "error.rate_limited"
+MESSAGE_TYPE_PRESENCE = "presence.update"
 LIVE_QA_END_SESSION_MSG = _(
     "This Q&A session has concluded. Thank you for participating! Messages can no longer be sent."
 )
 UNAUTHORIZED_ACCESS_MSG = _("Unauthorized access to the live Q&A session.")
+LIVE_QA_RATE_LIMITED_MSG = _(
+    "You are sending questions too quickly. Please wait a moment and try again."
+)
+
+LIVE_QA_PERMISSION_CACHE_KEY = "live_qa_permission:{user_id}:{course_id}"
+LIVE_QA_RATE_LIMIT_PREFIX = "liveqa_ratelimit:"
+LIVE_QA_PRESENCE_PREFIX = "liveqa_presence:"
 
 SESSION_TERMINATE_CODE = 4000
 UNAUTHORIZED_ACCESS_CODE = 4001
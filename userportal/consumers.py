@@ -1,8 +1,11 @@
 import json
+import asyncio
 import datetime
 import logging
-from typing import Dict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
 
+from django.conf import settings
 from django.utils import timezone
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
@@ -10,6 +13,16 @@ from channels.db import database_sync_to_async
 from userportal.models import *
 from userportal.constants import *
 from userportal.permissions import *
+from userportal.repositories import (
+    AcademicTermRepository,
+    NotificationRepository,
+    QAQuestionRepository,
+)
+from userportal.buffers import qa_question_buffer
+from userportal.caches import qa_question_cache
+from userportal.ratelimits import TokenBucket, room_rate_limiter
+from userportal.presence import room_presence
+from userportal.utils import encode_cursor, decode_cursor, build_question_event
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +33,14 @@ class QASessionConsumer(AsyncWebsocketConsumer):
         self.room_name = self.scope["url_route"]["kwargs"]["room_name"]
         self.course_id = self.scope["url_route"]["kwargs"]["course_id"]
         self.room_group_name = f"{LIVE_QA_PREFIX}_{self.room_name}"
+        self.flush_task = None
+        self.is_session_ended = True
+        self.is_present = False
+        self.is_subscribed = False
+        self.rate_limit = TokenBucket(
+            settings.LIVE_QA_CONNECTION_RATE_LIMIT_BURST,
+            settings.LIVE_QA_CONNECTION_RATE_LIMIT,
+        )
         # Join room group
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
@@ -30,33 +51,44 @@ class QASessionConsumer(AsyncWebsocketConsumer):
             await self.close(code=UNAUTHORIZED_ACCESS_CODE)
             return
 
-        if await self.is_qa_session_ended():
+        # The session state is kept for the lifetime of the connection,
+        # and updated when the close.connection event is received
+        self.is_session_ended = await self.is_qa_session_ended()
+        if self.is_session_ended:
             logger.info(QA_SESSION_ENDED_MSG)
             await self.close(code=SESSION_TERMINATE_CODE)
             return
 
-        # Send existing questions to the user
-        questions = await self.get_group_questions()
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "type": MESSAGE_TYPE_QUESTION_LIST,
-                    "questions": [
-                        {
-                            "message": question.text,
-                            "sender": question.sender,
-                            "timestamp": question.timestamp.isoformat(),
-                        }
-                        for question in questions
-                    ],
-                }
-            )
+        # Count the user as a participant, the count is broadcast later
+        self.is_present = True
+        await room_presence.join(
+            self.channel_layer, self.room_name, self.room_group_name
         )
 
+        # Keep the cached history of the room while this consumer receives its fan-out
+        self.is_subscribed = True
+        qa_question_cache.subscribe(self.room_name)
+
+        # Send the questions the user has not seen yet
+        await self.send_question_history(self.get_cursor())
+
     async def disconnect(self, close_code):
         """Disconnection event handler provided by AsyncWebsocketConsumer."""
         # Leave room group
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        if self.is_subscribed:
+            self.is_subscribed = False
+            qa_question_cache.unsubscribe(self.room_name)
+        if self.is_present:
+            self.is_present = False
+            await room_presence.leave(
+                self.channel_layer, self.room_name, self.room_group_name
+            )
+        # Save the questions still waiting in the buffer
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await self.flush_messages()
 
     async def receive(self, text_data):
         """Message receive handler provided by AsyncWebsocketConsumer."""
@@ -70,76 +102,197 @@ class QASessionConsumer(AsyncWebsocketConsumer):
                 logger.info(QA_SESSION_EMPTY_MSG)
                 return
 
-            if await self.is_qa_session_ended():
+            if self.is_session_ended:
                 logger.info(QA_SESSION_ENDED_MSG)
                 return
 
-            # Send message to group and save to database
+            # Drop the message if the connection or the room exceeds its rate,
+            # so that fan-out and writes stay bounded
+            retry_after = await self.take_rate_limit_token()
+            if retry_after:
+                logger.info(QA_SESSION_RATE_LIMITED_MSG)
+                await self.send_rate_limited(retry_after)
+                return
+
+            # Buffer the message to be saved to database, and send it to group
+            is_flush_due = self.buffer_message(message, sender, timestamp)
             await self.send_message_to_group(
                 MESSAGE_TYPE_QUESTION, message, sender, timestamp
             )
-            await self.save_message(message, sender, timestamp)
+            await self.schedule_flush(is_flush_due)
         except json.JSONDecodeError:
             logger.error(ERR_INVALID_JSON, exc_info=True)
         except Exception as e:
             logger.error(ERR_UNEXPECTED_LOG.format(error=str(e)), exc_info=True)
 
+    async def take_rate_limit_token(self) -> float:
+        """
+        Take a token from the connection and room buckets.
+        Return the seconds to wait before sending again, 0 if the message is allowed.
+        """
+        retry_after = self.rate_limit.take()
+        if retry_after:
+            return retry_after
+        retry_after = await room_rate_limiter.take(self.channel_layer, self.room_name)
+        if retry_after:
+            # The message is dropped by the room: it costs the connection nothing
+            self.rate_limit.give_back()
+        return retry_after
+
+    async def send_rate_limited(self, retry_after: float) -> None:
+        """Tell the client its message was dropped and when to retry."""
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": MESSAGE_TYPE_RATE_LIMITED,
+                    "message": str(LIVE_QA_RATE_LIMITED_MSG),
+                    "retry_after": round(retry_after, 2),
+                }
+            )
+        )
+
     async def send_message_to_group(
         self, message_type: str, message: str, sender: str, timestamp: datetime
     ) -> None:
         """Send a message to the group channel."""
         await self.channel_layer.group_send(
             self.room_group_name,
-            {
-                "type": message_type,
-                "message": message,
-                "sender": sender,
-                "timestamp": timestamp.isoformat(),
-            },
+            build_question_event(message_type, message, sender, timestamp),
         )
 
     async def question_message(self, message_data: Dict[str, str]) -> None:
         """Send the question to the group"""
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "type": MESSAGE_TYPE_QUESTION,
-                    "message": message_data["message"],
-                    "sender": message_data["sender"],
-                    "timestamp": message_data["timestamp"],
-                }
-            )
+        qa_question_cache.add_message(
+            self.room_name,
+            message_data["message"],
+            message_data["sender"],
+            message_data["timestamp"],
         )
+        # The frame is serialized once by the sender
+        await self.send(text_data=message_data["frame"])
+
+    async def questions_deleted(self, message_data: Dict[str, str]) -> None:
+        """Drop the cached history of the room, whose questions were deleted"""
+        qa_question_cache.invalidate(self.room_name)
+
+    async def presence_update(self, message_data: Dict[str, str]) -> None:
+        """Send the number of participants of the room"""
+        await self.send(text_data=message_data["frame"])
 
     async def close_connection(self, message_data: Dict[str, str]) -> None:
         """Close the connection. This is called when the instructor has ended the QA session"""
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "type": MESSAGE_TYPE_CLOSE,
-                    "message": message_data["message"],
-                    "sender": message_data["sender"],
-                    "timestamp": message_data["timestamp"],
-                }
-            )
-        )
+        self.is_session_ended = True
+        qa_question_cache.invalidate(self.room_name)
+        await self.send(text_data=message_data["frame"])
         # Close the connection
         await self.close(code=SESSION_TERMINATE_CODE)
 
-    @database_sync_to_async
-    def save_message(self, message: str, sender: str, timestamp: datetime) -> None:
-        """Save the message to the database"""
+    def buffer_message(self, message: str, sender: str, timestamp: datetime) -> bool:
+        """
+        Add the message to the write-behind buffer.
+        Return True if the buffered messages of the room are due to be saved.
+        """
         qa_question = QAQuestion(
             room_name=self.room_name, text=message, sender=sender, timestamp=timestamp
         )
-        qa_question.save()
+        return qa_question_buffer.add(qa_question)
+
+    async def schedule_flush(self, is_flush_due: bool) -> None:
+        """Flush the buffered messages right away if due, otherwise later."""
+        if is_flush_due:
+            await self.flush_messages()
+        elif not self.flush_task:
+            self.flush_task = asyncio.create_task(self.flush_messages_later())
+
+    async def flush_messages_later(self) -> None:
+        """Flush the buffered messages once the flush interval has passed."""
+        await asyncio.sleep(qa_question_buffer.flush_interval)
+        self.flush_task = None
+        await self.flush_messages()
+
+    @database_sync_to_async
+    def flush_messages(self) -> None:
+        """Save the buffered messages of the room to the database"""
+        qa_question_buffer.flush(self.room_name)
+
+    def get_cursor(self) -> Optional[Tuple[datetime, Optional[int]]]:
+        """Get the last-seen position sent by a reconnecting client, if any."""
+        query_params = parse_qs(self.scope.get("query_string", b"").decode())
+        return decode_cursor(query_params.get("cursor", [None])[0])
+
+    async def send_question_history(
+        self, cursor: Optional[Tuple[datetime, Optional[int]]]
+    ) -> None:
+        """Replay the questions posted after the cursor in pages of bounded size."""
+        while True:
+            questions, has_more = await self.get_group_questions(cursor)
+            await self.send(
+                text_data=json.dumps(
+                    {
+                        "type": MESSAGE_TYPE_QUESTION_LIST,
+                        "questions": [
+                            self.serialize_question(question) for question in questions
+                        ],
+                        "has_more": has_more,
+                    }
+                )
+            )
+            if not has_more:
+                return
+            cursor = (questions[-1].timestamp, questions[-1].id)
+
+    @staticmethod
+    def serialize_question(question: QAQuestion) -> Dict[str, str]:
+        """Convert a question into the format sent to the client"""
+        return {
+            "message": question.text,
+            "sender": question.sender,
+            "timestamp": question.timestamp.isoformat(),
+            "cursor": encode_cursor(question.timestamp, question.id),
+        }
 
     @database_sync_to_async
-    def get_group_questions(self) -> list[QAQuestion]:
-        """Get all questions in the group"""
-        return list(
-            QAQuestion.objects.filter(room_name=self.room_name).order_by("timestamp")
+    def get_group_questions(
+        self, cursor: Optional[Tuple[datetime, Optional[int]]] = None
+    ) -> Tuple[list[QAQuestion], bool]:
+        """
+        Get a page of questions in the group posted after the cursor, including
+        those not saved yet, and whether more questions follow the page.
+        """
+        page_size = settings.LIVE_QA_HISTORY_PAGE_SIZE
+        if not qa_question_cache.is_loaded(self.room_name):
+            self.load_group_questions()
+        page = qa_question_cache.fetch_after(self.room_name, cursor, page_size)
+        if page is not None:
+            return page
+
+        # The cursor is older than the cached history, so read from the database.
+        # Take the buffered questions first, so none is missed if they are
+        # saved while the database is queried
+        pending = qa_question_buffer.pending(self.room_name)
+        questions = QAQuestionRepository.fetch_after(
+            self.room_name, cursor, limit=page_size + 1
+        )
+        if len(questions) <= page_size:
+            saved_ids = {question.id for question in questions}
+            questions.extend(
+                q
+                for q in pending
+                if q.id not in saved_ids and (not cursor or q.timestamp > cursor[0])
+            )
+        return questions[:page_size], len(questions) > page_size
+
+    def load_group_questions(self) -> None:
+        """Read the latest questions in the group into the shared cache"""
+        max_questions = qa_question_cache.max_questions
+        # Questions received through the group from now on are cached as well
+        qa_question_cache.begin_load(self.room_name)
+        pending = qa_question_buffer.pending(self.room_name)
+        questions = QAQuestionRepository.fetch_latest(
+            self.room_name, limit=max_questions + 1
         )
+        complete = len(questions) <= max_questions
+        qa_question_cache.load(self.room_name, questions + pending, complete)
 
     @database_sync_to_async
     def is_qa_session_ended(self) -> bool:
@@ -151,10 +304,66 @@ class QASessionConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def has_permission_for_live_qa(self) -> bool:
         """Check if the user has permission to join the live QA session"""
-        course = Course.objects.filter(id=self.course_id).first()
-        if not course:
-            return False
+        return PermissionChecker.can_join_live_qa(self.scope["user"], self.course_id)
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Push new notifications and the unread count to the user,
+    so that the badge is updated without reloading the page.
+    """
+
+    async def connect(self):
+        """Connection event handler provided by AsyncWebsocketConsumer."""
+        self.group_names = []
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            logger.info(UNAUTHORIZED_ACCESS_MSG)
+            await self.close(code=UNAUTHORIZED_ACCESS_CODE)
+            return
+
+        self.group_names = await self.get_group_names()
+        for group_name in self.group_names:
+            await self.channel_layer.group_add(group_name, self.channel_name)
+        await self.accept()
+
+        # Notifications sent before the connection are counted here
+        count = await self.count_unread()
+        await self.send(
+            text_data=json.dumps(
+                {"type": MESSAGE_TYPE_NOTIFICATION_COUNT, "count": count}
+            )
+        )
+
+    async def disconnect(self, close_code):
+        """Disconnection event handler provided by AsyncWebsocketConsumer."""
+        for group_name in self.group_names:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+
+    async def notification_message(self, message_data: Dict[str, str]) -> None:
+        """Send the notification to the user"""
+        # The frame is serialized once by the publisher
+        await self.send(text_data=message_data["frame"])
+
+    @database_sync_to_async
+    def get_group_names(self) -> list[str]:
+        """
+        Get the groups of the user: its own, and for a student, one per offering
+        of the current term, to which broadcast notifications are sent.
+        """
         user = self.scope["user"]
-        is_admin = PermissionChecker.is_admin(user)
-        is_active = PermissionChecker.is_active_in_course(user, course)
-        return is_admin or is_active
+        group_names = [NOTIFICATION_USER_GROUP.format(user_id=user.id)]
+        if user.is_student():
+            offering_ids = Enrollment.objects.filter(
+                student__user=user, offering__term=AcademicTermRepository.current()
+            ).values_list("offering_id", flat=True)
+            group_names.extend(
+                NOTIFICATION_OFFERING_GROUP.format(offering_id=offering_id)
+                for offering_id in offering_ids
+            )
+        return group_names
+
+    @database_sync_to_async
+    def count_unread(self) -> int:
+        """Count the unread notifications of the user"""
+        return NotificationRepository.count_unread(self.scope["user"])
@@ -1,11 +1,17 @@
 from django_filters import FilterSet, CharFilter, NumberFilter
 from django.contrib.auth import get_user_model
 
+from userportal.repositories import UserRepository
+
 
 class UserFilter(FilterSet):
-    username = CharFilter(lookup_expr="icontains")
+    # Matches the start of the username or of a word of it, through the search tokens
+    username = CharFilter(method="filter_username")
     user_type = NumberFilter()
 
     class Meta:
         model = get_user_model()
         fields = ["username", "user_type"]
+
+    def filter_username(self, queryset, name, value):
+        return UserRepository.filter_by_username(queryset, value)
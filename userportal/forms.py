@@ -61,7 +61,13 @@ class CourseSearchForm(forms.Form):
     keywords = forms.CharField(
         required=False,
         label="Keywords",
-        widget=forms.TextInput(attrs={"placeholder": "Enter course title, etc."}),
+        widget=forms.TextInput(
+            attrs={
+                "placeholder": "Enter course title, etc.",
+                "list": "course-suggestions",
+                "autocomplete": "off",
+            }
+        ),
     )
 
 
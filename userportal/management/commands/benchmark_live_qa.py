@@ -0,0 +1,265 @@
+import json
+import math
+import time
+import asyncio
+from uuid import uuid4
+from typing import Dict, List, Tuple
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.routing import URLRouter
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+
+from django.urls import path
+from django.db import connection
+from django.utils import timezone
+from django.test.utils import override_settings, CaptureQueriesContext
+from django.core.management.base import BaseCommand, CommandError
+
+from userportal.models import *
+from userportal.consumers import QASessionConsumer
+from userportal.buffers import qa_question_buffer
+from userportal.caches import qa_question_cache
+from userportal.repositories import QAQuestionArchiveRepository
+from userportal.utils import build_question_event
+
+
+class Command(BaseCommand):
+    """Benchmark the live Q&A WebSocket path with simulated clients"""
+
+    help = (
+        "Connect simulated WebSocket clients to a temporary live Q&A session "
+        "over the in-memory channel layer, post questions at a fixed rate, and "
+        "report connect latency, fan-out latency, throughput and DB queries per question. "
+        "Every client joins as the teacher of the temporary course."
+    )
+    IN_MEMORY_CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+    # Seconds to wait for a client to connect, and for the last questions
+    # to reach every client
+    CONNECT_TIMEOUT = 60
+    DRAIN_TIMEOUT = 10
+    END_MARKER = "benchmark-end"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clients", type=int, default=100, help="Number of connected clients"
+        )
+        parser.add_argument(
+            "--senders",
+            type=int,
+            default=10,
+            help="Number of clients posting questions",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=5,
+            help="Questions posted per second, across all senders",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10,
+            help="Seconds during which questions are posted",
+        )
+
+    def handle(self, *args, **options):
+        clients, senders = options["clients"], options["senders"]
+        if clients < 1 or not 0 < senders <= clients:
+            raise CommandError("--senders must be between 1 and --clients.")
+        if options["rate"] <= 0 or options["duration"] <= 0:
+            raise CommandError("--rate and --duration must be positive.")
+
+        qa_session = self.create_session()
+        try:
+            with override_settings(CHANNEL_LAYERS=self.IN_MEMORY_CHANNEL_LAYERS):
+                results = async_to_sync(self.run_benchmark)(
+                    qa_session, clients, senders, options["rate"], options["duration"]
+                )
+        finally:
+            self.delete_session(qa_session)
+        self.report(results, options)
+
+    def create_session(self) -> QASession:
+        """Create a temporary course with an active Q&A session"""
+        suffix = uuid4().hex[:8]
+        user = PortalUser.objects.create_user(
+            username=f"benchmark_{suffix}",
+            user_type=PortalUser.UserType.TEACHER,
+        )
+        teacher = TeacherProfile.objects.create(user=user)
+        program = Program.objects.create(
+            title=f"Benchmark {suffix}", description="Live Q&A benchmark"
+        )
+        course = Course.objects.create(
+            title=f"Benchmark {suffix}",
+            description="Live Q&A benchmark",
+            program=program,
+            teacher=teacher,
+        )
+        return QASession.objects.create(course=course)
+
+    def delete_session(self, qa_session: QASession) -> None:
+        """Delete the temporary session, its questions, and related entities"""
+        room_name = qa_session.room_name
+        course = qa_session.course
+        qa_question_buffer.flush(room_name)
+        QAQuestion.objects.filter(room_name=room_name).delete()
+        QAQuestionArchiveRepository.delete(room_name)
+        qa_question_cache.invalidate(room_name)
+        course.program.delete()
+        course.teacher.user.delete()
+
+    async def run_benchmark(
+        self,
+        qa_session: QASession,
+        clients: int,
+        senders: int,
+        rate: float,
+        duration: float,
+    ) -> Dict:
+        application = URLRouter(
+            [
+                path(
+                    "ws/course/<int:course_id>/live-qa-session/<room_name>/",
+                    QASessionConsumer.as_asgi(),
+                ),
+            ]
+        )
+        url = (
+            f"/ws/course/{qa_session.course.id}/live-qa-session/{qa_session.room_name}/"
+        )
+        user = qa_session.course.teacher.user
+        communicators = []
+        for _ in range(clients):
+            communicator = WebsocketCommunicator(application, url)
+            communicator.scope["user"] = user
+            communicators.append(communicator)
+
+        connect_latencies = await asyncio.gather(
+            *(self.connect(communicator) for communicator in communicators)
+        )
+
+        sent_at: Dict[str, float] = {}
+        # The consumers query the database from the main thread, so the queries
+        # are captured there
+        queries = CaptureQueriesContext(connection)
+        await sync_to_async(queries.__enter__)()
+        try:
+            started_at = time.perf_counter()
+            # Every client reads its frames while the questions are posted
+            receivers = [
+                asyncio.create_task(
+                    self.receive_until_end(communicator, duration + self.DRAIN_TIMEOUT)
+                )
+                for communicator in communicators
+            ]
+            # Post the questions at a fixed rate, round robin over the senders
+            interval = 1 / rate
+            for seq in range(max(1, int(rate * duration))):
+                message = f"benchmark-{seq}"
+                sent_at[message] = time.perf_counter()
+                await communicators[seq % senders].send_json_to(
+                    {"message": message, "sender": "benchmark"}
+                )
+                delay = started_at + (seq + 1) * interval - time.perf_counter()
+                await asyncio.sleep(max(0, delay))
+
+            # The group delivers in order, so the end marker arrives last
+            await get_channel_layer().group_send(
+                f"{LIVE_QA_PREFIX}_{qa_session.room_name}",
+                build_question_event(
+                    MESSAGE_TYPE_QUESTION, self.END_MARKER, "benchmark", timezone.now()
+                ),
+            )
+            frames = [
+                frame
+                for client_frames in await asyncio.gather(*receivers)
+                for frame in client_frames
+            ]
+            elapsed = time.perf_counter() - started_at
+
+            await asyncio.gather(
+                *(communicator.disconnect() for communicator in communicators)
+            )
+        finally:
+            await sync_to_async(queries.__exit__)(None, None, None)
+        query_count = await sync_to_async(len)(queries)
+
+        fan_out_latencies = [
+            received_at - sent_at[frame["message"]]
+            for received_at, frame in frames
+            if frame["type"] == MESSAGE_TYPE_QUESTION and frame["message"] in sent_at
+        ]
+        return {
+            "connect_latencies": connect_latencies,
+            "fan_out_latencies": fan_out_latencies,
+            "sent": len(sent_at),
+            "rate_limited": sum(
+                frame["type"] == MESSAGE_TYPE_RATE_LIMITED for _, frame in frames
+            ),
+            "elapsed": elapsed,
+            "queries": query_count,
+        }
+
+    async def connect(self, communicator: WebsocketCommunicator) -> float:
+        """Connect a client and wait for its history. Return the latency in seconds"""
+        started_at = time.perf_counter()
+        connected, _ = await communicator.connect(timeout=self.CONNECT_TIMEOUT)
+        if not connected:
+            raise CommandError("Failed to connect to the live Q&A session.")
+        await communicator.receive_from(timeout=self.CONNECT_TIMEOUT)
+        return time.perf_counter() - started_at
+
+    async def receive_until_end(
+        self, communicator: WebsocketCommunicator, timeout: float
+    ) -> List[Tuple[float, Dict]]:
+        """Receive the frames of a client up to the end marker, with their arrival time"""
+        frames = []
+        while True:
+            try:
+                frame = json.loads(await communicator.receive_from(timeout=timeout))
+            except asyncio.TimeoutError:
+                raise CommandError("Timed out waiting for the questions to arrive.")
+            if frame.get("message") == self.END_MARKER:
+                return frames
+            frames.append((time.perf_counter(), frame))
+
+    def report(self, results: Dict, options: Dict) -> None:
+        """Print the results"""
+        fan_out = results["fan_out_latencies"]
+        sent = results["sent"]
+        self.stdout.write(
+            f"Clients: {options['clients']}, senders: {options['senders']}, "
+            f"rate: {options['rate']}/s, duration: {options['duration']}s"
+        )
+        self.stdout.write(
+            f"Connect latency: p50 {self.percentile(results['connect_latencies'], 50):.1f} ms, "
+            f"p99 {self.percentile(results['connect_latencies'], 99):.1f} ms"
+        )
+        self.stdout.write(
+            f"Fan-out latency: p50 {self.percentile(fan_out, 50):.1f} ms, "
+            f"p99 {self.percentile(fan_out, 99):.1f} ms"
+        )
+        self.stdout.write(
+            f"Questions sent: {sent}, rate limited: {results['rate_limited']}"
+        )
+        # Accepted questions are sent to every client; the others are dropped
+        # by the channel layer once a client's channel is over capacity
+        expected = (sent - results["rate_limited"]) * options["clients"]
+        self.stdout.write(
+            f"Messages delivered: {len(fan_out)} of {expected} "
+            f"({len(fan_out) / results['elapsed']:.1f}/s)"
+        )
+        self.stdout.write(f"DB queries per question: {results['queries'] / sent:.2f}")
+
+    @staticmethod
+    def percentile(values: List[float], percent: float) -> float:
+        """Get the nearest-rank percentile of the values, in milliseconds"""
+        if not values:
+            return 0.0
+        values = sorted(values)
+        index = max(0, math.ceil(percent / 100 * len(values)) - 1)
+        return values[index] * 1000
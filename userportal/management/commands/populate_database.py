@@ -8,7 +8,8 @@ from django.contrib.auth.hashers import make_password
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from userportal.models import *
-from userportal.repositories import AcademicTermRepository
+from userportal.search import course_search_index
+from userportal.repositories import AcademicTermRepository, UserRepository
 
 
 class Command(BaseCommand):
@@ -183,6 +184,8 @@ class Command(BaseCommand):
             ),
         ]
         self.created_users = PortalUser.objects.bulk_create(users)
+        # bulk_create sends no signals, so the users are indexed here
+        UserRepository.index_search_tokens(self.created_users)
 
         # Assign users to permission groups
         teachers = [
@@ -292,6 +295,7 @@ class Command(BaseCommand):
         ]
 
         self.created_courses = Course.objects.bulk_create(courses)
+        course_search_index.update([course.id for course in self.created_courses])
         self.update_record_count(len(courses))
 
     def create_course_offerings(self):
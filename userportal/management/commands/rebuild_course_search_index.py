@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from userportal.search import course_search_index
+
+
+class Command(BaseCommand):
+    """Rebuild the full-text index of the course catalog"""
+
+    help = "Index every course again, e.g. after courses were changed in bulk."
+
+    def handle(self, *args, **options):
+        if not course_search_index.is_available():
+            self.stdout.write("The course search index is not available.")
+            return
+        count = course_search_index.rebuild()
+        self.stdout.write(f"{count} courses indexed.")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from userportal.utils import chunked
+from userportal.repositories import UserRepository
+
+
+class Command(BaseCommand):
+    """Rebuild the search tokens of the users"""
+
+    help = "Store the search tokens of every user again, e.g. after users were changed in bulk."
+    BATCH_SIZE = 1000
+
+    def handle(self, *args, **options):
+        count = 0
+        users = get_user_model().objects.order_by("id").iterator(self.BATCH_SIZE)
+        for batch in chunked(users, self.BATCH_SIZE):
+            UserRepository.index_search_tokens(batch)
+            count += len(batch)
+        self.stdout.write(f"{count} users indexed.")
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from elearning.celery import app
+from userportal.metrics import task_metrics
+
+
+class Command(BaseCommand):
+    """Report the metrics of the Celery tasks"""
+
+    help = (
+        "Report, per task, the runs, failures and retries, the average and maximum "
+        "duration, the average and maximum lag between enqueue (or ETA) and start, "
+        "and the rows written, as recorded by every worker since the last reset."
+    )
+    HEADER = (
+        f"{'Task':<55} {'Runs':>6} {'Fail':>5} {'Retry':>5} "
+        f"{'Avg ms':>8} {'Max ms':>8} {'Lag ms':>8} {'Max lag':>8} {'Rows':>8}"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the metrics after reporting them",
+        )
+
+    def handle(self, *args, **options):
+        # Import the task modules of the apps, so that every task is listed
+        app.loader.import_default_modules()
+        task_names = sorted(
+            name for name in app.tasks if name.startswith("userportal.")
+        )
+        snapshot = task_metrics.snapshot(task_names)
+        if not snapshot:
+            self.stdout.write("No task metrics recorded.")
+        else:
+            self.stdout.write(self.HEADER)
+            for task_name, metrics in snapshot.items():
+                self.stdout.write(self.format_row(task_name, metrics))
+        if options["reset"]:
+            task_metrics.reset(task_names)
+            self.stdout.write("Task metrics reset.")
+
+    @staticmethod
+    def format_row(task_name: str, metrics: dict) -> str:
+        """Format the metrics of a task as a row of the report"""
+        runs = metrics["runs"]
+        lagged_runs = metrics["lagged_runs"]
+        average_duration = metrics["duration_ms"] / runs if runs else 0
+        average_lag = metrics["lag_ms"] / lagged_runs if lagged_runs else 0
+        return (
+            f"{task_name:<55} {runs:>6} {metrics['failures']:>5} "
+            f"{metrics['retries']:>5} {average_duration:>8.1f} "
+            f"{metrics['max_duration_ms']:>8} {average_lag:>8.1f} "
+            f"{metrics['max_lag_ms']:>8} {metrics['rows']:>8}"
+        )
@@ -0,0 +1,180 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from celery.signals import before_task_publish, task_prerun, task_postrun
+from django.core.cache import cache
+from django.db import connection
+
+from userportal.constants import *
+
+logger = logging.getLogger(__name__)
+
+
+class RowCounter:
+    """Database execute wrapper counting the rows inserted, updated or deleted."""
+
+    WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if sql.lstrip()[:6].upper() in self.WRITE_STATEMENTS:
+            self.rows += max(0, context["cursor"].rowcount)
+        return result
+
+
+class TaskMetrics:
+    """
+    Counters of the Celery tasks per task name: runs, failures, retries,
+    duration, enqueue-to-start lag and rows written.
+
+    The counters are kept in the cache, so that every worker adds to the same
+    ones. Durations and lags are in milliseconds. Maximums are read and
+    written without a lock, so a concurrent run may occasionally be missed.
+    """
+
+    # lagged_runs counts the runs whose lag is known
+    COUNTERS = (
+        "runs",
+        "failures",
+        "retries",
+        "duration_ms",
+        "lagged_runs",
+        "lag_ms",
+        "rows",
+    )
+    MAXIMUMS = ("max_duration_ms", "max_lag_ms")
+    FIELDS = COUNTERS + MAXIMUMS
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def record(
+        self,
+        task_name: str,
+        state: str,
+        duration: float,
+        lag: Optional[float],
+        rows: int,
+    ) -> None:
+        """Add a run of the task to its counters. Durations are in seconds."""
+        duration_ms = round(duration * 1000)
+        counters = {
+            "runs": 1,
+            "failures": int(state == "FAILURE"),
+            "retries": int(state == "RETRY"),
+            "duration_ms": duration_ms,
+            "rows": rows,
+        }
+        maximums = {"max_duration_ms": duration_ms}
+        if lag is not None:
+            lag_ms = max(0, round(lag * 1000))
+            counters["lagged_runs"] = 1
+            counters["lag_ms"] = lag_ms
+            maximums["max_lag_ms"] = lag_ms
+        for field, value in counters.items():
+            if value:
+                self._incr(self._key(task_name, field), value)
+        current = cache.get_many([self._key(task_name, f) for f in maximums])
+        cache.set_many(
+            {
+                self._key(task_name, field): value
+                for field, value in maximums.items()
+                if value > current.get(self._key(task_name, field), -1)
+            },
+            None,
+        )
+
+    def snapshot(self, task_names: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """Get the counters of the tasks that have run."""
+        snapshot = {}
+        for task_name in task_names:
+            keys = {self._key(task_name, field): field for field in self.FIELDS}
+            values = cache.get_many(list(keys))
+            if values:
+                snapshot[task_name] = {
+                    field: values.get(key, 0) for key, field in keys.items()
+                }
+        return snapshot
+
+    def reset(self, task_names: Iterable[str]) -> None:
+        """Remove the counters of the tasks."""
+        cache.delete_many(
+            [self._key(name, field) for name in task_names for field in self.FIELDS]
+        )
+
+    @staticmethod
+    def _incr(key: str, delta: int) -> None:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # The counter does not exist yet, unless another worker just added it
+            if not cache.add(key, delta, None):
+                cache.incr(key, delta)
+
+    def _key(self, task_name: str, field: str) -> str:
+        return f"{self.prefix}{task_name}:{field}"
+
+
+task_metrics = TaskMetrics(prefix=TASK_METRICS_PREFIX)
+
+# Runs in progress in this worker process, by task id
+_running: Dict[str, tuple] = {}
+_running_lock = threading.Lock()
+
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    """Record when the task was sent, to measure its lag when it starts."""
+    if headers is not None:
+        headers.setdefault(TASK_ENQUEUED_AT_HEADER, time.time())
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, task=None, **kwargs):
+    """Start timing the task, and counting the rows it writes."""
+    started_at = time.time()
+    row_counter = RowCounter()
+    wrapper = connection.execute_wrapper(row_counter)
+    wrapper.__enter__()
+    lag = get_task_lag(task, started_at)
+    with _running_lock:
+        _running[task_id] = (started_at, lag, row_counter, wrapper)
+
+
+@task_postrun.connect
+def record_task_metrics(task_id=None, task=None, state=None, **kwargs):
+    """Record the duration, lag and rows written of the task."""
+    with _running_lock:
+        running = _running.pop(task_id, None)
+    if running is None:
+        return
+    started_at, lag, row_counter, wrapper = running
+    wrapper.__exit__(None, None, None)
+    try:
+        task_metrics.record(
+            task.name, state, time.time() - started_at, lag, row_counter.rows
+        )
+    except Exception as e:
+        # Metrics must never fail the task
+        logger.error(ERR_TASK_METRICS_UNAVAILABLE.format(exception=str(e)))
+
+
+def get_task_lag(task, started_at: float) -> Optional[float]:
+    """
+    Get the seconds between the time the task was due and its start: its ETA
+    if it was delayed, otherwise the time it was sent. None if unknown.
+    """
+    eta = task.request.eta
+    if isinstance(eta, str):
+        eta = datetime.fromisoformat(eta)
+    if isinstance(eta, datetime):
+        due_at = eta.timestamp()
+    else:
+        due_at = task.request.get(TASK_ENQUEUED_AT_HEADER)
+    return started_at - due_at if due_at else None
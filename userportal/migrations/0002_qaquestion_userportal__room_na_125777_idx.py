@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-17 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userportal", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="qaquestion",
+            index=models.Index(
+                fields=["room_name", "timestamp", "id"],
+                name="userportal__room_na_125777_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.7 on 2026-10-17 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userportal", "0002_qaquestion_userportal__room_na_125777_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QAQuestionArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("room_name", models.CharField(max_length=200, unique=True)),
+                ("question_count", models.PositiveIntegerField(default=0)),
+                ("archived_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="QAQuestionArchiveChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_timestamp", models.DateTimeField()),
+                ("first_question_id", models.BigIntegerField()),
+                ("data", models.BinaryField()),
+                (
+                    "archive",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="userportal.qaquestionarchive",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["archive", "first_timestamp", "first_question_id"],
+                        name="userportal__archive_3eda12_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userportal", "0005_notificationarchive_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="broadcastnotification",
+            name="event_key",
+            field=models.CharField(blank=True, max_length=200, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="event_key",
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                fields=("user", "event_key"), name="unique_notification_event"
+            ),
+        ),
+    ]
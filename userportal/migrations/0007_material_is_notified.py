@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userportal", "0006_notification_event_key"),
+    ]
+
+    # Existing materials were already notified, so they are marked as such
+    operations = [
+        migrations.AddField(
+            model_name="material",
+            name="is_notified",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name="material",
+            name="is_notified",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations, transaction, DatabaseError
+
+# The course search index is a side table that the ORM does not manage:
+# an FTS5 virtual table on SQLite, a tsvector column with a GIN index on
+# PostgreSQL. It is skipped on other databases, or if SQLite lacks FTS5,
+# and course search falls back to a plain lookup.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE userportal_coursesearch USING fts5(
+        title, description, teacher, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO userportal_coursesearch (rowid, title, description, teacher)
+    SELECT c.id, c.title, c.description, u.first_name || ' ' || u.last_name
+    FROM userportal_course c
+    JOIN userportal_teacherprofile t ON t.id = c.teacher_id
+    JOIN userportal_portaluser u ON u.id = t.user_id
+    """,
+]
+POSTGRESQL_CREATE = [
+    """
+    CREATE TABLE userportal_coursesearch (
+        course_id integer PRIMARY KEY
+            REFERENCES userportal_course (id) ON DELETE CASCADE
+            DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX userportal_coursesearch_document_idx
+    ON userportal_coursesearch USING GIN (document)
+    """,
+    """
+    INSERT INTO userportal_coursesearch (course_id, document)
+    SELECT c.id,
+        setweight(to_tsvector('simple', c.title), 'A') ||
+        setweight(to_tsvector('simple', c.description), 'C') ||
+        setweight(to_tsvector('simple', u.first_name || ' ' || u.last_name), 'B')
+    FROM userportal_course c
+    JOIN userportal_teacherprofile t ON t.id = c.teacher_id
+    JOIN userportal_portaluser u ON u.id = t.user_id
+    """,
+]
+
+
+def create_course_search(apps, schema_editor):
+    statements = {
+        "sqlite": SQLITE_CREATE,
+        "postgresql": POSTGRESQL_CREATE,
+    }.get(schema_editor.connection.vendor, [])
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            with schema_editor.connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+    except DatabaseError:
+        # SQLite built without FTS5
+        pass
+
+
+def drop_course_search(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS userportal_coursesearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userportal", "0007_material_is_notified"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_course_search, drop_course_search),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from userportal.utils import user_search_tokens
+
+# Values of UserSearchToken.Field
+SEARCH_TOKEN_FIELDS = {"username": 1, "name": 2, "email": 3}
+
+
+def index_users(apps, schema_editor):
+    User = apps.get_model("userportal", "PortalUser")
+    UserSearchToken = apps.get_model("userportal", "UserSearchToken")
+    tokens = []
+    for user in User.objects.iterator(chunk_size=1000):
+        title = "" if user.title == "NONE" else user.title
+        fields = user_search_tokens(
+            user.username, user.first_name, user.last_name, title, user.email
+        )
+        tokens += [
+            UserSearchToken(
+                user_id=user.id, token=token, field=SEARCH_TOKEN_FIELDS[field]
+            )
+            for field, field_tokens in fields.items()
+            for token in field_tokens
+        ]
+        if len(tokens) >= 1000:
+            UserSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    UserSearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userportal", "0008_coursesearch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=150)),
+                (
+                    "field",
+                    models.PositiveSmallIntegerField(
+                        choices=[(1, "Username"), (2, "Name"), (3, "Email")]
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="usersearchtoken",
+            constraint=models.UniqueConstraint(
+                fields=("token", "field", "user"), name="unique_user_search_token"
+            ),
+        ),
+        migrations.RunPython(index_users, migrations.RunPython.noop),
+    ]
@@ -90,6 +90,30 @@ class PortalUser(AbstractUser):
         ordering = ["username"]
 
 
+class UserSearchToken(models.Model):
+    """A normalized word of a user's username, name, title or email, to search users by prefix."""
+
+    class Field(models.IntegerChoices):
+        USERNAME = 1, _("Username")
+        NAME = 2, _("Name")
+        EMAIL = 3, _("Email")
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="search_tokens",
+    )
+    token = models.CharField(max_length=150)
+    field = models.PositiveSmallIntegerField(choices=Field.choices)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["token", "field", "user"], name="unique_user_search_token"
+            ),
+        ]
+
+
 class TeacherProfile(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -299,6 +323,8 @@ class Material(models.Model):
     course = models.ForeignKey(
         Course, on_delete=models.CASCADE, related_name="materials"
     )
+    # Set once the students are notified, in a digest of the materials added together
+    is_notified = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-uploaded_at"]
@@ -321,6 +347,8 @@ class Notification(models.Model):
     link_text = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    # Identifies the event notified, so that a retried task does not notify twice
+    event_key = models.CharField(max_length=200, blank=True, null=True)
 
     def clean(self):
         # Ensure that both link_path and link_text are provided together
@@ -338,11 +366,82 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Covers the list and the unread count of a user
+            models.Index(fields=["user", "is_read", "created_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "event_key"], name="unique_notification_event"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} ({self.message[:20]}...)"
+
+
+class NotificationArchive(models.Model):
+    # A notification moved out of Notification once its retention period ended
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="archived_notifications",
+    )
+    message = models.TextField(max_length=500)
+    link_path = models.CharField(max_length=100, blank=True, null=True)
+    link_text = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField()
+    is_read = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+        ]
 
     def __str__(self):
         return f"{self.user.username} ({self.message[:20]}...)"
 
 
+class BroadcastNotification(models.Model):
+    # A notification for every student enrolled in the offering, stored once.
+    # Students enrolled after it is created do not receive it
+    offering = models.ForeignKey(
+        CourseOffering,
+        on_delete=models.CASCADE,
+        related_name="broadcast_notifications",
+    )
+    message = models.TextField(max_length=500)
+    link_path = models.CharField(max_length=100, blank=True, null=True)
+    link_text = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Identifies the event notified, so that a retried task does not notify twice
+    event_key = models.CharField(max_length=200, unique=True, blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.offering} ({self.message[:20]}...)"
+
+
+class BroadcastNotificationReceipt(models.Model):
+    # Created once the user has read the broadcast notification
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="broadcast_notification_receipts",
+    )
+    broadcast = models.ForeignKey(
+        BroadcastNotification, on_delete=models.CASCADE, related_name="receipts"
+    )
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ["user", "broadcast"]
+
+
 class QASession(models.Model):
     class Status(models.IntegerChoices):
         ACTIVE = 1, _("Active")
@@ -379,3 +478,28 @@ class QAQuestion(models.Model):
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["room_name", "timestamp", "id"]),
+        ]
+
+
+class QAQuestionArchive(models.Model):
+    room_name = models.CharField(max_length=200, unique=True)
+    question_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+
+class QAQuestionArchiveChunk(models.Model):
+    archive = models.ForeignKey(
+        QAQuestionArchive, on_delete=models.CASCADE, related_name="chunks"
+    )
+    # (timestamp, id) cursor of the first question of the chunk
+    first_timestamp = models.DateTimeField()
+    first_question_id = models.BigIntegerField()
+    # Up to LIVE_QA_ARCHIVE_CHUNK_SIZE questions as zlib-compressed JSON, oldest first
+    data = models.BinaryField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["archive", "first_timestamp", "first_question_id"]),
+        ]
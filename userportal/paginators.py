@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from django.db.models import Q, QuerySet
+
+from userportal.utils import encode_cursor, decode_cursor
+
+# Takes the keyset filter of a page and whether to order newest first,
+# and returns the rows ordered on (created_at, id)
+KeysetSource = Callable[[Q, bool], QuerySet]
+
+
+class KeysetPage:
+    """A page of a KeysetPaginator, with the cursors of its neighbours."""
+
+    def __init__(
+        self,
+        object_list: List[Any],
+        has_next: bool,
+        has_previous: bool,
+        next_cursor: Optional[str],
+        previous_cursor: Optional[str],
+    ):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    Paginate rows newest first on (created_at, id), without COUNT or OFFSET.
+
+    A page starts after or before the cursor of a row, so every page costs a
+    single query of `per_page + 1` rows, however deep it is. The source is a
+    QuerySet, or a KeysetSource for queries that cannot be filtered once built,
+    such as unions. Rows may be model instances or dicts.
+    """
+
+    def __init__(self, source: Union[QuerySet, KeysetSource], per_page: int):
+        self.source = source
+        self.per_page = per_page
+
+    def page(self, after: str = None, before: str = None) -> KeysetPage:
+        """
+        Get the page of rows following the `after` cursor, or preceding the
+        `before` cursor. Without a valid cursor, get the first page.
+        """
+        position = decode_cursor(after) or decode_cursor(before)
+        newest_first = position is None or decode_cursor(after) is not None
+        rows = list(self._fetch(self._keyset(position, newest_first), newest_first))
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if newest_first:
+            has_next, has_previous = has_more, position is not None
+        else:
+            # Rows before the cursor are read oldest first, then put back in order
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        return KeysetPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=self._cursor(rows[-1]) if has_next and rows else None,
+            previous_cursor=self._cursor(rows[0]) if has_previous and rows else None,
+        )
+
+    def _fetch(self, keyset: Q, newest_first: bool) -> QuerySet:
+        if isinstance(self.source, QuerySet):
+            ordering = ("-created_at", "-id") if newest_first else ("created_at", "id")
+            queryset = self.source.filter(keyset).order_by(*ordering)
+        else:
+            queryset = self.source(keyset, newest_first)
+        return queryset[: self.per_page + 1]
+
+    @staticmethod
+    def _keyset(
+        position: Optional[Tuple[datetime, Optional[int]]], newest_first: bool
+    ) -> Q:
+        if position is None:
+            return Q()
+        timestamp, pk = position
+        lookup = "lt" if newest_first else "gt"
+        keyset = Q(**{f"created_at__{lookup}": timestamp})
+        if pk is not None:
+            keyset |= Q(created_at=timestamp, **{f"id__{lookup}": pk})
+        return keyset
+
+    @staticmethod
+    def _cursor(row: Any) -> str:
+        if isinstance(row, dict):
+            return encode_cursor(row["created_at"], row["id"])
+        return encode_cursor(row.created_at, row.id)
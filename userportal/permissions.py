@@ -1,5 +1,7 @@
 from typing import Type, Union
 
+from django.conf import settings
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 
@@ -54,6 +56,27 @@ class PermissionChecker:
             )
         return False
 
+    @staticmethod
+    def can_join_live_qa(
+        request_user: Union[AuthUserType, AnonymousUser], course_id: int
+    ) -> bool:
+        # Return False for the anonymous user
+        if not request_user.is_authenticated:
+            return False
+        # The result is cached for a short time, since it takes several queries
+        cache_key = LIVE_QA_PERMISSION_CACHE_KEY.format(
+            user_id=request_user.pk, course_id=course_id
+        )
+        can_join = cache.get(cache_key)
+        if can_join is None:
+            course = Course.objects.filter(id=course_id).first()
+            can_join = bool(course) and (
+                PermissionChecker.is_admin(request_user)
+                or PermissionChecker.is_active_in_course(request_user, course)
+            )
+            cache.set(cache_key, can_join, settings.LIVE_QA_PERMISSION_CACHE_TTL)
+        return can_join
+
     @staticmethod
     def has_finished_course(
         request_user: Union[AuthUserType, AnonymousUser], course: Course
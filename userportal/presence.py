@@ -0,0 +1,186 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Set
+
+from django.conf import settings
+
+from userportal.constants import *
+
+logger = logging.getLogger(__name__)
+
+
+class RoomPresence:
+    """
+    Number of clients connected to each live Q&A room.
+
+    Joins and leaves are counted in the Redis server of the channel layer when
+    it is a RedisChannelLayer, so that every worker shares the same counts.
+    Other layers, such as the in-memory layer used in tests, fall back to
+    per-process counts.
+
+    Changes are coalesced: the first change of a room schedules a single
+    broadcast of its count `broadcast_interval` seconds later, which covers
+    every change made in the meantime. When the last client of a room leaves
+    this process, its pending broadcast is cancelled and sent right away.
+    """
+
+    # Counts of rooms not updated for a day are dropped
+    KEY_EXPIRY = 60 * 60 * 24
+
+    def __init__(self, broadcast_interval: float, prefix: str):
+        self.broadcast_interval = broadcast_interval
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._scheduled_until: Dict[str, float] = {}
+        # Clients connected to each room in this process
+        self._local_counts: Dict[str, int] = {}
+        # Pending broadcasts, named after the key of their room, referenced
+        # until done so that they are not garbage-collected
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def join(self, channel_layer, room_name: str, group_name: str) -> None:
+        """Count a client joining the room, and schedule a broadcast of the count."""
+        await self._change(channel_layer, room_name, 1)
+        with self._lock:
+            self._local_counts[room_name] = self._local_counts.get(room_name, 0) + 1
+        await self.schedule_broadcast(channel_layer, room_name, group_name)
+
+    async def leave(self, channel_layer, room_name: str, group_name: str) -> None:
+        """Count a client leaving the room, and schedule a broadcast of the count."""
+        await self._change(channel_layer, room_name, -1)
+        with self._lock:
+            local_count = self._local_counts.get(room_name, 0) - 1
+            if local_count > 0:
+                self._local_counts[room_name] = local_count
+            else:
+                self._local_counts.pop(room_name, None)
+        if local_count > 0:
+            await self.schedule_broadcast(channel_layer, room_name, group_name)
+            return
+        # No task is left behind for a room this process no longer serves
+        for task in self._room_tasks(room_name):
+            task.cancel()
+        await self._broadcast(channel_layer, room_name, group_name)
+
+    async def count(self, channel_layer, room_name: str) -> int:
+        """Get the number of clients connected to the room."""
+        if self._uses_redis(channel_layer):
+            try:
+                count = await self._connection(channel_layer, room_name).get(
+                    self._key(room_name)
+                )
+                return max(0, int(count or 0))
+            except Exception as e:
+                logger.error(
+                    ERR_PRESENCE_UNAVAILABLE.format(exception=str(e)), exc_info=True
+                )
+                return 0
+        with self._lock:
+            return self._counts.get(room_name, 0)
+
+    async def schedule_broadcast(
+        self, channel_layer, room_name: str, group_name: str
+    ) -> None:
+        """Broadcast the count of the room later, unless a broadcast is already due."""
+        if await self._claim_broadcast(channel_layer, room_name):
+            task = asyncio.create_task(
+                self._broadcast_later(channel_layer, room_name, group_name),
+                name=self._key(room_name),
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _broadcast_later(
+        self, channel_layer, room_name: str, group_name: str
+    ) -> None:
+        await asyncio.sleep(self.broadcast_interval)
+        await self._broadcast(channel_layer, room_name, group_name)
+
+    async def _broadcast(self, channel_layer, room_name: str, group_name: str) -> None:
+        count = await self.count(channel_layer, room_name)
+        await channel_layer.group_send(
+            group_name,
+            {
+                "type": MESSAGE_TYPE_PRESENCE,
+                "count": count,
+                "frame": json.dumps({"type": MESSAGE_TYPE_PRESENCE, "count": count}),
+            },
+        )
+
+    async def _change(self, channel_layer, room_name: str, delta: int) -> None:
+        if self._uses_redis(channel_layer):
+            try:
+                connection = self._connection(channel_layer, room_name)
+                key = self._key(room_name)
+                await connection.incrby(key, delta)
+                await connection.expire(key, self.KEY_EXPIRY)
+            except Exception as e:
+                logger.error(
+                    ERR_PRESENCE_UNAVAILABLE.format(exception=str(e)), exc_info=True
+                )
+            return
+        with self._lock:
+            count = self._counts.get(room_name, 0) + delta
+            if count > 0:
+                self._counts[room_name] = count
+            else:
+                self._counts.pop(room_name, None)
+
+    async def _claim_broadcast(self, channel_layer, room_name: str) -> bool:
+        """Return True if no broadcast of the room is scheduled yet, and claim it."""
+        if self._uses_redis(channel_layer):
+            try:
+                return bool(
+                    await self._connection(channel_layer, room_name).set(
+                        f"{self._key(room_name)}:scheduled",
+                        1,
+                        nx=True,
+                        px=int(self.broadcast_interval * 1000),
+                    )
+                )
+            except Exception as e:
+                logger.error(
+                    ERR_PRESENCE_UNAVAILABLE.format(exception=str(e)), exc_info=True
+                )
+                return False
+        now = time.monotonic()
+        with self._lock:
+            if now < self._scheduled_until.get(room_name, 0):
+                return False
+            self._scheduled_until[room_name] = now + self.broadcast_interval
+            return True
+
+    @staticmethod
+    def _uses_redis(channel_layer) -> bool:
+        return hasattr(channel_layer, "connection")
+
+    @staticmethod
+    def _connection(channel_layer, room_name: str):
+        return channel_layer.connection(channel_layer.consistent_hash(room_name))
+
+    def _key(self, room_name: str) -> str:
+        return f"{self.prefix}{room_name}"
+
+    def _room_tasks(self, room_name: str) -> list:
+        return [task for task in self._tasks if task.get_name() == self._key(room_name)]
+
+    def reset(self) -> None:
+        """Remove the per-process counts and cancel the pending broadcasts."""
+        for task in list(self._tasks):
+            if not task.get_loop().is_closed():
+                task.cancel()
+        self._tasks.clear()
+        with self._lock:
+            self._counts.clear()
+            self._scheduled_until.clear()
+            self._local_counts.clear()
+
+
+room_presence = RoomPresence(
+    broadcast_interval=settings.LIVE_QA_PRESENCE_BROADCAST_INTERVAL,
+    prefix=LIVE_QA_PRESENCE_PREFIX,
+)
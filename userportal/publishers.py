@@ -0,0 +1,98 @@
+import json
+import asyncio
+import logging
+from typing import Iterable, List
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from userportal.constants import *
+from userportal.utils import chunked
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationPublisher:
+    """
+    Push new notifications to the connected clients of the recipients.
+
+    Every connection of a user joins the group of the user, and the connections
+    of a student also join the group of each offering of the current term, so a
+    broadcast notification is a single group send whatever the number of students.
+
+    Pushing is best effort: the notifications are already saved, and a client
+    that missed a push catches up when a page is loaded.
+    """
+
+    # Group sends made concurrently at most
+    CONCURRENT_SENDS = 100
+
+    @staticmethod
+    def publish_to_users(
+        user_ids: Iterable[int],
+        message: str,
+        link_path: str = None,
+        link_text: str = None,
+    ) -> None:
+        """Push a notification to the clients of each user."""
+        group_names = [
+            NOTIFICATION_USER_GROUP.format(user_id=user_id) for user_id in user_ids
+        ]
+        NotificationPublisher._publish(group_names, message, link_path, link_text)
+
+    @staticmethod
+    def publish_to_offering(
+        offering_id: int,
+        message: str,
+        link_path: str = None,
+        link_text: str = None,
+    ) -> None:
+        """Push a broadcast notification to the clients of the students of the offering."""
+        group_name = NOTIFICATION_OFFERING_GROUP.format(offering_id=offering_id)
+        NotificationPublisher._publish([group_name], message, link_path, link_text)
+
+    @staticmethod
+    def build_event(message: str, link_path: str = None, link_text: str = None) -> dict:
+        """
+        Build a notification group event. The frame sent to the clients is
+        serialized once here, and forwarded as is by every consumer.
+        """
+        notification = {
+            "type": MESSAGE_TYPE_NOTIFICATION,
+            "message": str(message),
+            "link_path": link_path,
+            "link_text": str(link_text) if link_text else link_text,
+            "unread_delta": 1,
+        }
+        return {"type": MESSAGE_TYPE_NOTIFICATION, "frame": json.dumps(notification)}
+
+    @staticmethod
+    def _publish(
+        group_names: List[str], message: str, link_path: str, link_text: str
+    ) -> None:
+        channel_layer = get_channel_layer()
+        if channel_layer is None or not group_names:
+            return
+        event = NotificationPublisher.build_event(message, link_path, link_text)
+        try:
+            async_to_sync(NotificationPublisher._group_send_many)(
+                channel_layer, group_names, event
+            )
+        except Exception as e:
+            logger.error(
+                ERR_FAILED_TO_PUBLISH_NOTIFICATION.format(
+                    count=len(group_names), exception=str(e)
+                ),
+                exc_info=True,
+            )
+
+    @staticmethod
+    async def _group_send_many(
+        channel_layer, group_names: List[str], event: dict
+    ) -> None:
+        # One event loop entry for the whole batch, with the sends of each
+        # chunk made concurrently rather than one round trip after another
+        for chunk in chunked(group_names, NotificationPublisher.CONCURRENT_SENDS):
+            await asyncio.gather(
+                *(channel_layer.group_send(name, event) for name in chunk)
+            )
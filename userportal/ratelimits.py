@@ -0,0 +1,136 @@
+import time
+import logging
+import threading
+from typing import Dict
+
+from django.conf import settings
+
+from userportal.constants import *
+
+logger = logging.getLogger(__name__)
+
+# Refill the bucket for the time elapsed since the last call and take a token.
+# Redis' own clock is used so that every worker sees the same time.
+# Return the seconds to wait before a token is available, 0 if one was taken.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / refill_rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated_at", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / refill_rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class TokenBucket:
+    """
+    In-memory token bucket holding up to `capacity` tokens,
+    refilled at `refill_rate` tokens per second.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token. Return the seconds to wait if none is available, else 0."""
+        now = time.monotonic()
+        elapsed = max(0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.refill_rate
+
+    def give_back(self) -> None:
+        """Return a token taken for a message that was dropped anyway."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def is_full(self, now: float) -> bool:
+        """Check if the bucket is refilled by now, as a new bucket would be."""
+        return self.tokens + (now - self.updated_at) * self.refill_rate >= self.capacity
+
+
+class SharedRateLimiter:
+    """
+    Token buckets shared by every worker, keyed by name.
+
+    The buckets live in the Redis server of the channel layer when it is a
+    RedisChannelLayer. Other layers, such as the in-memory layer used in tests,
+    fall back to per-process buckets, dropped once refilled so that the buckets
+    of rooms no longer active do not pile up.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, prefix: str):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Idle buckets are dropped at most once per refill time
+        self._evicted_at = time.monotonic()
+
+    async def take(self, channel_layer, key: str) -> float:
+        """Take a token from the bucket of the key. Return the seconds to wait, or 0."""
+        if hasattr(channel_layer, "connection"):
+            try:
+                return await self._take_from_redis(channel_layer, key)
+            except Exception as e:
+                # Let the message through rather than blocking the room
+                logger.error(
+                    ERR_RATE_LIMITER_UNAVAILABLE.format(exception=str(e)), exc_info=True
+                )
+                return 0
+        with self._lock:
+            self._evict_idle()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(
+                    self.capacity, self.refill_rate
+                )
+            return bucket.take()
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        if now - self._evicted_at < self.capacity / self.refill_rate:
+            return
+        self._evicted_at = now
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if not bucket.is_full(now)
+        }
+
+    async def _take_from_redis(self, channel_layer, key: str) -> float:
+        redis_key = f"{self.prefix}{key}"
+        connection = channel_layer.connection(channel_layer.consistent_hash(key))
+        retry_after = await connection.eval(
+            TOKEN_BUCKET_LUA, 1, redis_key, self.capacity, self.refill_rate
+        )
+        return float(retry_after)
+
+    def reset(self) -> None:
+        """Remove the per-process buckets."""
+        with self._lock:
+            self._buckets.clear()
+
+
+room_rate_limiter = SharedRateLimiter(
+    capacity=settings.LIVE_QA_ROOM_RATE_LIMIT_BURST,
+    refill_rate=settings.LIVE_QA_ROOM_RATE_LIMIT,
+    prefix=LIVE_QA_RATE_LIMIT_PREFIX,
+)
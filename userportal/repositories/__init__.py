@@ -7,4 +7,5 @@ from .material_repository import MaterialRepository
 from .notification_repository import NotificationRepository
 from .qa_session_repository import QASessionRepository
 from .qa_question_repository import QAQuestionRepository
+from .qa_question_archive_repository import QAQuestionArchiveRepository
 from .user_repository import UserRepository
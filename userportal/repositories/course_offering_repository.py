@@ -1,5 +1,5 @@
-from typing import Union
-from django.db.models import QuerySet
+from typing import Optional, Tuple, Union
+from django.db.models import QuerySet, Exists, OuterRef, Value, BooleanField
 
 from userportal.models import *
 from userportal.repositories import *
@@ -26,6 +26,39 @@ class CourseOfferingRepository:
             return CourseOffering.objects.filter(course=course, term=next_term).first()
         return None
 
+    @staticmethod
+    def fetch_current_and_next(
+        course: Course, user=None
+    ) -> Tuple[Optional[CourseOffering], Optional[CourseOffering]]:
+        """
+        Fetch the current and next course offerings for the given course in a
+        single query. Each offering is annotated with `is_enrolled`, whether the
+        given user is enrolled in it as a student.
+        """
+        current_term = AcademicTermRepository.current()
+        next_term = AcademicTermRepository.next()
+        term_ids = [term.id for term in (current_term, next_term) if term]
+        if not term_ids:
+            return None, None
+        if user is not None and user.is_student():
+            is_enrolled = Exists(
+                Enrollment.objects.filter(offering=OuterRef("pk"), student__user=user)
+            )
+        else:
+            is_enrolled = Value(False, output_field=BooleanField())
+        offerings = {
+            offering.term_id: offering
+            for offering in CourseOffering.objects.filter(
+                course=course, term_id__in=term_ids
+            )
+            .select_related("term")
+            .annotate(is_enrolled=is_enrolled)
+        }
+        return (
+            offerings.get(current_term.id) if current_term else None,
+            offerings.get(next_term.id) if next_term else None,
+        )
+
     @staticmethod
     def fetch_with_academic_terms(course_id: int) -> QuerySet[CourseOffering]:
         """
@@ -1,15 +1,23 @@
+from typing import Union
+
 from django.db.models import Q
 from django.db.models.query import QuerySet
 
 from userportal.models import *
+from userportal.search import course_search_index, CourseSearchResults
 
 
 class CourseRepository:
     """Repository for Course model."""
 
     @staticmethod
-    def fetch_filtered_by(keywords: str = None) -> QuerySet[Course]:
-        """Fetch courses that match the given keywords."""
+    def fetch_filtered_by(
+        keywords: str = None,
+    ) -> Union[QuerySet[Course], CourseSearchResults]:
+        """
+        Fetch courses that match the given keywords, best match first.
+        Without the search index, courses containing any keyword are fetched.
+        """
         queryset = Course.objects.select_related("teacher__user").only(
             "id",
             "title",
@@ -18,6 +26,11 @@ class CourseRepository:
             "teacher__user__first_name",
             "teacher__user__last_name",
         )
+        count = course_search_index.count(keywords)
+        if count == 0:
+            return queryset.none()
+        if count is not None:
+            return CourseSearchResults(course_search_index, keywords, queryset, count)
         if keywords:
             query_words = keywords.split()
             q_objects = Q()
@@ -31,6 +44,11 @@ class CourseRepository:
             queryset = queryset.filter(q_objects)
         return queryset
 
+    @staticmethod
+    def fetch_with_details() -> QuerySet[Course]:
+        """Fetch courses with their program, teacher and Q&A session."""
+        return Course.objects.select_related("program", "teacher__user", "qa_session")
+
     @staticmethod
     def create(form_data: dict, teacher: TeacherProfile) -> Course:
         """Create a course with given form data and teacher."""
@@ -1,3 +1,4 @@
+from typing import List, Tuple
 from django.db.models.query import QuerySet
 from django.utils.datastructures import MultiValueDict
 from userportal.models import *
@@ -21,3 +22,21 @@ class MaterialRepository:
         return Material.objects.filter(course=course).only(
             "id", "title", "description", "uploaded_at", "file"
         )
+
+    @staticmethod
+    def claim_unnotified(course_id: int) -> List[Tuple[int, str]]:
+        """
+        Mark the materials of the course not notified yet as notified, and get
+        their ids and titles, oldest first. Call it in a transaction, so that
+        the materials are claimed again if the notification fails.
+        """
+        materials = list(
+            Material.objects.select_for_update()
+            .filter(course_id=course_id, is_notified=False)
+            .order_by("id")
+            .values_list("id", "title")
+        )
+        Material.objects.filter(id__in=[pk for pk, _ in materials]).update(
+            is_notified=True
+        )
+        return materials
@@ -1,15 +1,318 @@
-from typing import Type
-from django.db.models import QuerySet
-from userportal.models import Notification
+from datetime import datetime
+from collections import Counter
+from typing import Dict, Iterable, Optional, Type
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet, F, Q, Exists, OuterRef, Value
+from userportal.models import *
+from userportal.utils import chunked
 from django.contrib.auth import get_user_model
 
 AuthUserType = Type[get_user_model()]
 
+# Columns shared by personal and broadcast notifications in a merged list
+NOTIFICATION_FIELDS = [
+    "id",
+    "message",
+    "link_path",
+    "link_text",
+    "created_at",
+    "is_read",
+    "kind",
+]
+
 
 class NotificationRepository:
     """Repository for Notification model."""
 
     @staticmethod
-    def fetch(user: AuthUserType) -> QuerySet[Notification]:
-        """Fetch notifications for the given user."""
-        return Notification.objects.filter(user=user).order_by("-created_at")
+    def fetch(
+        user: AuthUserType, keyset: Q = None, newest_first: bool = True
+    ) -> QuerySet:
+        """
+        Fetch the personal and broadcast notifications for the given user, newest first.
+        Each notification is a dict of NOTIFICATION_FIELDS, where `kind` tells
+        whether `id` is a Notification or a BroadcastNotification.
+        A union cannot be filtered, so the `keyset` filter of a page on
+        (created_at, id) is applied to each of its parts.
+        """
+        keyset = keyset or Q()
+        # The default ordering of the models is cleared, as the union is ordered
+        personal = (
+            Notification.objects.filter(keyset, user=user)
+            .annotate(kind=Value(NOTIFICATION_KIND_PERSONAL))
+            .values(*NOTIFICATION_FIELDS)
+            .order_by()
+        )
+        broadcast = (
+            NotificationRepository.fetch_broadcasts(user)
+            .filter(keyset)
+            .annotate(
+                is_read=NotificationRepository._has_receipt(user),
+                kind=Value(NOTIFICATION_KIND_BROADCAST),
+            )
+            .values(*NOTIFICATION_FIELDS)
+            .order_by()
+        )
+        ordering = ("-created_at", "-id") if newest_first else ("created_at", "id")
+        return personal.union(broadcast, all=True).order_by(*ordering)
+
+    @staticmethod
+    def fetch_broadcasts(user: AuthUserType) -> QuerySet[BroadcastNotification]:
+        """
+        Fetch the broadcast notifications for the given user,
+        sent to the offerings the user was enrolled in at the time.
+        """
+        return BroadcastNotification.objects.filter(
+            offering__enrollments__student__user=user,
+            created_at__gte=F("offering__enrollments__enrolled_at"),
+        )
+
+    @staticmethod
+    def count_unread(user: AuthUserType) -> int:
+        """
+        Count the unread personal and broadcast notifications for the given user.
+        The count is cached, and read from the database only when not cached.
+        """
+        key = UNREAD_NOTIFICATION_COUNT_CACHE_KEY.format(user_id=user.id)
+        count = cache.get(key)
+        # A negative count means the cache went out of sync
+        if count is None or count < 0:
+            count = NotificationRepository._count_unread_from_db(user.id)
+            cache.set(key, count, settings.UNREAD_NOTIFICATION_COUNT_TTL)
+        return count
+
+    @staticmethod
+    def adjust_unread_counts(deltas: Dict[int, int]) -> None:
+        """
+        Add the deltas to the cached unread counts, keyed by user id.
+        Counts not cached are left out, they are read from the database when needed.
+        """
+        for user_id, delta in deltas.items():
+            if not delta:
+                continue
+            try:
+                cache.incr(
+                    UNREAD_NOTIFICATION_COUNT_CACHE_KEY.format(user_id=user_id), delta
+                )
+            except ValueError:
+                pass
+
+    @staticmethod
+    def invalidate_unread_counts(user_ids: Iterable[int]) -> None:
+        """Remove the cached unread counts of the users."""
+        for batch in chunked(user_ids, settings.NOTIFICATION_BATCH_SIZE):
+            cache.delete_many(
+                [UNREAD_NOTIFICATION_COUNT_CACHE_KEY.format(user_id=pk) for pk in batch]
+            )
+
+    @staticmethod
+    def reconcile_unread_counts(since: datetime) -> int:
+        """
+        Correct the cached unread counts of the users with unread notifications,
+        or with notifications created or read since the given time: personal
+        notifications, broadcast receipts, and broadcasts to their offerings.
+        Return the number of counts corrected.
+        """
+        user_ids = (
+            Notification.objects.filter(Q(is_read=False) | Q(created_at__gte=since))
+            .order_by()
+            .values_list("user_id", flat=True)
+            .union(
+                BroadcastNotificationReceipt.objects.filter(read_at__gte=since)
+                .order_by()
+                .values_list("user_id", flat=True),
+                Enrollment.objects.filter(
+                    offering_id__in=BroadcastNotification.objects.filter(
+                        created_at__gte=since
+                    ).values("offering_id")
+                )
+                .order_by()
+                .values_list("student__user_id", flat=True),
+            )
+        )
+        corrected = 0
+        for batch in chunked(
+            user_ids.iterator(chunk_size=settings.NOTIFICATION_BATCH_SIZE),
+            settings.NOTIFICATION_BATCH_SIZE,
+        ):
+            keys = {
+                UNREAD_NOTIFICATION_COUNT_CACHE_KEY.format(user_id=pk): pk
+                for pk in batch
+            }
+            # Only the counts still cached are corrected
+            corrected_counts = {}
+            for key, count in cache.get_many(list(keys)).items():
+                db_count = NotificationRepository._count_unread_from_db(keys[key])
+                if db_count != count:
+                    corrected_counts[key] = db_count
+            if corrected_counts:
+                cache.set_many(corrected_counts, settings.UNREAD_NOTIFICATION_COUNT_TTL)
+            corrected += len(corrected_counts)
+        return corrected
+
+    @staticmethod
+    def purge_expired(
+        read_before: datetime,
+        unread_before: datetime,
+        batch_size: int,
+        archive: bool = False,
+    ) -> int:
+        """
+        Delete the notifications past their retention period, `batch_size` rows
+        per transaction so that no lock is held for long:
+        personal notifications created before `read_before` if read, or before
+        `unread_before` if not, and broadcast notifications created before
+        `unread_before`. With `archive`, personal notifications are copied to
+        NotificationArchive first. Return the number of notifications deleted.
+        """
+        expired = Notification.objects.filter(
+            Q(is_read=True, created_at__lt=read_before)
+            | Q(is_read=False, created_at__lt=unread_before)
+        ).order_by()
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    expired.values(
+                        "id",
+                        "user_id",
+                        "message",
+                        "link_path",
+                        "link_text",
+                        "created_at",
+                        "is_read",
+                    )[:batch_size]
+                )
+                if not rows:
+                    break
+                if archive:
+                    NotificationArchive.objects.bulk_create(
+                        [
+                            NotificationArchive(
+                                **{key: row[key] for key in row if key != "id"}
+                            )
+                            for row in rows
+                        ]
+                    )
+                Notification.objects.filter(id__in=[row["id"] for row in rows]).delete()
+            NotificationRepository.invalidate_unread_counts(
+                {row["user_id"] for row in rows if not row["is_read"]}
+            )
+            deleted += len(rows)
+
+        expired_broadcasts = BroadcastNotification.objects.filter(
+            created_at__lt=unread_before
+        ).order_by()
+        while True:
+            broadcasts = list(
+                expired_broadcasts.values_list("id", "offering_id")[:batch_size]
+            )
+            if not broadcasts:
+                break
+            # The receipts of the broadcasts are deleted with them
+            BroadcastNotification.objects.filter(
+                id__in=[pk for pk, _ in broadcasts]
+            ).delete()
+            NotificationRepository.invalidate_unread_counts(
+                Enrollment.objects.filter(
+                    offering_id__in={offering_id for _, offering_id in broadcasts}
+                )
+                .values_list("student__user_id", flat=True)
+                .iterator(chunk_size=settings.NOTIFICATION_BATCH_SIZE)
+            )
+            deleted += len(broadcasts)
+        return deleted
+
+    @staticmethod
+    def _count_unread_from_db(user_id: int) -> int:
+        personal = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        broadcast = (
+            NotificationRepository.fetch_broadcasts(user_id)
+            .exclude(NotificationRepository._has_receipt(user_id))
+            .count()
+        )
+        return personal + broadcast
+
+    @staticmethod
+    def mark_as_read(notification_ids: Iterable[int]) -> None:
+        """Mark the personal notifications as read, and update the unread counts."""
+        with transaction.atomic():
+            unread = list(
+                Notification.objects.select_for_update()
+                .filter(id__in=notification_ids, is_read=False)
+                .values_list("id", "user_id")
+            )
+            Notification.objects.filter(id__in=[pk for pk, _ in unread]).update(
+                is_read=True
+            )
+        read_counts = Counter(user_id for _, user_id in unread)
+        NotificationRepository.adjust_unread_counts(
+            {user_id: -count for user_id, count in read_counts.items()}
+        )
+
+    @staticmethod
+    def create_broadcast(
+        offering: CourseOffering,
+        message: str,
+        link_path: str,
+        link_text: str,
+        event_key: str = None,
+    ) -> Optional[BroadcastNotification]:
+        """
+        Create a notification for every student enrolled in the offering.
+        Return None if a notification of the event was already created.
+        """
+        fields = {
+            "offering": offering,
+            "message": message,
+            "link_path": link_path,
+            "link_text": link_text,
+        }
+        if event_key:
+            broadcast, created = BroadcastNotification.objects.get_or_create(
+                event_key=event_key, defaults=fields
+            )
+            if not created:
+                return None
+        else:
+            broadcast = BroadcastNotification.objects.create(**fields)
+        # One cache call per batch, rather than an increment per student. Once
+        # committed, so that no count read in the meantime misses the broadcast
+        transaction.on_commit(
+            lambda: NotificationRepository.invalidate_unread_counts(
+                Enrollment.objects.filter(offering=offering)
+                .values_list("student__user_id", flat=True)
+                .iterator(chunk_size=settings.NOTIFICATION_BATCH_SIZE)
+            )
+        )
+        return broadcast
+
+    @staticmethod
+    def mark_broadcasts_as_read(user_id: int, broadcast_ids: Iterable[int]) -> None:
+        """Record that the user has read the broadcast notifications."""
+        read_ids = set(
+            BroadcastNotificationReceipt.objects.filter(
+                user_id=user_id, broadcast_id__in=broadcast_ids
+            ).values_list("broadcast_id", flat=True)
+        )
+        new_ids = set(broadcast_ids) - read_ids
+        # Inserted one at a time, so that only the receipts inserted here are
+        # counted: the ones inserted concurrently are counted by their caller
+        inserted = 0
+        with transaction.atomic():
+            for broadcast_id in sorted(new_ids):
+                _, created = BroadcastNotificationReceipt.objects.get_or_create(
+                    user_id=user_id, broadcast_id=broadcast_id
+                )
+                inserted += created
+        NotificationRepository.adjust_unread_counts({user_id: -inserted})
+
+    @staticmethod
+    def _has_receipt(user: AuthUserType) -> Exists:
+        return Exists(
+            BroadcastNotificationReceipt.objects.filter(
+                user=user, broadcast=OuterRef("pk")
+            )
+        )
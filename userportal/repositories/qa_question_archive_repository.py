@@ -0,0 +1,155 @@
+import json
+import zlib
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from userportal.models import *
+from userportal.utils import chunked
+
+
+class QAQuestionArchiveRepository:
+    """
+    Repository for QAQuestionArchive model.
+
+    The questions of an archive are stored in chunks of LIVE_QA_ARCHIVE_CHUNK_SIZE,
+    keyed by the (timestamp, id) cursor of their first question, so that a page of
+    history decompresses only the chunks it reads.
+    """
+
+    @staticmethod
+    def archive(room_name: str) -> int:
+        """
+        Move the questions of the room from the QAQuestion table into its archive.
+        Questions already in the archive are kept. Return the number of questions moved.
+        """
+        with transaction.atomic():
+            questions = list(
+                QAQuestion.objects.select_for_update()
+                .filter(room_name=room_name)
+                .order_by("timestamp", "id")
+            )
+            if not questions:
+                return 0
+            archive, _ = QAQuestionArchive.objects.select_for_update().get_or_create(
+                room_name=room_name
+            )
+            # Only the chunks from the one the first question falls into are
+            # packed again; questions are usually newer than the whole archive.
+            chunks = archive.chunks.order_by("first_timestamp", "first_question_id")
+            first = questions[0]
+            start = chunks.filter(
+                Q(first_timestamp__lt=first.timestamp)
+                | Q(first_timestamp=first.timestamp, first_question_id__lte=first.id)
+            ).last()
+            if start:
+                chunks = chunks.filter(
+                    Q(first_timestamp__gt=start.first_timestamp)
+                    | Q(
+                        first_timestamp=start.first_timestamp,
+                        first_question_id__gte=start.first_question_id,
+                    )
+                )
+            chunks = list(chunks)
+            merged = [
+                q
+                for chunk in chunks
+                for q in QAQuestionArchiveRepository._unpack(chunk, room_name)
+            ]
+            repacked_count = len(merged)
+            archived_ids = {q.id for q in merged}
+            merged.extend(q for q in questions if q.id not in archived_ids)
+            merged.sort(key=lambda q: (q.timestamp, q.id))
+            QAQuestionArchiveChunk.objects.filter(
+                id__in=[chunk.id for chunk in chunks]
+            ).delete()
+            QAQuestionArchiveChunk.objects.bulk_create(
+                QAQuestionArchiveChunk(
+                    archive=archive,
+                    first_timestamp=rows[0].timestamp,
+                    first_question_id=rows[0].id,
+                    data=QAQuestionArchiveRepository._pack(rows),
+                )
+                for rows in chunked(merged, settings.LIVE_QA_ARCHIVE_CHUNK_SIZE)
+            )
+            archive.question_count += len(merged) - repacked_count
+            archive.save()
+            # Questions saved after the rows were locked have greater ids and stay
+            QAQuestion.objects.filter(
+                room_name=room_name, id__lte=max(q.id for q in questions)
+            ).delete()
+        return len(questions)
+
+    @staticmethod
+    def fetch(room_name: str) -> List[QAQuestion]:
+        """Fetch the archived questions of the room, oldest first."""
+        chunks = QAQuestionArchiveChunk.objects.filter(
+            archive__room_name=room_name
+        ).order_by("first_timestamp", "first_question_id")
+        return [
+            q
+            for chunk in chunks
+            for q in QAQuestionArchiveRepository._unpack(chunk, room_name)
+        ]
+
+    @staticmethod
+    def fetch_before(
+        room_name: str,
+        cursor: Optional[Tuple[datetime, Optional[int]]] = None,
+        limit: int = None,
+    ) -> List[QAQuestion]:
+        """
+        Fetch the archived questions of the room posted before the given
+        (timestamp, id) cursor, newest first.
+        """
+        chunks = QAQuestionArchiveChunk.objects.filter(archive__room_name=room_name)
+        if cursor:
+            timestamp, pk = cursor
+            if pk is None:
+                chunks = chunks.filter(first_timestamp__lt=timestamp)
+            else:
+                chunks = chunks.filter(
+                    Q(first_timestamp__lt=timestamp)
+                    | Q(first_timestamp=timestamp, first_question_id__lt=pk)
+                )
+        chunks = chunks.order_by("-first_timestamp", "-first_question_id")
+        questions = []
+        for chunk in chunks.iterator(chunk_size=2):
+            rows = QAQuestionArchiveRepository._unpack(chunk, room_name)
+            if cursor:
+                rows = [
+                    q
+                    for q in rows
+                    if q.timestamp < timestamp
+                    or (pk is not None and q.timestamp == timestamp and q.id < pk)
+                ]
+            questions.extend(reversed(rows))
+            if limit and len(questions) >= limit:
+                break
+        return questions[:limit] if limit else questions
+
+    @staticmethod
+    def delete(room_name: str) -> None:
+        """Delete the archive of the room."""
+        QAQuestionArchive.objects.filter(room_name=room_name).delete()
+
+    @staticmethod
+    def _pack(questions: List[QAQuestion]) -> bytes:
+        rows = [[q.id, q.sender, q.text, q.timestamp.isoformat()] for q in questions]
+        return zlib.compress(json.dumps(rows, separators=(",", ":")).encode())
+
+    @staticmethod
+    def _unpack(chunk: QAQuestionArchiveChunk, room_name: str) -> List[QAQuestion]:
+        rows = json.loads(zlib.decompress(bytes(chunk.data)))
+        return [
+            QAQuestion(
+                id=pk,
+                room_name=room_name,
+                sender=sender,
+                text=text,
+                timestamp=datetime.fromisoformat(timestamp),
+            )
+            for pk, sender, text, timestamp in rows
+        ]
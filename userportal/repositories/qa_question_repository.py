@@ -1,5 +1,12 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db.models import Q
 from django.utils import timezone
 from userportal.models import *
+from userportal.repositories.qa_question_archive_repository import (
+    QAQuestionArchiveRepository,
+)
 
 
 class QAQuestionRepository:
@@ -16,3 +23,63 @@ class QAQuestionRepository:
         )
         close_comment.save()
         return close_comment
+
+    @staticmethod
+    def fetch_after(
+        room_name: str,
+        cursor: Optional[Tuple[datetime, Optional[int]]] = None,
+        limit: int = None,
+    ) -> List[QAQuestion]:
+        """
+        Fetch the questions of the room posted after the given (timestamp, id) cursor,
+        oldest first. A cursor without id matches only strictly newer questions.
+        """
+        queryset = QAQuestion.objects.filter(room_name=room_name)
+        if cursor:
+            timestamp, pk = cursor
+            if pk is None:
+                queryset = queryset.filter(timestamp__gt=timestamp)
+            else:
+                queryset = queryset.filter(
+                    Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)
+                )
+        queryset = queryset.order_by("timestamp", "id")
+        return list(queryset[:limit] if limit else queryset)
+
+    @staticmethod
+    def fetch_latest(room_name: str, limit: int) -> List[QAQuestion]:
+        """Fetch the latest questions of the room, oldest first."""
+        questions = QAQuestion.objects.filter(room_name=room_name).order_by(
+            "-timestamp", "-id"
+        )[:limit]
+        return list(reversed(questions))
+
+    @staticmethod
+    def fetch_before(
+        room_name: str,
+        cursor: Optional[Tuple[datetime, Optional[int]]] = None,
+        limit: int = None,
+    ) -> List[QAQuestion]:
+        """
+        Fetch the questions of the room posted before the given (timestamp, id) cursor,
+        newest first. A cursor without id matches only strictly older questions.
+        Archived questions of an ended session are included.
+        """
+        queryset = QAQuestion.objects.filter(room_name=room_name)
+        if cursor:
+            timestamp, pk = cursor
+            if pk is None:
+                queryset = queryset.filter(timestamp__lt=timestamp)
+            else:
+                queryset = queryset.filter(
+                    Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)
+                )
+        queryset = queryset.order_by("-timestamp", "-id")
+        questions = list(queryset[:limit] if limit else queryset)
+        archived = QAQuestionArchiveRepository.fetch_before(room_name, cursor, limit)
+        if not archived:
+            return questions
+        saved_ids = {question.id for question in questions}
+        questions.extend(q for q in archived if q.id not in saved_ids)
+        questions.sort(key=lambda q: (q.timestamp, q.id), reverse=True)
+        return questions[:limit] if limit else questions
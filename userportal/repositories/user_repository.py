@@ -1,10 +1,13 @@
-from typing import Type
+from typing import Type, Iterable, List
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from django.db.models.query import QuerySet
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 
-from userportal.models import StudentProfile
+from userportal.models import StudentProfile, UserSearchToken
+from userportal.utils import normalize_search_text, search_words, user_search_tokens
 
 AuthUser = get_user_model()
 AuthUserType = Type[AuthUser]
@@ -15,28 +18,120 @@ class UserRepository:
 
     @staticmethod
     def fetch_filtered_by(keywords=None, user_types=None) -> QuerySet[AuthUserType]:
-        """Fetch users that match the given keywords and user types."""
+        """
+        Fetch users that match the given keywords and user types. A keyword
+        matches the start of a word of the username, first name, last name or title.
+        """
         queryset = AuthUser.objects.filter(is_staff=False, is_superuser=False).only(
             "id", "username", "user_type", "is_active"
         )
 
         if keywords:
-            query_words = keywords.split()
-            q_objects = Q()
-            for word in query_words:
-                q_objects |= (
-                    Q(username__icontains=word)
-                    | Q(first_name__icontains=word)
-                    | Q(last_name__icontains=word)
-                    | Q(title__icontains=word)
-                )
-            queryset = queryset.filter(q_objects)
+            queryset = UserRepository.filter_by_keywords(
+                queryset,
+                keywords,
+                [UserSearchToken.Field.USERNAME, UserSearchToken.Field.NAME],
+            )
 
         if user_types:
             queryset = queryset.filter(user_type__in=user_types)
 
         return queryset
 
+    @staticmethod
+    def filter_by_keywords(
+        queryset: QuerySet[AuthUserType],
+        keywords: str,
+        fields: List[UserSearchToken.Field] = None,
+    ) -> QuerySet[AuthUserType]:
+        """
+        Filter users having a word that starts with any of the keywords, in the
+        given fields or in all of them. Keywords without any word match no user.
+        """
+        words = search_words(keywords)
+        if not words:
+            return queryset.none()
+        return queryset.filter(
+            id__in=UserRepository._fetch_token_user_ids(words, fields)
+        )
+
+    @staticmethod
+    def filter_by_username(
+        queryset: QuerySet[AuthUserType], username: str
+    ) -> QuerySet[AuthUserType]:
+        """Filter users whose username, or a word of it, starts with the given text."""
+        prefix = normalize_search_text(username.strip())
+        if not prefix:
+            return queryset
+        return queryset.filter(
+            id__in=UserRepository._fetch_token_user_ids(
+                [prefix], [UserSearchToken.Field.USERNAME]
+            )
+        )
+
+    @staticmethod
+    def autocomplete(term: str, limit: int = None) -> QuerySet[AuthUserType]:
+        """
+        Fetch the first users, by username, having a word that starts with each
+        of the words typed, e.g. "emi sm" for Emily Smith.
+        """
+        queryset = AuthUser.objects.filter(is_staff=False, is_superuser=False)
+        words = search_words(term)
+        if not words:
+            return queryset.none()
+        for word in words:
+            queryset = queryset.filter(
+                id__in=UserRepository._fetch_token_user_ids(
+                    [word],
+                    [UserSearchToken.Field.USERNAME, UserSearchToken.Field.NAME],
+                )
+            )
+        return queryset.order_by("username")[
+            : limit or settings.USER_AUTOCOMPLETE_LIMIT
+        ]
+
+    @staticmethod
+    def index_search_tokens(users: Iterable[AuthUserType]) -> None:
+        """Store the search tokens of the users, replacing their previous ones."""
+        users = list(users)
+        tokens = []
+        for user in users:
+            title = "" if user.title == AuthUser.Title.PREFER_NOT_TO_SAY else user.title
+            fields = user_search_tokens(
+                user.username, user.first_name, user.last_name, title, user.email
+            )
+            tokens += [
+                UserSearchToken(
+                    user=user, token=token, field=UserSearchToken.Field[field.upper()]
+                )
+                for field, field_tokens in fields.items()
+                for token in field_tokens
+            ]
+        with transaction.atomic():
+            UserSearchToken.objects.filter(user__in=users).delete()
+            UserSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+    @staticmethod
+    def _fetch_token_user_ids(
+        prefixes: List[str], fields: List[UserSearchToken.Field] = None
+    ) -> QuerySet[UserSearchToken]:
+        """
+        Get the ids of the users having a token that starts with any prefix,
+        in the given fields or in all of them.
+        """
+        q_objects = Q()
+        for prefix in prefixes:
+            # The range reads the tokens from the index; startswith keeps it
+            # exact whatever the collation of the database
+            upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            q_objects |= Q(
+                token__gte=prefix, token__lt=upper_bound, token__startswith=prefix
+            )
+        tokens = UserSearchToken.objects.filter(q_objects)
+        if fields:
+            tokens = tokens.filter(field__in=fields)
+        return tokens.values("user_id")
+
     @staticmethod
     def toggle_user_active_status(username, activate=True) -> bool:
         """Toggle the active status of the user with the given username."""
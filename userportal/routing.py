@@ -9,4 +9,5 @@ websocket_urlpatterns = [
         "ws/course/<int:course_id>/live-qa-session/<room_name>/",
         consumers.QASessionConsumer.as_asgi(),
     ),
+    path("ws/notifications/", consumers.NotificationConsumer.as_asgi()),
 ]
@@ -0,0 +1,386 @@
+import re
+import bisect
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, DatabaseError
+from django.utils import timezone
+
+from userportal.models import Course
+from userportal.constants import *
+from userportal.utils import chunked, search_words
+
+logger = logging.getLogger(__name__)
+
+
+class CourseSearchIndex:
+    """
+    Full-text index of the course catalog: titles, descriptions and teacher names.
+
+    The index is a side table, created by a migration: an FTS5 virtual table on
+    SQLite, or a tsvector column with a GIN index on PostgreSQL. Every keyword
+    matches the words it starts, and courses are ranked by relevance (bm25 or
+    ts_rank). On other databases, or if the table is missing, `search` and
+    `count` return None so that callers can fall back to a plain lookup.
+    """
+
+    # Courses reindexed per query
+    BATCH_SIZE = 500
+
+    def __init__(self, table: str):
+        self.table = table
+        self._available: Optional[bool] = None
+
+    def is_available(self) -> bool:
+        """Check if the index table exists in the database."""
+        if self._available is None:
+            self._available = (
+                connection.vendor in ("sqlite", "postgresql")
+                and self.table in connection.introspection.table_names()
+            )
+        return self._available
+
+    def search(
+        self, keywords: str, limit: int = None, offset: int = 0
+    ) -> Optional[List[int]]:
+        """
+        Get the ids of the courses matching any of the keywords, best match
+        first, from `offset` on. None if the index is not available or the
+        keywords have no words.
+        """
+        match = self._match(keywords)
+        if match is None:
+            return None
+        condition, query = match
+        if connection.vendor == "sqlite":
+            # Columns are weighted title, description, teacher
+            sql = (
+                f"SELECT rowid {condition} "
+                f"ORDER BY bm25({self.table}, 10.0, 1.0, 5.0), rowid"
+            )
+        else:
+            sql = (
+                f"SELECT course_id {condition} "
+                f"ORDER BY ts_rank(document, query) DESC, course_id"
+            )
+        params = [query]
+        if limit is not None:
+            sql += " LIMIT %s OFFSET %s"
+            params += [limit, offset]
+        rows = self._execute(sql, params)
+        return None if rows is None else [row[0] for row in rows]
+
+    def count(self, keywords: str) -> Optional[int]:
+        """
+        Count the courses matching any of the keywords. None if the index is not
+        available or the keywords have no words.
+        """
+        match = self._match(keywords)
+        if match is None:
+            return None
+        condition, query = match
+        rows = self._execute(f"SELECT COUNT(*) {condition}", [query])
+        return None if rows is None else rows[0][0]
+
+    def _match(self, keywords: str) -> Optional[Tuple[str, str]]:
+        """Get the FROM and WHERE clauses matching the keywords, and their query."""
+        words = re.findall(r"\w+", keywords or "")
+        if not words or not self.is_available():
+            return None
+        if connection.vendor == "sqlite":
+            condition = f"FROM {self.table} WHERE {self.table} MATCH %s"
+            query = " OR ".join(f'"{word}"*' for word in words)
+        else:
+            condition = (
+                f"FROM {self.table}, to_tsquery('simple', %s) query "
+                f"WHERE document @@ query"
+            )
+            query = " | ".join(f"{word}:*" for word in words)
+        return condition, query
+
+    @staticmethod
+    def _execute(sql: str, params: list) -> Optional[List[tuple]]:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+        except DatabaseError as e:
+            logger.error(ERR_COURSE_SEARCH_FAILED.format(exception=str(e)))
+            return None
+
+    def update(self, course_ids: Iterable[int]) -> None:
+        """Index the given courses again, and drop the ones that no longer exist."""
+        if not self.is_available():
+            return
+        for ids in chunked(list(course_ids), self.BATCH_SIZE):
+            courses = Course.objects.filter(id__in=ids).values_list(
+                "id",
+                "title",
+                "description",
+                "teacher__user__first_name",
+                "teacher__user__last_name",
+            )
+            rows = [
+                (course_id, title, description, f"{first_name} {last_name}")
+                for course_id, title, description, first_name, last_name in courses
+            ]
+            self._delete(ids)
+            self._insert(rows)
+
+    def remove(self, course_ids: Iterable[int]) -> None:
+        """Drop the given courses from the index."""
+        if self.is_available():
+            for ids in chunked(list(course_ids), self.BATCH_SIZE):
+                self._delete(ids)
+
+    def rebuild(self) -> int:
+        """Index every course again. Return the number of courses indexed."""
+        if not self.is_available():
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+        course_ids = list(Course.objects.values_list("id", flat=True))
+        self.update(course_ids)
+        return len(course_ids)
+
+    def _delete(self, course_ids: List[int]) -> None:
+        column = "rowid" if connection.vendor == "sqlite" else "course_id"
+        placeholders = ", ".join(["%s"] * len(course_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE {column} IN ({placeholders})",
+                course_ids,
+            )
+
+    def _insert(self, rows: List[tuple]) -> None:
+        if connection.vendor == "sqlite":
+            sql = (
+                f"INSERT INTO {self.table} (rowid, title, description, teacher) "
+                f"VALUES (%s, %s, %s, %s)"
+            )
+        else:
+            sql = (
+                f"INSERT INTO {self.table} (course_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('simple', %s), 'A') || "
+                f"setweight(to_tsvector('simple', %s), 'C') || "
+                f"setweight(to_tsvector('simple', %s), 'B'))"
+            )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+
+course_search_index = CourseSearchIndex(table=COURSE_SEARCH_TABLE)
+
+
+class CourseSearchResults:
+    """
+    Courses matching a search, best match first, read a page at a time.
+
+    Supports `count()`, `len()` and slicing like a QuerySet, so that it can be
+    paginated: a slice reads its ids from the index with LIMIT and OFFSET, then
+    the courses with a single query.
+    """
+
+    def __init__(self, index: CourseSearchIndex, keywords: str, queryset, count: int):
+        self.index = index
+        self.keywords = keywords
+        self.queryset = queryset
+        self._count = count
+
+    def count(self) -> int:
+        return self._count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            courses = self[key : key + 1]
+            if not courses:
+                raise IndexError(key)
+            return courses[0]
+        start = key.start or 0
+        limit = None if key.stop is None else max(0, key.stop - start)
+        if limit is None and start:
+            limit = max(0, self._count - start)
+        course_ids = self.index.search(self.keywords, limit, start) or []
+        courses = self.queryset.in_bulk(course_ids)
+        return [courses[id] for id in course_ids if id in courses]
+
+
+class CourseSuggestionIndex:
+    """
+    Per-process index of the course titles and teacher names to suggest while
+    a search is typed.
+
+    Every suffix of a title or name starting at a word is kept, normalized, in
+    a sorted list, so that the suggestions for a prefix are found with bisect,
+    without querying the database. The index is built on first use, updated
+    when a course is saved or deleted in this process, and built again after
+    `max_age` seconds at the latest, for the changes made by other processes.
+    Later builds run in a background thread, outside the lock, and the previous
+    index is served until the new one is swapped in.
+    """
+
+    TITLE = "course"
+    TEACHER = "teacher"
+
+    def __init__(self, max_age: float, limit: int):
+        self.max_age = timedelta(seconds=max_age)
+        self.limit = limit
+        self._lock = threading.Lock()
+        # Held while the index is built, so that a single build runs at a time
+        self._build_lock = threading.Lock()
+        # Sorted (key, course id, kind) entries
+        self._entries: List[Tuple[str, int, str]] = []
+        # Title and teacher name of each course indexed
+        self._courses: Dict[int, Tuple[str, str]] = {}
+        self._loaded_at = None
+        # Courses changed while the index is built, indexed again once it is swapped in
+        self._changed_during_build: Optional[set] = None
+
+    def suggest(self, term: str, limit: int = None) -> List[Dict[str, str]]:
+        """Get the titles and teacher names matching the start of the term, once each."""
+        prefix = " ".join(search_words(term))
+        if not prefix:
+            return []
+        limit = limit or self.limit
+        self._ensure_loaded()
+        with self._lock:
+            suggestions = {}
+            position = bisect.bisect_left(self._entries, (prefix,))
+            for index in range(position, len(self._entries)):
+                key, course_id, kind = self._entries[index]
+                if not key.startswith(prefix) or len(suggestions) >= limit:
+                    break
+                title, teacher = self._courses[course_id]
+                text = title if kind == self.TITLE else teacher
+                suggestions.setdefault((kind, text), course_id)
+        return [
+            {"type": kind, "text": text, "course_id": course_id}
+            for (kind, text), course_id in suggestions.items()
+        ]
+
+    def update(self, course_ids: Iterable[int]) -> None:
+        """Index the given courses again, once the index is built."""
+        course_ids = list(course_ids)
+        with self._lock:
+            if self._changed_during_build is not None:
+                self._changed_during_build.update(course_ids)
+            if self._loaded_at is None:
+                return
+        courses = self._fetch(Course.objects.filter(id__in=course_ids))
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for course_id in course_ids:
+                self._remove(course_id)
+            for course_id, title, teacher in courses:
+                self._add(course_id, title, teacher)
+
+    def remove(self, course_ids: Iterable[int]) -> None:
+        """Drop the given courses from the index."""
+        course_ids = list(course_ids)
+        with self._lock:
+            if self._changed_during_build is not None:
+                self._changed_during_build.update(course_ids)
+            for course_id in course_ids:
+                self._remove(course_id)
+
+    def invalidate(self) -> None:
+        """Build the index again on the next suggestion."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            loaded_at = self._loaded_at
+        if loaded_at is None:
+            # The first suggestions wait for the index
+            self._build(blocking=True)
+        elif timezone.now() - loaded_at >= self.max_age:
+            if not self._build_lock.locked():
+                threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self) -> None:
+        try:
+            self._build(blocking=False)
+        finally:
+            # The connection of the background thread
+            connection.close()
+
+    def _build(self, blocking: bool) -> None:
+        """Build the index, then swap it in and index the courses changed meanwhile."""
+        if not self._build_lock.acquire(blocking=blocking):
+            return
+        try:
+            with self._lock:
+                if blocking and self._loaded_at is not None:
+                    # Built by another request in the meantime
+                    return
+                self._changed_during_build = set()
+            started_at = timezone.now()
+            entries = []
+            courses = {}
+            for course_id, title, teacher in self._fetch(Course.objects.all()):
+                courses[course_id] = (title, teacher)
+                entries.extend(self._keys(course_id, title, teacher))
+            entries.sort()
+            with self._lock:
+                self._entries = entries
+                self._courses = courses
+                self._loaded_at = started_at
+                changed = self._changed_during_build
+        finally:
+            with self._lock:
+                self._changed_during_build = None
+            self._build_lock.release()
+        if changed:
+            self.update(changed)
+
+    def _add(self, course_id: int, title: str, teacher: str) -> None:
+        self._courses[course_id] = (title, teacher)
+        for entry in self._keys(course_id, title, teacher):
+            bisect.insort(self._entries, entry)
+
+    def _remove(self, course_id: int) -> None:
+        if course_id not in self._courses:
+            return
+        title, teacher = self._courses.pop(course_id)
+        for entry in self._keys(course_id, title, teacher):
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    @classmethod
+    def _keys(cls, course_id: int, title: str, teacher: str) -> set:
+        keys = set()
+        for kind, text in ((cls.TITLE, title), (cls.TEACHER, teacher)):
+            words = search_words(text)
+            keys.update(
+                (" ".join(words[start:]), course_id, kind)
+                for start in range(len(words))
+            )
+        return keys
+
+    @staticmethod
+    def _fetch(queryset) -> List[Tuple[int, str, str]]:
+        courses = queryset.values_list(
+            "id", "title", "teacher__user__first_name", "teacher__user__last_name"
+        )
+        return [
+            (course_id, title, f"{first_name} {last_name}")
+            for course_id, title, first_name, last_name in courses
+        ]
+
+
+course_suggestion_index = CourseSuggestionIndex(
+    max_age=settings.COURSE_SUGGESTION_MAX_AGE,
+    limit=settings.COURSE_SUGGESTION_LIMIT,
+)
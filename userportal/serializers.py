@@ -153,3 +153,14 @@ class UserSerializer(serializers.ModelSerializer):
             "user_type",
         ]
         read_only_fields = ["id", "username", "user_type"]
+
+
+class UserAutocompleteSerializer(serializers.ModelSerializer):
+    """Serializer for the users suggested while typing"""
+
+    full_name = serializers.CharField(source="get_full_name", read_only=True)
+
+    class Meta:
+        model = get_user_model()
+        fields = ["id", "username", "full_name", "user_type"]
+        read_only_fields = fields
@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+
+from userportal.models import AcademicTerm, Course
+from userportal.caches import academic_term_calendar
+from userportal.search import course_search_index, course_suggestion_index
+from userportal.repositories import UserRepository
+
+# Fields of the users that their search tokens are made from
+USER_SEARCH_FIELDS = {"username", "first_name", "last_name", "title", "email"}
+
+
+@receiver([post_save, post_delete], sender=AcademicTerm)
+def invalidate_academic_term_calendar(sender, **kwargs):
+    """Read the terms again once one is saved or deleted."""
+    academic_term_calendar.invalidate()
+    # Again after the commit, in case the terms were read in the meantime
+    transaction.on_commit(academic_term_calendar.invalidate)
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):
+    """Index the course again once it is saved."""
+    course_search_index.update([instance.id])
+    course_suggestion_index.update([instance.id])
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    """Drop the course from the search indexes once it is deleted."""
+    course_search_index.remove([instance.id])
+    course_suggestion_index.remove([instance.id])
+
+
+@receiver(post_save, sender=get_user_model())
+def index_teacher_courses(sender, instance, update_fields=None, **kwargs):
+    """Index the courses of a teacher again once their name may have changed."""
+    if update_fields and not {"first_name", "last_name"} & set(update_fields):
+        return
+    if instance.is_teacher():
+        course_ids = list(
+            Course.objects.filter(teacher__user=instance).values_list("id", flat=True)
+        )
+        course_search_index.update(course_ids)
+        course_suggestion_index.update(course_ids)
+
+
+@receiver(post_save, sender=get_user_model())
+def index_user_search_tokens(sender, instance, update_fields=None, **kwargs):
+    """Store the search tokens of the user again once they may have changed."""
+    if update_fields and not USER_SEARCH_FIELDS & set(update_fields):
+        return
+    UserRepository.index_search_tokens([instance])
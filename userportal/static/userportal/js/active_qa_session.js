@@ -12,6 +12,8 @@ const url = `ws://${hostName}/ws/course/${courseId}/live-qa-session/${roomName}/
 const MESSAGE_TYPE_CLOSE = "close.connection";
 const MESSAGE_TYPE_QUESTION = "question.message";
 const MESSAGE_TYPE_QUESTION_LIST = "question.list";
+const MESSAGE_TYPE_RATE_LIMITED = "error.rate_limited";
+const MESSAGE_TYPE_PRESENCE = "presence.update";
 const SESSION_TERMINATE_CODE = 4000;
 const UNAUTHORIZED_ACCESS_CODE = 4001;
 const MAX_RETRIES = 3;
@@ -26,13 +28,20 @@ class WebSocketClient {
     this.maxRetries = MAX_RETRIES;
     this.autoReconnectInterval = RECONNECT_INTERVAL;
     this.messageHandlers = new Map();
+    // Position of the last question received, sent back on reconnect
+    // so that the server only replays the questions posted since then
+    this.cursor = null;
+    this.replaying = false;
     this.toast = null;
     this.toastBody = null;
     this.initStatusToast();
   }
 
   connect() {
-    this.ws = new WebSocket(this.url);
+    const url = this.cursor
+      ? `${this.url}?cursor=${encodeURIComponent(this.cursor)}`
+      : this.url;
+    this.ws = new WebSocket(url);
     this.ws.onopen = () => {
       if (this.maxRetries !== MAX_RETRIES) {
         this.showConnectionStatus("WebSocket connection restored.");
@@ -58,10 +67,25 @@ class WebSocketClient {
     };
     this.ws.onmessage = (e) => {
       const data = JSON.parse(e.data);
+      this.updateCursor(data);
       this.triggerHandler("message", data);
     };
   }
 
+  updateCursor(data) {
+    if (data.type === MESSAGE_TYPE_QUESTION_LIST) {
+      const lastQuestion = data.questions[data.questions.length - 1];
+      if (lastQuestion) {
+        this.cursor = lastQuestion.cursor;
+      }
+      this.replaying = data.has_more;
+    } else if (data.cursor && !this.replaying) {
+      // Live questions can arrive while the history is being replayed.
+      // Keep the cursor on the replayed pages until the replay is complete.
+      this.cursor = data.cursor;
+    }
+  }
+
   reconnect() {
     if (this.maxRetries > 0) {
       this.showConnectionStatus("WebSocket connection lost. Reconnecting...");
@@ -140,20 +164,37 @@ client.addHandler("message", (data) => {
   } else if (data.type === MESSAGE_TYPE_QUESTION) {
     // Normal message
     createCard(data);
+  } else if (data.type === MESSAGE_TYPE_RATE_LIMITED) {
+    handleRateLimited(data);
+  } else if (data.type === MESSAGE_TYPE_PRESENCE) {
+    updateParticipantCount(data.count);
   }
 });
 
+function updateParticipantCount(count) {
+  // The count is only shown to the instructor
+  const countEl = document.getElementById("participant_count");
+  if (countEl) {
+    countEl.textContent = count;
+  }
+}
+
+function handleRateLimited(data) {
+  // The question was dropped by the server, so keep the form disabled
+  // until sending is allowed again
+  client.showConnectionStatus(data.message);
+  toggleFormElements(true);
+  setTimeout(() => toggleFormElements(false), data.retry_after * 1000);
+}
+
 function handleSessionEnd(data) {
   toggleFormElements(true);
   createCard(data);
 }
 
 function handleQuestionList(questions) {
-  const questionList = document.getElementById("question-list");
-  if (!questionList) {
-    return;
-  }
-  questionList.innerHTML = "";
+  // The history arrives in pages, each one following the previous page.
+  // On reconnect, only the questions missed while offline are received.
   questions.forEach(createCard);
 }
 
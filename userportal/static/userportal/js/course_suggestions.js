@@ -0,0 +1,50 @@
+// This script suggests course titles and teacher names in the course search
+// box while the keywords are typed.
+
+const SUGGESTION_DELAY = 150;
+
+const suggestionList = document.getElementById("course-suggestions");
+const keywordsInput = document.querySelector("input[list='course-suggestions']");
+let suggestionTimer = null;
+let suggestionController = null;
+
+// Replace the options of the datalist with the suggestions for the keywords
+async function fetchSuggestions(keywords) {
+  if (suggestionController) {
+    suggestionController.abort();
+  }
+  suggestionController = new AbortController();
+  const url = `${suggestionList.dataset.url}?q=${encodeURIComponent(keywords)}`;
+  try {
+    const response = await fetch(url, { signal: suggestionController.signal });
+    if (!response.ok) {
+      return;
+    }
+    const data = await response.json();
+    suggestionList.replaceChildren(
+      ...data.suggestions.map((suggestion) => {
+        const option = document.createElement("option");
+        option.value = suggestion.text;
+        option.label = suggestion.type === "teacher" ? "Teacher" : "Course";
+        return option;
+      })
+    );
+  } catch (e) {
+    // Aborted by a newer keystroke, or the network is unavailable
+  }
+}
+
+if (suggestionList && keywordsInput) {
+  keywordsInput.addEventListener("input", () => {
+    clearTimeout(suggestionTimer);
+    const keywords = keywordsInput.value.trim();
+    if (!keywords) {
+      suggestionList.replaceChildren();
+      return;
+    }
+    suggestionTimer = setTimeout(
+      () => fetchSuggestions(keywords),
+      SUGGESTION_DELAY
+    );
+  });
+}
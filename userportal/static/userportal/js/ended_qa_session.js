@@ -1,22 +1,104 @@
-// This script is used to update the date and time of the ended QA session
+// This script is used to update the date and time of the ended QA session,
+// and to load older questions page by page as the user scrolls down
 document.addEventListener("DOMContentLoaded", function () {
+  var options = {
+    year: "numeric",
+    month: "short",
+    day: "numeric",
+    hour: "2-digit",
+    minute: "2-digit",
+  };
+
+  function formatDateTime(element) {
+    const timestamp = element.getAttribute("data-timestamp");
+    element.textContent = `Posted on ${new Date(timestamp).toLocaleTimeString(
+      [],
+      options
+    )}`;
+  }
+
   function updateAllDateTimes() {
     const elements = document.getElementsByClassName("utc-timestamp");
     for (let element of elements) {
-      const timestamp = element.getAttribute("data-timestamp");
-      var options = {
-        year: "numeric",
-        month: "short",
-        day: "numeric",
-        hour: "2-digit",
-        minute: "2-digit",
-      };
-      element.textContent = `Posted on ${new Date(timestamp).toLocaleTimeString(
-        [],
-        options
-      )}`;
+      formatDateTime(element);
+    }
+  }
+
+  function createCard(question) {
+    const card = document.createElement("div");
+    card.className = "card mb-3";
+    const body = document.createElement("div");
+    body.className = "card-body";
+
+    const title = document.createElement("h5");
+    title.className = "card-title";
+    title.textContent = question.sender;
+    const timestamp = document.createElement("p");
+    timestamp.className = "text-muted small utc-timestamp";
+    timestamp.setAttribute("data-timestamp", question.timestamp);
+    formatDateTime(timestamp);
+    const text = document.createElement("p");
+    text.className = "card-text";
+    text.textContent = question.message;
+
+    body.append(title, timestamp, text);
+    card.appendChild(body);
+    return card;
+  }
+
+  function setupInfiniteScroll() {
+    const sentinel = document.getElementById("question-list-sentinel");
+    if (!sentinel) {
+      return;
     }
+    let loading = false;
+
+    async function loadNextPage(observer) {
+      if (loading) {
+        return;
+      }
+      loading = true;
+      try {
+        const url = new URL(sentinel.dataset.url, window.location.origin);
+        url.searchParams.set("cursor", sentinel.dataset.cursor);
+        const response = await fetch(url);
+        if (!response.ok) {
+          throw new Error(`Failed to load questions: ${response.status}`);
+        }
+        const data = await response.json();
+        // Only the new page is built, the rendered questions are left as they are
+        const fragment = document.createDocumentFragment();
+        data.questions.forEach((question) =>
+          fragment.appendChild(createCard(question))
+        );
+        sentinel.before(fragment);
+
+        if (data.next_cursor) {
+          sentinel.dataset.cursor = data.next_cursor;
+        } else {
+          observer.disconnect();
+          sentinel.remove();
+        }
+      } catch (error) {
+        console.error(error);
+        observer.disconnect();
+        sentinel.textContent = "Failed to load older questions.";
+      } finally {
+        loading = false;
+      }
+    }
+
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries.some((entry) => entry.isIntersecting)) {
+          loadNextPage(observer);
+        }
+      },
+      { rootMargin: "200px" }
+    );
+    observer.observe(sentinel);
   }
 
   updateAllDateTimes();
+  setupInfiniteScroll();
 });
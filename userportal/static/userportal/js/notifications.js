@@ -0,0 +1,50 @@
+// This script keeps the unread notification badge in the header up to date
+// through the notification WebSocket, without reloading the page.
+
+const NOTIFICATION_URL = `${
+  window.location.protocol === "https:" ? "wss" : "ws"
+}://${window.location.host}/ws/notifications/`;
+const MESSAGE_TYPE_NOTIFICATION = "notification.message";
+const MESSAGE_TYPE_NOTIFICATION_COUNT = "notification.count";
+const NOTIFICATION_UNAUTHORIZED_CODE = 4001;
+const NOTIFICATION_MAX_RETRIES = 3;
+const NOTIFICATION_RECONNECT_INTERVAL = 1000 * 5;
+
+const notificationBadge = document.getElementById("notification-badge");
+const notificationCount = document.getElementById("notification-count");
+
+// Show the number of unread notifications, or hide the badge if there is none
+function setUnreadCount(count) {
+  notificationCount.textContent = count;
+  notificationBadge.classList.toggle("d-none", count <= 0);
+}
+
+function connectNotifications(retries) {
+  const ws = new WebSocket(NOTIFICATION_URL);
+  ws.onopen = () => {
+    retries = NOTIFICATION_MAX_RETRIES;
+  };
+  ws.onmessage = (e) => {
+    const data = JSON.parse(e.data);
+    if (data.type === MESSAGE_TYPE_NOTIFICATION_COUNT) {
+      setUnreadCount(data.count);
+    } else if (data.type === MESSAGE_TYPE_NOTIFICATION) {
+      setUnreadCount(
+        parseInt(notificationCount.textContent, 10) + data.unread_delta
+      );
+    }
+  };
+  ws.onclose = (e) => {
+    // The count sent on reconnect covers the notifications missed meanwhile
+    if (e.code !== NOTIFICATION_UNAUTHORIZED_CODE && retries > 0) {
+      setTimeout(
+        () => connectNotifications(retries - 1),
+        NOTIFICATION_RECONNECT_INTERVAL
+      );
+    }
+  };
+}
+
+if (notificationBadge) {
+  connectNotifications(NOTIFICATION_MAX_RETRIES);
+}
@@ -1,12 +1,28 @@
-from typing import Type
+from datetime import timedelta
+from collections import Counter, defaultdict
+from typing import Iterable, Type
 from celery import shared_task
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from celery.utils.log import get_task_logger
 
+from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
+from django.db import DatabaseError, transaction
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 
 from userportal.models import *
-from userportal.repositories import AcademicTermRepository
+from userportal.repositories import (
+    AcademicTermRepository,
+    MaterialRepository,
+    NotificationRepository,
+    QAQuestionArchiveRepository,
+)
+from userportal.buffers import notification_read_buffer
+from userportal.publishers import NotificationPublisher
+from userportal.utils import chunked
 
 logger = get_task_logger(__name__)
 
@@ -20,9 +36,33 @@ def delete_qa_questions(room_name):
     A task to delete all questions in the the specified Q&A session.
     """
     QAQuestion.objects.filter(room_name=room_name).delete()
+    QAQuestionArchiveRepository.delete(room_name)
+    # The histories are cached by the consumers' processes, not this worker
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        async_to_sync(channel_layer.group_send)(
+            f"{LIVE_QA_PREFIX}_{room_name}", {"type": MESSAGE_TYPE_QUESTIONS_DELETED}
+        )
 
 
 @shared_task
+def archive_qa_questions(room_name):
+    """
+    A task to pack the questions of the specified ended Q&A session into its archive.
+    """
+    qa_session = QASession.objects.filter(room_name=room_name).first()
+    # The room is reactivated or deleted, so its questions are not archived
+    if not qa_session or not qa_session.is_ended():
+        return
+    count = QAQuestionArchiveRepository.archive(room_name)
+    logger.info(QA_QUESTIONS_ARCHIVED_MSG.format(count=count, room_name=room_name))
+
+
+@shared_task(
+    autoretry_for=(DatabaseError,),
+    retry_backoff=True,
+    max_retries=settings.NOTIFICATION_TASK_MAX_RETRIES,
+)
 def notify_students_of_live_qa_start(course_id):
     """
     A task to notify students when a live Q&A session starts.
@@ -34,40 +74,101 @@ def notify_students_of_live_qa_start(course_id):
         return
     message = LIVE_QA_START_NOTIFICATION_MSG.format(course_title=course.title)
     link_path = reverse("qa-session", args=[course.id])
+    # Each start of the session has a room name of its own
+    room_name = (
+        QASession.objects.filter(course=course)
+        .values_list("room_name", flat=True)
+        .first()
+    )
+    event_key = (
+        LIVE_QA_START_EVENT_KEY.format(room_name=room_name) if room_name else None
+    )
     send_notifications_to_currently_enrolled_students(
-        course, message, link_path, LIVE_QA_START_NOTIFICATION_LINK_TEXT
+        course,
+        message,
+        link_path,
+        LIVE_QA_START_NOTIFICATION_LINK_TEXT,
+        event_key=event_key,
     )
 
 
-@shared_task
-def notify_students_of_material_creation(course_id, material_id):
+def schedule_material_notification(course_id):
     """
-    A task to notify students when a new material is added to a course.
+    Schedule the notification of a material added to a course. The materials
+    added within MATERIAL_NOTIFICATION_DIGEST_WINDOW seconds of the first one
+    are notified together, by a single delayed task.
+    """
+    window = settings.MATERIAL_NOTIFICATION_DIGEST_WINDOW
+    if window <= 0:
+        notify_students_of_new_materials.delay(course_id)
+    # Only the first material of the window schedules the task
+    elif cache.add(
+        MATERIAL_DIGEST_CACHE_KEY.format(course_id=course_id), 1, 2 * window
+    ):
+        notify_students_of_new_materials.apply_async(args=[course_id], countdown=window)
+
+
+@shared_task(
+    autoretry_for=(DatabaseError,),
+    retry_backoff=True,
+    max_retries=settings.NOTIFICATION_TASK_MAX_RETRIES,
+)
+def notify_students_of_new_materials(course_id):
+    """
+    A task to notify students, in a single notification,
+    of the materials added to a course since the last one.
     """
+    # Materials added from now on schedule the next notification
+    cache.delete(MATERIAL_DIGEST_CACHE_KEY.format(course_id=course_id))
     try:
         course = Course.objects.get(id=course_id)
-        material = Material.objects.get(id=material_id)
     except Course.DoesNotExist:
         logger.error(ERR_DOES_NOT_EXIST.format(entity=f"Course with ID {course_id}"))
         return
-    except Material.DoesNotExist:
-        logger.error(
-            ERR_DOES_NOT_EXIST.format(entity=f"Material with ID {material_id}")
+    with transaction.atomic():
+        materials = MaterialRepository.claim_unnotified(course_id)
+        if not materials:
+            return
+        if len(materials) == 1:
+            message = MATERIAL_CREATED_NOTIFICATION_MSG.format(
+                material_title=materials[0][1], course_title=course.title
+            )
+        else:
+            message = MATERIAL_DIGEST_NOTIFICATION_MSG.format(
+                count=len(materials), course_title=course.title
+            )
+        link_path = reverse("material-list", args=[course.id])
+        send_notifications_to_currently_enrolled_students(
+            course,
+            message,
+            link_path,
+            MATERIAL_CREATED_NOTIFICATION_LINK_TEXT,
+            event_key=MATERIAL_CREATED_EVENT_KEY.format(material_id=materials[-1][0]),
         )
-        return
-    message = MATERIAL_CREATED_NOTIFICATION_MSG.format(
-        material_title=material.title, course_title=course.title
-    )
-    link_path = reverse("material-list", args=[course.id])
-    send_notifications_to_currently_enrolled_students(
-        course, message, link_path, MATERIAL_CREATED_NOTIFICATION_LINK_TEXT
-    )
 
 
 @shared_task
-def notify_teacher_of_new_enrollment(course_id, offering_id, student_username):
+def notify_students_of_material_creation(course_id, material_id):
+    """
+    A task to notify students when a new material is added to a course.
+    Kept for the tasks queued before digests: the material is notified
+    together with the others not notified yet.
+    """
+    notify_students_of_new_materials(course_id)
+
+
+@shared_task(
+    autoretry_for=(DatabaseError,),
+    retry_backoff=True,
+    max_retries=settings.NOTIFICATION_TASK_MAX_RETRIES,
+)
+def notify_teacher_of_new_enrollment(
+    course_id, offering_id, student_username, enrollment_id=None
+):
     """
     A task to create a notification for a teacher when a student enrolls in a course.
+    Each enrollment is notified once, so that enrolling again after unenrolling
+    is notified too. Tasks queued without the enrollment are not deduplicated.
     """
     try:
         course = Course.objects.select_related("teacher__user").get(id=course_id)
@@ -80,48 +181,103 @@ def notify_teacher_of_new_enrollment(course_id, offering_id, student_username):
     )
     link_path = reverse("enrolled-student-list", args=[course_id, offering_id])
     send_notifications(
-        [teacher], message, link_path, STUDENT_ENROLLED_NOTIFICATION_LINK_TEXT
+        [teacher.id],
+        message,
+        link_path,
+        STUDENT_ENROLLED_NOTIFICATION_LINK_TEXT,
+        event_key=(
+            STUDENT_ENROLLED_EVENT_KEY.format(enrollment_id=enrollment_id)
+            if enrollment_id
+            else None
+        ),
     )
 
 
 def send_notifications_to_currently_enrolled_students(
-    course, message, link_path, link_text
+    course, message, link_path, link_text, event_key=None
 ):
     """
-    Sends notifications to students currently enrolled in a course.
+    Sends a broadcast notification to students currently enrolled in a course.
+    A single row is written and a single push is made, whatever the number of students.
+    Nothing is sent if the event was already notified.
     """
     course_offering = CourseOffering.objects.filter(
         course=course, term=AcademicTermRepository.current()
     ).first()
-
     if course_offering:
-        users = AuthUser.objects.filter(
-            student_profile__enrollments__offering=course_offering
+        broadcast = NotificationRepository.create_broadcast(
+            course_offering, message, link_path, link_text, event_key
+        )
+        if broadcast is None:
+            logger.info(NOTIFICATION_EVENT_ALREADY_SENT_MSG.format(event_key=event_key))
+            return
+        # The clients are told once the broadcast can be read
+        transaction.on_commit(
+            lambda: NotificationPublisher.publish_to_offering(
+                course_offering.id, message, link_path, link_text
+            )
         )
-    else:
-        users = AuthUser.objects.none()
-    send_notifications(users, message, link_path, link_text)
 
 
 def send_notifications(
-    users: list[AuthUserType],
+    user_ids: Iterable[int],
     message: str,
     link_path: str = None,
     link_text: str = None,
-):
+    event_key: str = None,
+) -> int:
     """
-    Sends notifications to users
+    Sends notifications to users, inserted in batches of NOTIFICATION_BATCH_SIZE,
+    and pushes each batch to the connected clients of the users.
+    A failed batch is logged, and the following batches are still sent.
+    With an event key, the users already notified of the event are skipped, and
+    the error of a failed batch is raised at the end so that the task is retried.
+    Returns the number of notifications created.
     """
-    notifications = [
-        Notification(
-            user=user, message=message, link_path=link_path, link_text=link_text
+    created = 0
+    error = None
+    for index, batch in enumerate(chunked(user_ids, settings.NOTIFICATION_BATCH_SIZE)):
+        if event_key:
+            notified = set(
+                Notification.objects.filter(
+                    event_key=event_key, user_id__in=batch
+                ).values_list("user_id", flat=True)
+            )
+            batch = [user_id for user_id in batch if user_id not in notified]
+            if not batch:
+                continue
+        notifications = [
+            Notification(
+                user_id=user_id,
+                message=message,
+                link_path=link_path,
+                link_text=link_text,
+                event_key=event_key,
+            )
+            for user_id in batch
+        ]
+        try:
+            Notification.objects.bulk_create(notifications)
+        except DatabaseError as e:
+            logger.error(
+                ERR_FAILED_TO_SEND_NOTIFICATION.format(
+                    batch=index, count=len(batch), exception=str(e)
+                ),
+                exc_info=True,
+            )
+            error = e
+            continue
+        created += len(notifications)
+        NotificationRepository.adjust_unread_counts(Counter(batch))
+        NotificationPublisher.publish_to_users(batch, message, link_path, link_text)
+        logger.info(
+            NOTIFICATION_BATCH_SENT_MSG.format(
+                batch=index, count=len(batch), total=created
+            )
         )
-        for user in users
-    ]
-    try:
-        Notification.objects.bulk_create(notifications)
-    except Exception as e:
-        logger.error(ERR_FAILED_TO_SEND_NOTIFICATION.format(exception=str(e)))
+    if event_key and error:
+        raise error
+    return created
 
 
 @shared_task
@@ -129,4 +285,77 @@ def mark_notifications_as_read(notification_ids):
     """
     A task to mark a notification as read.
     """
-    Notification.objects.filter(id__in=notification_ids).update(is_read=True)
+    NotificationRepository.mark_as_read(notification_ids)
+
+
+@shared_task
+def mark_broadcast_notifications_as_read(user_id, broadcast_ids):
+    """
+    A task to mark broadcast notifications as read by a user.
+    """
+    NotificationRepository.mark_broadcasts_as_read(user_id, broadcast_ids)
+
+
+def schedule_notification_read_flush():
+    """
+    Schedule a flush of the logged read marks if the periodic task has not run
+    for twice its interval, e.g. without Celery beat. The flush runs
+    NOTIFICATION_READ_FLUSH_INTERVAL seconds later, for the reads logged meanwhile.
+    """
+    interval = settings.NOTIFICATION_READ_FLUSH_INTERVAL
+    if notification_read_buffer.claim_flush(2 * interval):
+        flush_notification_reads.apply_async(countdown=interval)
+
+
+@shared_task
+def flush_notification_reads():
+    """
+    A periodic task to mark as read the notifications logged by the list view.
+    Personal notifications are updated in batches of NOTIFICATION_BATCH_SIZE.
+    """
+    entries = notification_read_buffer.drain()
+    personal_ids = set()
+    broadcast_ids = defaultdict(set)
+    for user_id, personal, broadcast in entries:
+        personal_ids.update(personal)
+        broadcast_ids[user_id].update(broadcast)
+    for batch in chunked(sorted(personal_ids), settings.NOTIFICATION_BATCH_SIZE):
+        NotificationRepository.mark_as_read(batch)
+    for user_id, ids in broadcast_ids.items():
+        if ids:
+            NotificationRepository.mark_broadcasts_as_read(user_id, ids)
+    logger.info(
+        NOTIFICATION_READS_FLUSHED_MSG.format(
+            entries=len(entries),
+            personal=len(personal_ids),
+            broadcast=sum(len(ids) for ids in broadcast_ids.values()),
+        )
+    )
+
+
+@shared_task
+def purge_expired_notifications():
+    """
+    A periodic task to delete the notifications past their retention period.
+    """
+    now = timezone.now()
+    count = NotificationRepository.purge_expired(
+        read_before=now - timedelta(days=settings.NOTIFICATION_READ_RETENTION_DAYS),
+        unread_before=now - timedelta(days=settings.NOTIFICATION_UNREAD_RETENTION_DAYS),
+        batch_size=settings.NOTIFICATION_PURGE_BATCH_SIZE,
+        archive=settings.NOTIFICATION_ARCHIVE_ENABLED,
+    )
+    logger.info(EXPIRED_NOTIFICATIONS_PURGED_MSG.format(count=count))
+
+
+@shared_task
+def reconcile_unread_notification_counts():
+    """
+    A periodic task to correct the cached unread notification counts.
+    """
+    # The window covers two intervals, so that runs overlap
+    since = timezone.now() - timedelta(
+        seconds=2 * settings.UNREAD_NOTIFICATION_RECONCILE_INTERVAL
+    )
+    corrected = NotificationRepository.reconcile_unread_counts(since)
+    logger.info(UNREAD_NOTIFICATION_COUNTS_RECONCILED_MSG.format(count=corrected))
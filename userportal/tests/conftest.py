@@ -0,0 +1,28 @@
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from userportal.caches import academic_term_calendar
+from userportal.search import course_suggestion_index
+from userportal.presence import room_presence
+from userportal.ratelimits import room_rate_limiter
+
+
+@pytest.fixture(autouse=True, scope="session")
+def local_cache():
+    """Use a per-process cache in tests, so that clearing it never flushes the shared Redis cache."""
+    with override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    ):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Clear the caches, rate limits and presence counts before each test, so that state does not leak between tests."""
+    cache.clear()
+    academic_term_calendar.invalidate()
+    course_suggestion_index.invalidate()
+    room_rate_limiter.reset()
+    room_presence.reset()
+    yield
@@ -220,3 +220,74 @@ class UserListTest(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["count"], 2)
+
+    def test_user_list_filtered_by_username(self):
+        """Test that the user list is filtered by the start of the usernames."""
+        student = UserFactory.create(
+            user_type=AuthUser.UserType.STUDENT, username="jane.doe"
+        )
+        self.client.force_authenticate(user=self.teacher)
+        for username in ["jane.d", "Doe"]:
+            response = self.client.get(self.url, {"username": username})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                [user["id"] for user in response.data["results"]], [student.pk]
+            )
+        response = self.client.get(self.url, {"username": "ane"})
+        self.assertEqual(response.data["count"], 0)
+
+
+# UserAutocompleteView
+# /api/v1/users/autocomplete/	userportal.apis.UserAutocompleteView	api:user-autocomplete
+class UserAutocompleteTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("api:user-autocomplete")
+        cls.student = UserFactory.create(
+            user_type=AuthUser.UserType.STUDENT,
+            username="s1",
+            first_name="Emily",
+            last_name="Smith",
+        )
+        cls.teacher = UserFactory.create(
+            user_type=AuthUser.UserType.TEACHER,
+            username="t1",
+            first_name="Emma",
+            last_name="Stone",
+        )
+        cls.admin = UserFactory.create(
+            is_staff=True, first_name="Emil"
+        )  # Not included in the API response
+
+    def test_user_autocomplete_forbidden_for_students(self):
+        """Test that students cannot get user suggestions."""
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url, {"q": "em"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_autocomplete(self):
+        """Test that users having a word starting with each word typed are suggested."""
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url, {"q": "em"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            [
+                {
+                    "id": self.student.pk,
+                    "username": "s1",
+                    "full_name": self.student.get_full_name(),
+                    "user_type": AuthUser.UserType.STUDENT,
+                },
+                {
+                    "id": self.teacher.pk,
+                    "username": "t1",
+                    "full_name": self.teacher.get_full_name(),
+                    "user_type": AuthUser.UserType.TEACHER,
+                },
+            ],
+        )
+        response = self.client.get(self.url, {"q": "emma st"})
+        self.assertEqual([user["id"] for user in response.data], [self.teacher.pk])
+        response = self.client.get(self.url)
+        self.assertEqual(response.data, [])
@@ -0,0 +1,122 @@
+import time
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.core.cache import cache
+from django.utils import timezone
+
+from userportal.models import *
+from userportal.buffers import QAQuestionBuffer, NotificationReadBuffer
+
+
+class QAQuestionBufferTest(TestCase):
+    """Test cases for the QAQuestionBuffer class."""
+
+    def setUp(self):
+        self.buffer = QAQuestionBuffer(max_size=3, flush_interval=60)
+
+    def create_question(self, room_name: str = "room1", text: str = "hello"):
+        return QAQuestion(
+            room_name=room_name, text=text, sender="user1", timestamp=timezone.now()
+        )
+
+    def test_add_until_max_size(self):
+        self.assertFalse(self.buffer.add(self.create_question()))
+        self.assertFalse(self.buffer.add(self.create_question()))
+        self.assertFalse(self.buffer.add(self.create_question(room_name="room2")))
+        self.assertTrue(self.buffer.add(self.create_question()))
+        self.assertFalse(QAQuestion.objects.exists())
+        self.assertEqual(len(self.buffer.pending("room1")), 3)
+
+    def test_add_after_flush_interval(self):
+        self.buffer.flush_interval = 0
+        self.assertTrue(self.buffer.add(self.create_question()))
+        self.assertFalse(self.buffer.is_due("room2"))
+
+    def test_flush(self):
+        self.buffer.add(self.create_question(text="first"))
+        self.buffer.add(self.create_question(text="second"))
+        self.buffer.add(self.create_question(room_name="room2"))
+
+        # Test case 1: Flush a single room
+        self.assertEqual(self.buffer.flush("room1"), 2)
+        self.assertEqual(QAQuestion.objects.filter(room_name="room1").count(), 2)
+        self.assertEqual(self.buffer.pending("room1"), [])
+        self.assertEqual(len(self.buffer.pending("room2")), 1)
+
+        # Test case 2: Flush every room
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(QAQuestion.objects.count(), 3)
+        self.assertEqual(
+            self.buffer.stats(),
+            {"buffered": 3, "flushed": 3, "dropped": 0, "pending": 0},
+        )
+
+    def test_flush_failure_drops_questions(self):
+        self.buffer.add(self.create_question())
+        with patch.object(
+            QAQuestion.objects, "bulk_create", side_effect=Exception("DB error")
+        ):
+            self.assertEqual(self.buffer.flush("room1"), 0)
+        self.assertEqual(self.buffer.pending("room1"), [])
+        self.assertEqual(self.buffer.stats()["dropped"], 1)
+
+
+class NotificationReadBufferTest(TestCase):
+    """Test cases for the NotificationReadBuffer class."""
+
+    def setUp(self):
+        cache.clear()
+        self.buffer = NotificationReadBuffer(prefix="test_reads:", timeout=60)
+
+    def test_add_and_drain(self):
+        self.assertTrue(self.buffer.add(1, [3, 2], []))
+        self.assertTrue(self.buffer.add(2, [], [5]))
+        # The same notifications are logged once
+        self.assertFalse(self.buffer.add(1, [2, 3], []))
+
+        self.assertEqual(self.buffer.drain(), [(1, [2, 3], []), (2, [], [5])])
+        self.assertEqual(self.buffer.drain(), [])
+
+    def test_drain_waits_for_missing_entry(self):
+        self.buffer.add(1, [1], [])
+        self.buffer.add(1, [2], [])
+        self.buffer.add(1, [3], [])
+        self.buffer.add(1, [4], [])
+        # The second entry is taken but not written yet
+        entry = cache.get("test_reads:2")
+        cache.delete("test_reads:2")
+
+        self.assertEqual(self.buffer.drain(), [(1, [1], [])])
+        # The entries after the missing one are kept until it is written
+        self.assertEqual(self.buffer.drain(), [])
+        cache.set("test_reads:2", entry)
+        self.assertEqual(
+            self.buffer.drain(), [(1, [2], []), (1, [3], []), (1, [4], [])]
+        )
+
+        # A sequence whose entry was never written is skipped after a while
+        self.buffer.add(1, [5], [])
+        self.buffer.add(1, [6], [])
+        cache.delete("test_reads:5")
+        self.assertEqual(self.buffer.drain(), [])
+        later = time.time() + NotificationReadBuffer.STALL_TIMEOUT
+        with patch("userportal.buffers.time.time", return_value=later):
+            self.assertEqual(self.buffer.drain(), [(1, [6], [])])
+
+    def test_concurrent_drains_take_entries_once(self):
+        self.buffer.add(1, [1], [])
+        # Another drain is running
+        cache.add("test_reads:draining", 1)
+        self.assertEqual(self.buffer.drain(), [])
+        cache.delete("test_reads:draining")
+        self.assertEqual(self.buffer.drain(), [(1, [1], [])])
+
+    def test_claim_flush(self):
+        # Nothing drained yet: a single caller claims the flush
+        self.assertTrue(self.buffer.claim_flush(20))
+        self.assertFalse(self.buffer.claim_flush(20))
+        cache.clear()
+        # A recent drain means the periodic task is running
+        self.buffer.drain()
+        self.assertFalse(self.buffer.claim_flush(20))
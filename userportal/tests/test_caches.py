@@ -0,0 +1,164 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from userportal.models import *
+from userportal.caches import QAQuestionCache, AcademicTermCalendar
+from userportal.tests.model_factories import AcademicTermFactory
+
+
+class QAQuestionCacheTest(SimpleTestCase):
+    """Test cases for the QAQuestionCache class."""
+
+    def setUp(self):
+        self.cache = QAQuestionCache(max_rooms=2, max_questions=3)
+        self.now = timezone.now()
+
+    def create_questions(self, count: int, room_name: str = "room1"):
+        return [
+            QAQuestion(
+                id=i + 1,
+                room_name=room_name,
+                text=f"question {i}",
+                sender="user1",
+                timestamp=self.now + timezone.timedelta(seconds=i),
+            )
+            for i in range(count)
+        ]
+
+    def test_fetch_after_uncached_room(self):
+        self.assertIsNone(self.cache.fetch_after("room1", None, 10))
+        # A room being loaded is not served yet
+        self.cache.begin_load("room1")
+        self.assertIsNone(self.cache.fetch_after("room1", None, 10))
+        self.assertFalse(self.cache.is_loaded("room1"))
+
+    def test_fetch_after(self):
+        questions = self.create_questions(3)
+        self.cache.load("room1", questions, complete=True)
+
+        # Test case 1: Fetch from the beginning in pages
+        self.assertEqual(
+            self.cache.fetch_after("room1", None, 2), (questions[:2], True)
+        )
+        # Test case 2: Fetch after a cursor
+        cursor = (questions[0].timestamp, questions[0].id)
+        self.assertEqual(
+            self.cache.fetch_after("room1", cursor, 10), (questions[1:], False)
+        )
+
+    def test_trim_to_max_questions(self):
+        questions = self.create_questions(5)
+        self.cache.load("room1", questions, complete=True)
+        # The oldest questions are left out, so a full replay is not possible
+        self.assertIsNone(self.cache.fetch_after("room1", None, 10))
+        # A cursor older than the cached history cannot be answered either
+        cursor = (questions[0].timestamp, questions[0].id)
+        self.assertIsNone(self.cache.fetch_after("room1", cursor, 10))
+        cursor = (questions[2].timestamp, questions[2].id)
+        self.assertEqual(
+            self.cache.fetch_after("room1", cursor, 10), (questions[3:], False)
+        )
+
+    def test_add_message(self):
+        self.cache.load("room1", [], complete=True)
+        timestamp = self.now.isoformat()
+        # The same question received by several consumers is cached once
+        self.cache.add_message("room1", "hello", "user1", timestamp)
+        self.cache.add_message("room1", "hello", "user1", timestamp)
+        # Questions of uncached rooms are ignored
+        self.cache.add_message("room2", "hello", "user1", timestamp)
+
+        questions, has_more = self.cache.fetch_after("room1", None, 10)
+        self.assertEqual([q.text for q in questions], ["hello"])
+        self.assertEqual(questions[0].timestamp, self.now)
+        self.assertEqual(self.cache.stats(), {"rooms": 1, "questions": 1})
+
+    def test_add_message_while_loading(self):
+        self.cache.begin_load("room1")
+        self.cache.add_message("room1", "live", "user1", self.now.isoformat())
+        questions = self.create_questions(1)
+        questions[0].timestamp = self.now - timezone.timedelta(seconds=1)
+        self.cache.load("room1", questions, complete=True)
+        questions, _ = self.cache.fetch_after("room1", None, 10)
+        self.assertEqual([q.text for q in questions], ["question 0", "live"])
+
+    def test_evict_least_recently_used_room(self):
+        self.cache.load("room1", [], complete=True)
+        self.cache.load("room2", [], complete=True)
+        # Use room1, so that room2 becomes the least recently used room
+        self.cache.fetch_after("room1", None, 10)
+        self.cache.load("room3", [], complete=True)
+        self.assertTrue(self.cache.is_loaded("room1"))
+        self.assertFalse(self.cache.is_loaded("room2"))
+        self.assertTrue(self.cache.is_loaded("room3"))
+
+    def test_invalidate(self):
+        self.cache.load("room1", self.create_questions(1), complete=True)
+        self.cache.invalidate("room1")
+        self.assertFalse(self.cache.is_loaded("room1"))
+
+    def test_room_is_removed_with_its_last_subscriber(self):
+        self.cache.subscribe("room1")
+        self.cache.subscribe("room1")
+        self.cache.load("room1", self.create_questions(1), complete=True)
+        self.cache.unsubscribe("room1")
+        self.assertTrue(self.cache.is_loaded("room1"))
+        # Questions of the room no longer reach the cache, so it is stale
+        self.cache.unsubscribe("room1")
+        self.assertFalse(self.cache.is_loaded("room1"))
+
+
+class AcademicTermCalendarTest(TestCase):
+    """Test cases for the AcademicTermCalendar class."""
+
+    def setUp(self):
+        self.max_age = timedelta(days=30)
+        self.calendar = AcademicTermCalendar(max_age=self.max_age.total_seconds())
+        self.now = timezone.now()
+        self.previous_term = self.create_term(-20, -10)
+        self.current_term = self.create_term(-5, 5)
+        self.next_term = self.create_term(10, 20)
+
+    def create_term(self, start_days: int, end_days: int) -> AcademicTerm:
+        return AcademicTermFactory.create(
+            start_datetime=self.now + timedelta(days=start_days),
+            end_datetime=self.now + timedelta(days=end_days),
+        )
+
+    def at(self, moment):
+        return patch("userportal.caches.timezone.now", return_value=moment)
+
+    def test_terms_are_read_once(self):
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.assertEqual(self.calendar.current(), self.current_term)
+                self.assertEqual(self.calendar.next(), self.next_term)
+                self.assertEqual(self.calendar.previous(), self.previous_term)
+
+    def test_terms_change_at_boundaries(self):
+        self.calendar.current()
+        end = self.current_term.end_datetime
+        with self.assertNumQueries(0):
+            with self.at(end):
+                self.assertEqual(self.calendar.current(), self.current_term)
+            with self.at(end + timedelta(microseconds=1)):
+                self.assertIsNone(self.calendar.current())
+                self.assertEqual(self.calendar.previous(), self.current_term)
+            with self.at(self.next_term.start_datetime):
+                self.assertEqual(self.calendar.current(), self.next_term)
+                self.assertIsNone(self.calendar.next())
+
+    def test_terms_are_read_again_when_saved(self):
+        self.assertEqual(self.calendar.next(), self.next_term)
+        self.calendar.invalidate()
+        self.next_term.delete()
+        self.assertIsNone(self.calendar.next())
+
+    def test_terms_are_read_again_after_max_age(self):
+        self.calendar.current()
+        with self.at(timezone.now() + self.max_age):
+            with self.assertNumQueries(1):
+                self.calendar.current()
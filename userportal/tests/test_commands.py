@@ -0,0 +1,29 @@
+import pytest
+from io import StringIO
+
+from django.core.management import call_command
+
+from userportal.models import *
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_live_qa():
+    """Test that the benchmark reports its results and removes its temporary data."""
+    out = StringIO()
+    call_command(
+        "benchmark_live_qa",
+        clients=3,
+        senders=1,
+        rate=10,
+        duration=0.3,
+        stdout=out,
+    )
+    output = out.getvalue()
+    assert "Connect latency: p50" in output
+    assert "Fan-out latency: p50" in output
+    assert "Questions sent: 3, rate limited: 0" in output
+    assert "Messages delivered: 9 of 9" in output
+    assert "DB queries per question:" in output
+    assert not Course.objects.exists()
+    assert not PortalUser.objects.exists()
+    assert not QAQuestion.objects.exists()
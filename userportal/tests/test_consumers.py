@@ -1,6 +1,8 @@
 import pytest
 from typing import Type
+from unittest.mock import AsyncMock, patch
 from channels.routing import URLRouter
+from channels.layers import get_channel_layer
 from channels.testing import WebsocketCommunicator
 
 from django.urls import path
@@ -8,6 +10,10 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 
 from userportal.consumers import *
+from userportal.tasks import (
+    send_notifications,
+    send_notifications_to_currently_enrolled_students,
+)
 from userportal.tests.model_factories import *
 
 # Get the auth user model
@@ -35,7 +41,7 @@ def active_qa_session_with_unenrolled_student_fixture(db):
 
 
 async def setup_communicator(
-    qa_session: QASession, user: AuthUserType = None
+    qa_session: QASession, user: AuthUserType = None, cursor: str = None
 ) -> WebsocketCommunicator:
     """Setup a WebSocket communicator for the QA session."""
     course = qa_session.course
@@ -50,6 +56,8 @@ async def setup_communicator(
         ]
     )
     url = f"/ws/course/{course.id}/live-qa-session/{room_name}/"
+    if cursor:
+        url += f"?cursor={cursor}"
     communicator = WebsocketCommunicator(application, url)
     communicator.scope["user"] = request_user
     return communicator
@@ -60,7 +68,11 @@ async def connect_and_get_questions(communicator) -> None:
     connected, _ = await communicator.connect()
     assert connected, "WebSocket connection failed"
     response = await communicator.receive_json_from()
-    expected_response = {"type": MESSAGE_TYPE_QUESTION_LIST, "questions": []}
+    expected_response = {
+        "type": MESSAGE_TYPE_QUESTION_LIST,
+        "questions": [],
+        "has_more": False,
+    }
     assert response == expected_response
 
 
@@ -133,3 +145,346 @@ async def test_deny_connect_for_unauthenticated_user(
     expected_response = {"type": "websocket.close", "code": UNAUTHORIZED_ACCESS_CODE}
     assert response == expected_response
     await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_buffered_questions_are_saved_on_disconnect(active_qa_session_fixture):
+    """Test that buffered questions are shared with new clients and saved on disconnect."""
+    communicator = await setup_communicator(active_qa_session_fixture)
+    await connect_and_get_questions(communicator)
+    await communicator.send_json_to({"message": "hello", "sender": "user1"})
+    await communicator.receive_json_from()
+
+    # A client joining before the flush still receives the buffered question
+    other_communicator = await setup_communicator(active_qa_session_fixture)
+    connected, _ = await other_communicator.connect()
+    assert connected
+    response = await other_communicator.receive_json_from()
+    assert [q["message"] for q in response["questions"]] == ["hello"]
+    await other_communicator.disconnect()
+
+    await communicator.disconnect()
+    room_name = active_qa_session_fixture.room_name
+    questions = await database_sync_to_async(list)(
+        QAQuestion.objects.filter(room_name=room_name)
+    )
+    assert [q.text for q in questions] == ["hello"]
+
+
+@pytest.fixture
+def active_qa_session_with_questions_fixture(db):
+    """Create an active QA session with three questions posted one second apart."""
+    qa_session = QASessionFactory.create()
+    now = timezone.now()
+    questions = [
+        QAQuestionFactory.create(
+            room_name=qa_session.room_name,
+            text=f"question {i}",
+            timestamp=now - timezone.timedelta(seconds=3 - i),
+        )
+        for i in range(3)
+    ]
+    return qa_session, questions
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_replay_history_in_pages(
+    active_qa_session_with_questions_fixture, settings
+):
+    """Test that the question history is sent in pages of bounded size."""
+    settings.LIVE_QA_HISTORY_PAGE_SIZE = 2
+    qa_session, _ = active_qa_session_with_questions_fixture
+    communicator = await setup_communicator(qa_session)
+    connected, _ = await communicator.connect()
+    assert connected
+    first_page = await communicator.receive_json_from()
+    assert [q["message"] for q in first_page["questions"]] == [
+        "question 0",
+        "question 1",
+    ]
+    assert first_page["has_more"] is True
+    second_page = await communicator.receive_json_from()
+    assert [q["message"] for q in second_page["questions"]] == ["question 2"]
+    assert second_page["has_more"] is False
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_replay_history_after_cursor(active_qa_session_with_questions_fixture):
+    """Test that a reconnecting client only receives the questions it has not seen."""
+    qa_session, questions = active_qa_session_with_questions_fixture
+    cursor = encode_cursor(questions[0].timestamp, questions[0].id)
+    communicator = await setup_communicator(qa_session, cursor=cursor)
+    connected, _ = await communicator.connect()
+    assert connected
+    response = await communicator.receive_json_from()
+    assert [q["message"] for q in response["questions"]] == [
+        "question 1",
+        "question 2",
+    ]
+    assert response["questions"][-1]["cursor"] == encode_cursor(
+        questions[2].timestamp, questions[2].id
+    )
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_history_is_served_from_cache(active_qa_session_with_questions_fixture):
+    """Test that the question history is read once and kept up to date by the fan-out."""
+    qa_session, _ = active_qa_session_with_questions_fixture
+    communicator = await setup_communicator(qa_session)
+    connected, _ = await communicator.connect()
+    assert connected
+    await communicator.receive_json_from()
+    assert qa_question_cache.is_loaded(qa_session.room_name)
+    await communicator.send_json_to({"message": "live", "sender": "user1"})
+    await communicator.receive_json_from()
+
+    # Questions deleted from the database are still served from the cache
+    await database_sync_to_async(
+        QAQuestion.objects.filter(room_name=qa_session.room_name).delete
+    )()
+    other_communicator = await setup_communicator(qa_session)
+    connected, _ = await other_communicator.connect()
+    assert connected
+    response = await other_communicator.receive_json_from()
+    assert [q["message"] for q in response["questions"]] == [
+        "question 0",
+        "question 1",
+        "question 2",
+        "live",
+    ]
+    await other_communicator.disconnect()
+    await communicator.disconnect()
+    # The history is not kept once no consumer receives the questions of the room
+    assert not qa_question_cache.is_loaded(qa_session.room_name)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_history_is_dropped_when_questions_are_deleted(
+    active_qa_session_with_questions_fixture,
+):
+    """Test that the questions.deleted event drops the cached history of the room."""
+    qa_session, _ = active_qa_session_with_questions_fixture
+    communicator = await setup_communicator(qa_session)
+    connected, _ = await communicator.connect()
+    assert connected
+    await communicator.receive_json_from()
+    assert qa_question_cache.is_loaded(qa_session.room_name)
+    await get_channel_layer().group_send(
+        f"{LIVE_QA_PREFIX}_{qa_session.room_name}",
+        {"type": MESSAGE_TYPE_QUESTIONS_DELETED},
+    )
+    assert await communicator.receive_nothing() is True
+    assert not qa_question_cache.is_loaded(qa_session.room_name)
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_session_state_is_checked_once(active_qa_session_fixture):
+    """Test that the session state is read on connect and updated by close.connection."""
+    communicator = await setup_communicator(active_qa_session_fixture)
+    with patch.object(
+        QASessionConsumer, "is_qa_session_ended", AsyncMock(return_value=False)
+    ) as mock_is_ended:
+        await connect_and_get_questions(communicator)
+        for message in ["first", "second"]:
+            await communicator.send_json_to({"message": message, "sender": "user1"})
+            response = await communicator.receive_json_from()
+            assert response["message"] == message
+        mock_is_ended.assert_awaited_once()
+
+        # Messages are ignored once the session has ended
+        timestamp = timezone.now()
+        await get_channel_layer().group_send(
+            f"{LIVE_QA_PREFIX}_{active_qa_session_fixture.room_name}",
+            build_question_event(MESSAGE_TYPE_CLOSE, "bye", "System", timestamp),
+        )
+        response = await communicator.receive_json_from()
+        assert response["type"] == MESSAGE_TYPE_CLOSE
+        response = await communicator.receive_output()
+        assert response == {"type": "websocket.close", "code": SESSION_TERMINATE_CODE}
+        await communicator.send_json_to({"message": "late", "sender": "user1"})
+        assert await communicator.receive_nothing() is True
+        mock_is_ended.assert_awaited_once()
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_permission_is_cached(active_qa_session_fixture):
+    """Test that the permission to join is cached per user and course."""
+    course = active_qa_session_fixture.course
+    cache_key = LIVE_QA_PERMISSION_CACHE_KEY.format(
+        user_id=course.teacher.user.pk, course_id=course.id
+    )
+    communicator = await setup_communicator(active_qa_session_fixture)
+    await connect_and_get_questions(communicator)
+    await communicator.disconnect()
+    assert await database_sync_to_async(cache.get)(cache_key) is True
+
+    # The cached result is used on the next connection
+    await database_sync_to_async(cache.set)(cache_key, False)
+    communicator = await setup_communicator(active_qa_session_fixture)
+    await communicator.connect()
+    response = await communicator.receive_output()
+    assert response == {"type": "websocket.close", "code": UNAUTHORIZED_ACCESS_CODE}
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_forward_pre_serialized_frame(active_qa_session_fixture):
+    """Test that consumers forward the frame serialized by the sender untouched."""
+    communicator = await setup_communicator(active_qa_session_fixture)
+    await connect_and_get_questions(communicator)
+    event = build_question_event(
+        MESSAGE_TYPE_QUESTION, "hello", "user1", timezone.now()
+    )
+    await get_channel_layer().group_send(
+        f"{LIVE_QA_PREFIX}_{active_qa_session_fixture.room_name}", event
+    )
+    assert await communicator.receive_from() == event["frame"]
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_connection_rate_limit(active_qa_session_fixture, settings):
+    """Test that messages over the rate of the connection are dropped with an error frame."""
+    settings.LIVE_QA_CONNECTION_RATE_LIMIT_BURST = 2
+    settings.LIVE_QA_CONNECTION_RATE_LIMIT = 0.1
+    communicator = await setup_communicator(active_qa_session_fixture)
+    await connect_and_get_questions(communicator)
+
+    for i in range(3):
+        await communicator.send_json_to({"message": f"question{i}", "sender": "user1"})
+    # The error frame is sent directly, so it may arrive before the fan-out
+    responses = [await communicator.receive_json_from() for _ in range(3)]
+    questions = [r["message"] for r in responses if r["type"] == MESSAGE_TYPE_QUESTION]
+    errors = [r for r in responses if r["type"] == MESSAGE_TYPE_RATE_LIMITED]
+    assert questions == ["question0", "question1"]
+    assert len(errors) == 1 and errors[0]["retry_after"] > 0
+    assert await communicator.receive_nothing()
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_room_rate_limit(active_qa_session_fixture, settings):
+    """Test that the rate limit of the room is shared by its connections."""
+    settings.LIVE_QA_CONNECTION_RATE_LIMIT_BURST = 1
+    settings.LIVE_QA_CONNECTION_RATE_LIMIT = 0.1
+    communicator1 = await setup_communicator(active_qa_session_fixture)
+    communicator2 = await setup_communicator(active_qa_session_fixture)
+    await connect_and_get_questions(communicator1)
+    await connect_and_get_questions(communicator2)
+
+    with patch.object(room_rate_limiter, "capacity", 1), patch.object(
+        room_rate_limiter, "refill_rate", 0.1
+    ):
+        await communicator1.send_json_to({"message": "question1", "sender": "user1"})
+        response = await communicator1.receive_json_from()
+        assert response["type"] == MESSAGE_TYPE_QUESTION
+        response = await communicator2.receive_json_from()
+        assert response["type"] == MESSAGE_TYPE_QUESTION
+
+        # The other connection has tokens left, but the room does not
+        await communicator2.send_json_to({"message": "question2", "sender": "user2"})
+        response = await communicator2.receive_json_from()
+        assert response["type"] == MESSAGE_TYPE_RATE_LIMITED
+        assert await communicator1.receive_nothing()
+
+    # The message dropped by the room did not cost the connection its token
+    room_rate_limiter.reset()
+    await communicator2.send_json_to({"message": "question3", "sender": "user2"})
+    response = await communicator2.receive_json_from()
+    assert response["type"] == MESSAGE_TYPE_QUESTION
+    await communicator1.receive_json_from()
+
+    await communicator1.disconnect()
+    await communicator2.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_presence_update(active_qa_session_fixture):
+    """Test that the number of participants is broadcast once for several joins."""
+    with patch.object(room_presence, "broadcast_interval", 0.1):
+        communicator1 = await setup_communicator(active_qa_session_fixture)
+        communicator2 = await setup_communicator(active_qa_session_fixture)
+        await connect_and_get_questions(communicator1)
+        await connect_and_get_questions(communicator2)
+
+        expected_response = {"type": MESSAGE_TYPE_PRESENCE, "count": 2}
+        assert await communicator1.receive_json_from() == expected_response
+        assert await communicator2.receive_json_from() == expected_response
+        assert await communicator1.receive_nothing(timeout=0.2)
+
+        await communicator2.disconnect()
+        expected_response = {"type": MESSAGE_TYPE_PRESENCE, "count": 1}
+        assert await communicator1.receive_json_from() == expected_response
+        await communicator1.disconnect()
+
+
+@pytest.fixture
+def enrolled_student_fixture(db):
+    """Create a student enrolled in an offering of the current term."""
+    offering = CourseOfferingFactory.create(term=AcademicTermFactory.create())
+    return EnrollmentFactory.create(offering=offering)
+
+
+async def setup_notification_communicator(user) -> WebsocketCommunicator:
+    """Setup a WebSocket communicator for the notifications of the user."""
+    application = URLRouter([path("ws/notifications/", NotificationConsumer.as_asgi())])
+    communicator = WebsocketCommunicator(application, "/ws/notifications/")
+    communicator.scope["user"] = user
+    return communicator
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_notification_push(enrolled_student_fixture):
+    """Test that personal and broadcast notifications are pushed to the student."""
+    user = enrolled_student_fixture.student.user
+    offering = enrolled_student_fixture.offering
+    await database_sync_to_async(NotificationFactory.create)(user=user)
+    communicator = await setup_notification_communicator(user)
+    connected, _ = await communicator.connect()
+    assert connected
+
+    # The unread count is sent on connect
+    response = await communicator.receive_json_from()
+    assert response == {"type": MESSAGE_TYPE_NOTIFICATION_COUNT, "count": 1}
+
+    await database_sync_to_async(send_notifications)([user.id], "personal")
+    response = await communicator.receive_json_from()
+    assert response["type"] == MESSAGE_TYPE_NOTIFICATION
+    assert response["message"] == "personal"
+    assert response["unread_delta"] == 1
+
+    course = await database_sync_to_async(lambda: offering.course)()
+    await database_sync_to_async(send_notifications_to_currently_enrolled_students)(
+        course, "broadcast", "/link/", "link"
+    )
+    response = await communicator.receive_json_from()
+    assert response["type"] == MESSAGE_TYPE_NOTIFICATION
+    assert response["message"] == "broadcast"
+    assert response["link_path"] == "/link/"
+
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_notification_deny_unauthenticated_user():
+    """Test that unauthenticated users cannot connect to the notifications."""
+    communicator = await setup_notification_communicator(AnonymousUser())
+    connected, _ = await communicator.connect()
+    assert not connected
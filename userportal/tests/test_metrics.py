@@ -0,0 +1,73 @@
+import time
+from io import StringIO
+from datetime import timedelta
+from types import SimpleNamespace
+from celery.app.task import Context
+
+from django.test import TestCase
+from django.utils import timezone
+from django.core.cache import cache
+from django.core.management import call_command
+
+from userportal.constants import *
+from userportal.metrics import task_metrics, get_task_lag
+from userportal.tasks import mark_notifications_as_read
+from userportal.tests.model_factories import *
+
+
+class TaskMetricsTest(TestCase):
+    """Test cases for the task metrics recorded through the Celery signals."""
+
+    TASK_NAME = "userportal.tasks.mark_notifications_as_read"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_task_run_is_recorded(self):
+        notifications = NotificationFactory.create_batch(3)
+
+        mark_notifications_as_read.apply(args=[[n.id for n in notifications]])
+
+        metrics = task_metrics.snapshot([self.TASK_NAME])[self.TASK_NAME]
+        self.assertEqual(metrics["runs"], 1)
+        self.assertEqual(metrics["failures"], 0)
+        # The three notifications are updated in a single statement
+        self.assertEqual(metrics["rows"], 3)
+        self.assertGreaterEqual(metrics["max_duration_ms"], 0)
+
+    def test_lag_is_measured_from_eta_or_enqueue_time(self):
+        started_at = time.time()
+        eta = timezone.now() - timedelta(seconds=2)
+        delayed = SimpleNamespace(request=Context(eta=eta.isoformat()))
+        queued = SimpleNamespace(
+            request=Context({TASK_ENQUEUED_AT_HEADER: started_at - 1})
+        )
+
+        self.assertAlmostEqual(get_task_lag(delayed, started_at), 2, delta=0.5)
+        self.assertAlmostEqual(get_task_lag(queued, started_at), 1)
+        self.assertIsNone(get_task_lag(SimpleNamespace(request=Context()), started_at))
+
+    def test_failures_are_counted(self):
+        task_metrics.record(self.TASK_NAME, "FAILURE", 0.5, 1.0, 0)
+        task_metrics.record(self.TASK_NAME, "SUCCESS", 0.1, None, 2)
+
+        metrics = task_metrics.snapshot([self.TASK_NAME])[self.TASK_NAME]
+        self.assertEqual(metrics["runs"], 2)
+        self.assertEqual(metrics["failures"], 1)
+        self.assertEqual(metrics["duration_ms"], 600)
+        self.assertEqual(metrics["max_duration_ms"], 500)
+        self.assertEqual(metrics["lagged_runs"], 1)
+        self.assertEqual(metrics["rows"], 2)
+
+    def test_report_command(self):
+        task_metrics.record(self.TASK_NAME, "SUCCESS", 0.25, 1.5, 4)
+        out = StringIO()
+
+        call_command("task_metrics", reset=True, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn(self.TASK_NAME, output)
+        self.assertIn("250.0", output)
+        self.assertIn("1500.0", output)
+        self.assertIn("Task metrics reset.", output)
+        self.assertEqual(task_metrics.snapshot([self.TASK_NAME]), {})
@@ -531,6 +531,44 @@ class NotificationModelTest(TestCase):
         )
 
 
+class BroadcastNotificationModelTest(TestCase):
+    """Test cases for the BroadcastNotification and BroadcastNotificationReceipt models."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory.create()
+        cls.offering = CourseOfferingFactory.create()
+        cls.broadcast = BroadcastNotification.objects.create(
+            offering=cls.offering,
+            message="A new material has been added.",
+            link_path="/",
+            link_text="View materials",
+        )
+
+    def test_field_constraints(self):
+        offering_related_name = BroadcastNotification._meta.get_field(
+            "offering"
+        )._related_name
+        self.assertEqual(offering_related_name, "broadcast_notifications")
+        message_max_length = BroadcastNotification._meta.get_field("message").max_length
+        self.assertEqual(message_max_length, 500)
+
+    def test_receipt_unique_per_user(self):
+        BroadcastNotificationReceipt.objects.create(
+            user=self.user, broadcast=self.broadcast
+        )
+        with self.assertRaises(IntegrityError):
+            BroadcastNotificationReceipt.objects.create(
+                user=self.user, broadcast=self.broadcast
+            )
+
+    def test_str(self):
+        self.assertEqual(
+            str(self.broadcast),
+            f"{self.offering} ({self.broadcast.message[:20]}...)",
+        )
+
+
 class QASessionModelTest(TestCase):
     """Test cases for the QASession model."""
 
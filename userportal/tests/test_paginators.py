@@ -0,0 +1,75 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from userportal.models import *
+from userportal.paginators import KeysetPaginator
+from userportal.repositories import NotificationRepository
+from userportal.tests.model_factories import *
+
+
+class KeysetPaginatorTest(TestCase):
+    """Test cases for the KeysetPaginator class."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory.create()
+        cls.notifications = NotificationFactory.create_batch(5, user=cls.user)
+        # Two notifications share a timestamp, so the id decides their order
+        timestamp = timezone.now()
+        Notification.objects.filter(
+            id__in=[n.id for n in cls.notifications[1:3]]
+        ).update(created_at=timestamp)
+        # Newest first
+        cls.expected = list(
+            Notification.objects.filter(user=cls.user).order_by("-created_at", "-id")
+        )
+
+    def test_page_forward_and_backward(self):
+        paginator = KeysetPaginator(Notification.objects.filter(user=self.user), 2)
+
+        page1 = paginator.page()
+        self.assertEqual(page1.object_list, self.expected[:2])
+        self.assertTrue(page1.has_next())
+        self.assertFalse(page1.has_previous())
+
+        page2 = paginator.page(after=page1.next_cursor)
+        self.assertEqual(page2.object_list, self.expected[2:4])
+        self.assertTrue(page2.has_previous())
+
+        page3 = paginator.page(after=page2.next_cursor)
+        self.assertEqual(page3.object_list, self.expected[4:])
+        self.assertFalse(page3.has_next())
+
+        # Going back returns the same pages
+        back = paginator.page(before=page3.previous_cursor)
+        self.assertEqual(back.object_list, page2.object_list)
+        back = paginator.page(before=back.previous_cursor)
+        self.assertEqual(back.object_list, page1.object_list)
+        self.assertFalse(back.has_previous())
+
+    def test_deep_page_costs_one_query(self):
+        paginator = KeysetPaginator(Notification.objects.filter(user=self.user), 1)
+        cursor = paginator.page(after=None).next_cursor
+        for _ in range(3):
+            cursor = paginator.page(after=cursor).next_cursor
+        with self.assertNumQueries(1):
+            page = paginator.page(after=cursor)
+        self.assertEqual(page.object_list, self.expected[4:])
+
+    def test_union_source(self):
+        paginator = KeysetPaginator(
+            lambda keyset, newest_first: NotificationRepository.fetch(
+                self.user, keyset, newest_first
+            ),
+            3,
+        )
+        page1 = paginator.page()
+        page2 = paginator.page(after=page1.next_cursor)
+        self.assertEqual(
+            [row["id"] for row in page1.object_list + page2.object_list],
+            [n.id for n in self.expected],
+        )
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Notification.objects.filter(user=self.user), 2)
+        self.assertEqual(paginator.page(after="invalid").object_list, self.expected[:2])
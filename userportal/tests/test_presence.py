@@ -0,0 +1,96 @@
+import json
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from userportal.constants import *
+from userportal.presence import RoomPresence
+
+
+class RoomPresenceTest(SimpleTestCase):
+    """Test cases for the RoomPresence class."""
+
+    def setUp(self):
+        self.presence = RoomPresence(broadcast_interval=0, prefix="test:")
+        self.channel_layer = MagicMock(spec=["group_send"])
+        self.channel_layer.group_send = AsyncMock()
+
+    def test_count_in_memory(self):
+        self.presence.broadcast_interval = 60
+        change = async_to_sync(self.presence._change)
+        change(self.channel_layer, "room1", 1)
+        change(self.channel_layer, "room1", 1)
+        change(self.channel_layer, "room2", 1)
+        change(self.channel_layer, "room1", -1)
+        count = async_to_sync(self.presence.count)
+        self.assertEqual(count(self.channel_layer, "room1"), 1)
+        self.assertEqual(count(self.channel_layer, "room2"), 1)
+        self.assertEqual(count(self.channel_layer, "room3"), 0)
+
+    def test_broadcasts_are_coalesced(self):
+        self.presence.broadcast_interval = 0.05
+
+        async def join_and_leave():
+            await self.presence.join(self.channel_layer, "room1", "group1")
+            await self.presence.join(self.channel_layer, "room1", "group1")
+            await self.presence.leave(self.channel_layer, "room1", "group1")
+            await self.presence.join(self.channel_layer, "room1", "group1")
+            await asyncio.sleep(0.1)
+
+        async_to_sync(join_and_leave)()
+        # A single broadcast carries the count after every change
+        self.channel_layer.group_send.assert_awaited_once()
+        group_name, event = self.channel_layer.group_send.await_args.args
+        self.assertEqual(group_name, "group1")
+        self.assertEqual(event["type"], MESSAGE_TYPE_PRESENCE)
+        self.assertEqual(event["count"], 2)
+        self.assertEqual(
+            json.loads(event["frame"]), {"type": MESSAGE_TYPE_PRESENCE, "count": 2}
+        )
+
+    def test_pending_broadcasts_are_kept_until_done(self):
+        self.presence.broadcast_interval = 60
+
+        async def join():
+            await self.presence.join(self.channel_layer, "room1", "group1")
+            tasks = set(self.presence._tasks)
+            self.presence.reset()
+            await asyncio.sleep(0)
+            return tasks
+
+        tasks = async_to_sync(join)()
+        self.assertEqual(len(tasks), 1)
+        self.assertTrue(all(task.cancelled() for task in tasks))
+        self.assertEqual(self.presence._tasks, set())
+
+    def test_last_client_leaving_broadcasts_at_once(self):
+        self.presence.broadcast_interval = 60
+
+        async def join_and_leave():
+            await self.presence.join(self.channel_layer, "room1", "group1")
+            await self.presence.leave(self.channel_layer, "room1", "group1")
+            await asyncio.sleep(0)
+
+        async_to_sync(join_and_leave)()
+        # The pending broadcast is replaced with one sent right away
+        self.channel_layer.group_send.assert_awaited_once()
+        self.assertEqual(self.channel_layer.group_send.await_args.args[1]["count"], 0)
+        self.assertEqual(self.presence._tasks, set())
+
+    def test_count_in_redis(self):
+        connection = MagicMock()
+        connection.incrby = AsyncMock()
+        connection.expire = AsyncMock()
+        connection.get = AsyncMock(return_value=b"3")
+        channel_layer = MagicMock()
+        channel_layer.consistent_hash.return_value = 0
+        channel_layer.connection.return_value = connection
+
+        async_to_sync(self.presence._change)(channel_layer, "room1", -1)
+        connection.incrby.assert_awaited_once_with("test:room1", -1)
+        connection.expire.assert_awaited_once_with(
+            "test:room1", RoomPresence.KEY_EXPIRY
+        )
+        self.assertEqual(async_to_sync(self.presence.count)(channel_layer, "room1"), 3)
@@ -0,0 +1,86 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from userportal.ratelimits import TokenBucket, SharedRateLimiter, TOKEN_BUCKET_LUA
+
+
+class TokenBucketTest(SimpleTestCase):
+    """Test cases for the TokenBucket class."""
+
+    @patch("userportal.ratelimits.time.monotonic")
+    def test_take(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        bucket = TokenBucket(capacity=2, refill_rate=0.5)
+
+        # Test case 1: The burst is allowed
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        # Test case 2: The bucket is empty, a token is available in 2 seconds
+        self.assertEqual(bucket.take(), 2)
+        # Test case 3: The bucket is refilled over time
+        mock_monotonic.return_value = 102.0
+        self.assertEqual(bucket.take(), 0)
+        # Test case 4: The bucket never holds more than its capacity
+        mock_monotonic.return_value = 200.0
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertGreater(bucket.take(), 0)
+        # Test case 5: A token given back can be taken again
+        bucket.give_back()
+        self.assertEqual(bucket.take(), 0)
+
+
+class SharedRateLimiterTest(SimpleTestCase):
+    """Test cases for the SharedRateLimiter class."""
+
+    def setUp(self):
+        self.limiter = SharedRateLimiter(capacity=1, refill_rate=0.1, prefix="test:")
+
+    def test_take_in_memory(self):
+        channel_layer = object()
+        self.assertEqual(async_to_sync(self.limiter.take)(channel_layer, "room1"), 0)
+        self.assertGreater(async_to_sync(self.limiter.take)(channel_layer, "room1"), 0)
+        # Each key has its own bucket
+        self.assertEqual(async_to_sync(self.limiter.take)(channel_layer, "room2"), 0)
+
+    @patch("userportal.ratelimits.time.monotonic")
+    def test_idle_buckets_are_dropped(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        limiter = SharedRateLimiter(capacity=1, refill_rate=0.1, prefix="test:")
+        channel_layer = object()
+        async_to_sync(limiter.take)(channel_layer, "room1")
+        mock_monotonic.return_value = 105.0
+        async_to_sync(limiter.take)(channel_layer, "room2")
+        self.assertEqual(set(limiter._buckets), {"room1", "room2"})
+
+        # Refilled buckets are dropped, the others are kept
+        mock_monotonic.return_value = 112.0
+        async_to_sync(limiter.take)(channel_layer, "room3")
+        self.assertEqual(set(limiter._buckets), {"room2", "room3"})
+
+    def test_take_from_redis(self):
+        connection = MagicMock()
+        connection.eval = AsyncMock(return_value=b"1.5")
+        channel_layer = MagicMock()
+        channel_layer.consistent_hash.return_value = 0
+        channel_layer.connection.return_value = connection
+
+        self.assertEqual(async_to_sync(self.limiter.take)(channel_layer, "room1"), 1.5)
+        connection.eval.assert_awaited_once_with(
+            TOKEN_BUCKET_LUA, 1, "test:room1", 1, 0.1
+        )
+
+    def test_take_from_redis_unavailable(self):
+        connection = MagicMock()
+        connection.eval = AsyncMock(side_effect=ConnectionError("refused"))
+        channel_layer = MagicMock()
+        channel_layer.consistent_hash.return_value = 0
+        channel_layer.connection.return_value = connection
+
+        # The message is let through
+        with self.assertLogs("userportal.ratelimits", level="ERROR"):
+            self.assertEqual(
+                async_to_sync(self.limiter.take)(channel_layer, "room1"), 0
+            )
@@ -1,10 +1,13 @@
+from django.db import transaction
 from django.test import TestCase, override_settings
 from userportal.tests.mixins import TermTestMixin
 from userportal.tests.model_factories import *
 from userportal.repositories import *
 from django.core.files.uploadedfile import SimpleUploadedFile
 import shutil
+from unittest.mock import patch
 from django.http import Http404
+from django.core.cache import cache
 from userportal.constants import *
 
 
@@ -22,6 +25,12 @@ class AcademicTermRepositoryTest(TestCase, TermTestMixin):
         self.assertEqual(AcademicTermRepository.next(), self.next_term)
         self.assertEqual(AcademicTermRepository.previous(), self.previous_term)
 
+    def test_terms_are_invalidated_on_save(self):
+        self.assertEqual(AcademicTermRepository.next(), self.next_term)
+        later_term = self.create_next_term(self.next_term)
+        self.next_term.delete()
+        self.assertEqual(AcademicTermRepository.next(), later_term)
+
 
 class CourseOfferingRepositoryTest(TestCase, TermTestMixin):
     """Test cases for the CourseOfferingRepository class."""
@@ -50,6 +59,36 @@ class CourseOfferingRepositoryTest(TestCase, TermTestMixin):
             CourseOfferingRepository.fetch_next(self.course), self.next_offering
         )
 
+    def test_fetch_current_and_next(self):
+        student = StudentProfileFactory.create()
+        EnrollmentFactory.create(student=student, offering=self.next_offering)
+        # The terms are read once per process
+        AcademicTermRepository.current()
+        with self.assertNumQueries(1):
+            current, next_offering = CourseOfferingRepository.fetch_current_and_next(
+                self.course, student.user
+            )
+            self.assertEqual(current.term, self.current_term)
+        self.assertEqual(
+            (current, next_offering), (self.current_offering, self.next_offering)
+        )
+        self.assertFalse(current.is_enrolled)
+        self.assertTrue(next_offering.is_enrolled)
+
+    def test_fetch_current_and_next_without_student(self):
+        current, next_offering = CourseOfferingRepository.fetch_current_and_next(
+            self.course
+        )
+        self.assertEqual(
+            (current, next_offering), (self.current_offering, self.next_offering)
+        )
+        self.assertFalse(current.is_enrolled)
+        self.assertFalse(next_offering.is_enrolled)
+        course = CourseFactory.create()
+        self.assertEqual(
+            CourseOfferingRepository.fetch_current_and_next(course), (None, None)
+        )
+
     def test_fetch_with_academic_terms(self):
         offerings = CourseOfferingRepository.fetch_with_academic_terms(self.course.id)
         self.assertEqual(offerings.count(), 3)
@@ -292,11 +331,187 @@ class NotificationRepositoryTest(TestCase):
     def setUpTestData(cls):
         cls.user = UserFactory.create()
         cls.notification = NotificationFactory.create(user=cls.user)
+        cls.enrollment = EnrollmentFactory.create(student__user=cls.user)
 
     def test_fetch(self):
         notifications = NotificationRepository.fetch(self.user)
         self.assertEqual(notifications.count(), 1)
-        self.assertEqual(notifications[0], self.notification)
+        self.assertEqual(notifications[0]["id"], self.notification.id)
+        self.assertEqual(notifications[0]["message"], self.notification.message)
+        self.assertEqual(notifications[0]["kind"], NOTIFICATION_KIND_PERSONAL)
+        self.assertFalse(notifications[0]["is_read"])
+
+    def test_fetch_with_broadcasts(self):
+        broadcast = NotificationRepository.create_broadcast(
+            self.enrollment.offering, "New material", "/materials/", "View material"
+        )
+        # Broadcasts to other offerings are not included
+        NotificationRepository.create_broadcast(
+            CourseOfferingFactory.create(), "Other course", "/", "View"
+        )
+
+        # Test case 1: Personal and broadcast notifications are merged, newest first
+        notifications = NotificationRepository.fetch(self.user)
+        self.assertEqual(
+            [(n["kind"], n["id"], n["is_read"]) for n in notifications],
+            [
+                (NOTIFICATION_KIND_BROADCAST, broadcast.id, False),
+                (NOTIFICATION_KIND_PERSONAL, self.notification.id, False),
+            ],
+        )
+        self.assertEqual(notifications[0]["link_text"], "View material")
+        self.assertEqual(NotificationRepository.count_unread(self.user), 2)
+
+        # Test case 2: The broadcast is read by the user only
+        other_enrollment = EnrollmentFactory.create(offering=self.enrollment.offering)
+        NotificationRepository.mark_broadcasts_as_read(self.user.id, [broadcast.id])
+        NotificationRepository.mark_broadcasts_as_read(self.user.id, [broadcast.id])
+        self.assertTrue(NotificationRepository.fetch(self.user)[0]["is_read"])
+        self.assertEqual(NotificationRepository.count_unread(self.user), 1)
+
+        # Test case 3: Students enrolled after the broadcast do not receive it
+        self.assertEqual(
+            NotificationRepository.count_unread(other_enrollment.student.user), 0
+        )
+
+    def test_count_unread_is_cached(self):
+        self.assertEqual(NotificationRepository.count_unread(self.user), 1)
+        # The count is read from the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationRepository.count_unread(self.user), 1)
+
+        # Test case 1: Kept in sync when notifications are created and read
+        notification = NotificationFactory.create(user=self.user)
+        NotificationRepository.adjust_unread_counts({self.user.id: 1})
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationRepository.count_unread(self.user), 2)
+        NotificationRepository.mark_as_read([notification.id, self.notification.id])
+        NotificationRepository.mark_as_read([notification.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationRepository.count_unread(self.user), 0)
+
+        # Test case 2: Invalidated when a broadcast is sent to the user
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcast = NotificationRepository.create_broadcast(
+                self.enrollment.offering, "New material", "/materials/", "View material"
+            )
+        self.assertEqual(NotificationRepository.count_unread(self.user), 1)
+        NotificationRepository.mark_broadcasts_as_read(self.user.id, [broadcast.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationRepository.count_unread(self.user), 0)
+
+    def test_broadcast_read_concurrently_is_counted_once(self):
+        broadcast = NotificationRepository.create_broadcast(
+            self.enrollment.offering, "New material", "/", "View"
+        )
+        self.assertEqual(NotificationRepository.count_unread(self.user), 2)
+        get_or_create = BroadcastNotificationReceipt.objects.get_or_create
+
+        def insert_concurrently(**kwargs):
+            # Another caller inserts the same receipt first
+            BroadcastNotificationReceipt.objects.create(**kwargs)
+            return get_or_create(**kwargs)
+
+        with patch.object(
+            BroadcastNotificationReceipt.objects,
+            "get_or_create",
+            side_effect=insert_concurrently,
+        ):
+            NotificationRepository.mark_broadcasts_as_read(self.user.id, [broadcast.id])
+        # The receipt was not inserted by this call, so the count is left as is
+        self.assertEqual(NotificationRepository.count_unread(self.user), 2)
+
+    def test_count_read_before_a_broadcast_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                NotificationRepository.create_broadcast(
+                    self.enrollment.offering, "New material", "/", "View"
+                )
+                # A page rendered by another connection does not see the broadcast yet
+                with patch.object(
+                    NotificationRepository, "_count_unread_from_db", return_value=1
+                ):
+                    self.assertEqual(NotificationRepository.count_unread(self.user), 1)
+        # The count cached in the meantime is dropped once the broadcast commits
+        self.assertEqual(NotificationRepository.count_unread(self.user), 2)
+
+    def test_reconcile_unread_counts(self):
+        NotificationRepository.count_unread(self.user)
+        # The cached count goes out of sync
+        NotificationFactory.create(user=self.user)
+        other_user = NotificationFactory.create().user
+
+        corrected = NotificationRepository.reconcile_unread_counts(
+            timezone.now() - timezone.timedelta(minutes=10)
+        )
+
+        # Only the cached count is corrected
+        self.assertEqual(corrected, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationRepository.count_unread(self.user), 2)
+        self.assertIsNone(
+            cache.get(UNREAD_NOTIFICATION_COUNT_CACHE_KEY.format(user_id=other_user.id))
+        )
+
+    def test_reconcile_unread_broadcast_counts(self):
+        user = EnrollmentFactory.create(offering=self.enrollment.offering).student.user
+        self.assertEqual(NotificationRepository.count_unread(user), 0)
+        # The broadcast is created without the cached count being dropped
+        with patch.object(NotificationRepository, "invalidate_unread_counts"):
+            with self.captureOnCommitCallbacks(execute=True):
+                NotificationRepository.create_broadcast(
+                    self.enrollment.offering, "New material", "/", "View"
+                )
+
+        NotificationRepository.reconcile_unread_counts(
+            timezone.now() - timezone.timedelta(minutes=10)
+        )
+
+        # The user has no personal notification, only the broadcast
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationRepository.count_unread(user), 1)
+
+    def test_purge_expired(self):
+        user = UserFactory.create()
+        now = timezone.now()
+        old = now - timezone.timedelta(days=30)
+        read_expired = NotificationFactory.create_batch(3, user=user, is_read=True)
+        unread_kept = NotificationFactory.create(user=user, is_read=False)
+        Notification.objects.filter(user=user).update(created_at=old)
+        recent = NotificationFactory.create(user=user, is_read=True)
+        enrollment = EnrollmentFactory.create()
+        broadcast = NotificationRepository.create_broadcast(
+            enrollment.offering, "message", "/link/", "link"
+        )
+        BroadcastNotification.objects.filter(id=broadcast.id).update(created_at=old)
+
+        deleted = NotificationRepository.purge_expired(
+            read_before=now - timezone.timedelta(days=7),
+            unread_before=now - timezone.timedelta(days=60),
+            batch_size=2,
+            archive=True,
+        )
+
+        # Read notifications expire sooner than unread ones
+        self.assertEqual(deleted, 3)
+        self.assertQuerySetEqual(
+            Notification.objects.filter(user=user).order_by("id"),
+            [unread_kept, recent],
+        )
+        self.assertEqual(
+            sorted(NotificationArchive.objects.values_list("message", flat=True)),
+            sorted(n.message for n in read_expired),
+        )
+        self.assertTrue(BroadcastNotification.objects.filter(id=broadcast.id).exists())
+
+        later = timezone.now() + timezone.timedelta(seconds=1)
+        NotificationRepository.purge_expired(
+            read_before=later, unread_before=later, batch_size=2
+        )
+        self.assertFalse(Notification.objects.filter(user=user).exists())
+        self.assertFalse(BroadcastNotification.objects.exists())
+        # Archiving is optional
+        self.assertEqual(NotificationArchive.objects.count(), 3)
 
 
 class QAQuestionRepositoryTest(TestCase):
@@ -315,6 +530,167 @@ class QAQuestionRepositoryTest(TestCase):
         self.assertEqual(close_comment.sender, "System")
         self.assertIsNotNone(close_comment.timestamp)
 
+    def test_fetch_after(self):
+        room_name = self.qa_session.room_name
+        timestamp = timezone.now()
+        # Two questions share a timestamp, so the id decides their order
+        question1, question2 = QAQuestionFactory.create_batch(
+            2, room_name=room_name, timestamp=timestamp
+        )
+        question3 = QAQuestionFactory.create(
+            room_name=room_name, timestamp=timestamp + timezone.timedelta(seconds=1)
+        )
+        QAQuestionFactory.create(room_name="other_room", timestamp=timestamp)
+
+        # Test case 1: Fetch all questions of the room, oldest first
+        self.assertEqual(
+            QAQuestionRepository.fetch_after(room_name),
+            [question1, question2, question3],
+        )
+        # Test case 2: Fetch the questions after a (timestamp, id) cursor
+        self.assertEqual(
+            QAQuestionRepository.fetch_after(room_name, (timestamp, question1.id)),
+            [question2, question3],
+        )
+        # Test case 3: A cursor without id only matches newer timestamps
+        self.assertEqual(
+            QAQuestionRepository.fetch_after(room_name, (timestamp, None)),
+            [question3],
+        )
+        # Test case 4: Limit the number of questions
+        self.assertEqual(
+            QAQuestionRepository.fetch_after(room_name, limit=1), [question1]
+        )
+
+    def test_fetch_before(self):
+        room_name = self.qa_session.room_name
+        timestamp = timezone.now()
+        question1, question2 = QAQuestionFactory.create_batch(
+            2, room_name=room_name, timestamp=timestamp
+        )
+        question3 = QAQuestionFactory.create(
+            room_name=room_name, timestamp=timestamp + timezone.timedelta(seconds=1)
+        )
+        QAQuestionFactory.create(room_name="other_room", timestamp=timestamp)
+
+        # Test case 1: Fetch all questions of the room, newest first
+        self.assertEqual(
+            QAQuestionRepository.fetch_before(room_name),
+            [question3, question2, question1],
+        )
+        # Test case 2: Fetch the questions before a (timestamp, id) cursor
+        self.assertEqual(
+            QAQuestionRepository.fetch_before(room_name, (timestamp, question2.id)),
+            [question1],
+        )
+        # Test case 3: A cursor without id only matches older timestamps
+        self.assertEqual(
+            QAQuestionRepository.fetch_before(room_name, (question3.timestamp, None)),
+            [question2, question1],
+        )
+        # Test case 4: Limit the number of questions
+        self.assertEqual(
+            QAQuestionRepository.fetch_before(room_name, limit=1), [question3]
+        )
+
+
+class QAQuestionArchiveRepositoryTest(TestCase):
+    """Test cases for the QAQuestionArchiveRepository class."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.qa_session = QASessionFactory.create(status=QASession.Status.ENDED)
+
+    def test_archive(self):
+        room_name = self.qa_session.room_name
+        timestamp = timezone.now()
+        questions = [
+            QAQuestionFactory.create(
+                room_name=room_name, timestamp=timestamp + timezone.timedelta(seconds=i)
+            )
+            for i in range(3)
+        ]
+        other_question = QAQuestionFactory.create(room_name="other_room")
+
+        # Test case 1: The questions are moved into the archive
+        self.assertEqual(QAQuestionArchiveRepository.archive(room_name), 3)
+        self.assertFalse(QAQuestion.objects.filter(room_name=room_name).exists())
+        self.assertTrue(QAQuestion.objects.filter(id=other_question.id).exists())
+        archived = QAQuestionArchiveRepository.fetch(room_name)
+        self.assertEqual([q.id for q in archived], [q.id for q in questions])
+        self.assertEqual(
+            [(q.sender, q.text, q.timestamp) for q in archived],
+            [(q.sender, q.text, q.timestamp) for q in questions],
+        )
+
+        # Test case 2: Questions saved later are added to the archive
+        late_question = QAQuestionFactory.create(
+            room_name=room_name, timestamp=timestamp + timezone.timedelta(seconds=5)
+        )
+        self.assertEqual(QAQuestionArchiveRepository.archive(room_name), 1)
+        archive = QAQuestionArchive.objects.get(room_name=room_name)
+        self.assertEqual(archive.question_count, 4)
+
+        # Test case 3: Reads include the archived questions transparently
+        self.assertEqual(
+            [q.id for q in QAQuestionRepository.fetch_before(room_name, limit=2)],
+            [late_question.id, questions[2].id],
+        )
+        cursor = (questions[2].timestamp, questions[2].id)
+        self.assertEqual(
+            [q.id for q in QAQuestionRepository.fetch_before(room_name, cursor)],
+            [questions[1].id, questions[0].id],
+        )
+
+        # Test case 4: Nothing to archive
+        self.assertEqual(QAQuestionArchiveRepository.archive(room_name), 0)
+
+    @override_settings(LIVE_QA_ARCHIVE_CHUNK_SIZE=2)
+    def test_archive_is_read_by_chunk(self):
+        room_name = self.qa_session.room_name
+        timestamp = timezone.now()
+        questions = [
+            QAQuestionFactory.create(
+                room_name=room_name, timestamp=timestamp + timezone.timedelta(seconds=i)
+            )
+            for i in range(5)
+        ]
+        QAQuestionArchiveRepository.archive(room_name)
+        archive = QAQuestionArchive.objects.get(room_name=room_name)
+        self.assertEqual(archive.chunks.count(), 3)
+
+        # Test case 1: A page decompresses only the chunks it reads
+        cursor = (questions[3].timestamp, questions[3].id)
+        with patch.object(
+            QAQuestionArchiveRepository,
+            "_unpack",
+            wraps=QAQuestionArchiveRepository._unpack,
+        ) as mock_unpack:
+            archived = QAQuestionArchiveRepository.fetch_before(room_name, cursor, 2)
+        self.assertEqual([q.id for q in archived], [questions[2].id, questions[1].id])
+        self.assertEqual(mock_unpack.call_count, 2)
+
+        # Test case 2: Questions saved later are merged into the last chunk
+        late_question = QAQuestionFactory.create(
+            room_name=room_name, timestamp=timestamp + timezone.timedelta(seconds=9)
+        )
+        QAQuestionArchiveRepository.archive(room_name)
+        archive.refresh_from_db()
+        self.assertEqual(archive.question_count, 6)
+        self.assertEqual(archive.chunks.count(), 3)
+        self.assertEqual(
+            [q.id for q in QAQuestionArchiveRepository.fetch(room_name)],
+            [q.id for q in questions] + [late_question.id],
+        )
+
+    def test_delete(self):
+        QAQuestionFactory.create(room_name=self.qa_session.room_name)
+        QAQuestionArchiveRepository.archive(self.qa_session.room_name)
+        QAQuestionArchiveRepository.delete(self.qa_session.room_name)
+        self.assertEqual(
+            QAQuestionArchiveRepository.fetch(self.qa_session.room_name), []
+        )
+
 
 class QASessionRepositoryTest(TestCase):
     """Test cases for the QASessionRepository class."""
@@ -402,6 +778,49 @@ class UserRepositoryTest(TestCase):
         self.assertEqual(users.count(), 1)
         self.assertEqual(users[0], self.user2)
 
+    def test_fetch_filtered_by_keyword_prefixes(self):
+        self.assertQuerySetEqual(
+            UserRepository.fetch_filtered_by("SMI jo"), [self.user1, self.user2]
+        )
+        self.assertQuerySetEqual(
+            UserRepository.fetch_filtered_by("teach"), [self.user2]
+        )
+        self.assertFalse(UserRepository.fetch_filtered_by("mith").exists())
+        # Keywords without any word match no user
+        self.assertFalse(UserRepository.fetch_filtered_by("---").exists())
+
+    def test_search_tokens_follow_user_changes(self):
+        self.user1.first_name = "Émilie"
+        self.user1.save()
+        self.assertQuerySetEqual(
+            UserRepository.fetch_filtered_by("emilie"), [self.user1]
+        )
+        self.assertFalse(UserRepository.fetch_filtered_by("emily").exists())
+
+    def test_filter_by_username(self):
+        queryset = AuthUser.objects.all()
+        self.assertQuerySetEqual(
+            UserRepository.filter_by_username(queryset, "Student1"), [self.user1]
+        )
+        self.assertQuerySetEqual(
+            UserRepository.filter_by_username(queryset, ""), queryset
+        )
+        self.assertFalse(UserRepository.filter_by_username(queryset, "john").exists())
+
+    def test_autocomplete(self):
+        UserFactory.create(username="emma", first_name="Emma", last_name="Stone")
+        self.assertQuerySetEqual(
+            UserRepository.autocomplete("em"),
+            [self.user1, AuthUser.objects.get(username="emma")],
+            ordered=False,
+        )
+        self.assertQuerySetEqual(UserRepository.autocomplete("em sm"), [self.user1])
+        self.assertQuerySetEqual(
+            UserRepository.autocomplete("em", limit=1),
+            [AuthUser.objects.get(username="emma")],
+        )
+        self.assertFalse(UserRepository.autocomplete(" ").exists())
+
     def test_fetch_filtered_by_user_types(self):
         users = UserRepository.fetch_filtered_by(user_types=[AuthUser.UserType.STUDENT])
         self.assertEqual(users.count(), 1)
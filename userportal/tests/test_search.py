@@ -0,0 +1,196 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.db import connection
+from django.urls import reverse
+from django.core.management import call_command
+
+from userportal.repositories import *
+from userportal.search import course_search_index, CourseSuggestionIndex
+from userportal.views.course_views import CourseListView
+from userportal.tests.model_factories import *
+
+
+class CourseSearchIndexTest(TestCase):
+    """Test cases for the full-text index of the course catalog."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = TeacherProfileFactory.create(
+            user=UserFactory.create(first_name="Ada", last_name="Lovelace")
+        )
+        cls.algorithms = CourseFactory.create(
+            title="Introduction to Algorithms",
+            description="Learn the fundamentals of algorithms and data structures.",
+        )
+        cls.data = CourseFactory.create(
+            title="Data Structures Essentials",
+            description="Deep dive into lists, trees and graphs.",
+            teacher=cls.teacher,
+        )
+
+    def setUp(self):
+        if not course_search_index.is_available():
+            self.skipTest("The database has no full-text search support.")
+
+    def search(self, keywords):
+        return list(CourseRepository.fetch_filtered_by(keywords))
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search("data"), [self.data, self.algorithms])
+
+    def test_search_matches_prefixes(self):
+        self.assertEqual(self.search("algo"), [self.algorithms])
+        self.assertEqual(self.search("essent"), [self.data])
+        self.assertEqual(self.search("ssentials"), [])
+
+    def test_search_matches_any_keyword(self):
+        self.assertCountEqual(
+            self.search("graphs fundamentals"), [self.algorithms, self.data]
+        )
+
+    def test_search_results_are_read_by_page(self):
+        results = CourseRepository.fetch_filtered_by("data")
+        self.assertEqual(results.count(), 2)
+        # A page reads its ids from the index, then its courses
+        with self.assertNumQueries(2):
+            self.assertEqual(results[1:2], [self.algorithms])
+        self.assertEqual(results[0], self.data)
+        self.assertEqual(results[2:], [])
+        with patch.object(course_search_index, "search", return_value=[]):
+            with self.assertRaises(IndexError):
+                results[0]
+
+    def test_search_results_are_paginated(self):
+        with patch.object(CourseListView, "paginate_by", 1):
+            response = self.client.get(
+                reverse("course-list"), {"keywords": "data", "page": 2}
+            )
+        self.assertEqual(response.context["paginator"].count, 2)
+        self.assertEqual(list(response.context["courses"]), [self.algorithms])
+
+    def test_search_ignores_query_syntax(self):
+        self.assertEqual(self.search('"algorithms" OR NOT*'), [self.algorithms])
+
+    def test_index_follows_course_changes(self):
+        self.data.title = "Graph Theory"
+        self.data.save()
+        self.assertEqual(self.search("theory"), [self.data])
+        self.data.delete()
+        self.assertEqual(self.search("graph"), [])
+
+    def test_index_follows_teacher_name_changes(self):
+        self.assertEqual(self.search("lovelace"), [self.data])
+        user = self.teacher.user
+        user.last_name = "Byron"
+        user.save()
+        self.assertEqual(self.search("lovelace"), [])
+        self.assertEqual(self.search("byron"), [self.data])
+
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {course_search_index.table}")
+        self.assertEqual(self.search("data"), [])
+        out = StringIO()
+        call_command("rebuild_course_search_index", stdout=out)
+        self.assertIn("2 courses indexed.", out.getvalue())
+        self.assertEqual(self.search("data"), [self.data, self.algorithms])
+
+    def test_search_falls_back_without_index(self):
+        with patch.object(course_search_index, "_available", False):
+            self.assertEqual(self.search("ssentials"), [self.data])
+
+
+class CourseSuggestionIndexTest(TestCase):
+    """Test cases for the in-memory index of course suggestions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = TeacherProfileFactory.create(
+            user=UserFactory.create(first_name="Ada", last_name="Lovelace")
+        )
+        cls.algorithms = CourseFactory.create(
+            title="Introduction to Algorithms", teacher=cls.teacher
+        )
+        cls.analysis = CourseFactory.create(
+            title="Analysis of Algorithms", teacher=cls.teacher
+        )
+
+    def setUp(self):
+        self.index = CourseSuggestionIndex(max_age=3600, limit=10)
+
+    def texts(self, term):
+        return [suggestion["text"] for suggestion in self.index.suggest(term)]
+
+    def test_suggest_matches_word_prefixes(self):
+        self.assertCountEqual(
+            self.texts("algo"), ["Analysis of Algorithms", "Introduction to Algorithms"]
+        )
+        self.assertEqual(
+            self.texts("INTRODUCTION to al"), ["Introduction to Algorithms"]
+        )
+        self.assertEqual(self.texts("gorithms"), [])
+        self.assertEqual(self.texts(" "), [])
+
+    def test_suggest_teacher_names_once(self):
+        self.assertEqual(
+            self.index.suggest("love"),
+            [
+                {
+                    "type": CourseSuggestionIndex.TEACHER,
+                    "text": "Ada Lovelace",
+                    "course_id": self.algorithms.id,
+                }
+            ],
+        )
+
+    def test_suggest_does_not_query_once_built(self):
+        self.index.suggest("a")
+        with self.assertNumQueries(0):
+            self.texts("an")
+            self.texts("ada")
+
+    def test_suggest_is_limited(self):
+        self.assertEqual(len(self.index.suggest("a", limit=2)), 2)
+
+    def test_index_follows_course_changes(self):
+        self.index.suggest("a")
+        self.analysis.title = "Graph Theory"
+        self.analysis.save()
+        self.index.update([self.analysis.id])
+        self.assertEqual(self.texts("algo"), ["Introduction to Algorithms"])
+        self.assertEqual(self.texts("theory"), ["Graph Theory"])
+        self.index.remove([self.algorithms.id])
+        self.assertEqual(self.texts("algo"), [])
+
+    def test_index_is_built_again_after_max_age(self):
+        index = CourseSuggestionIndex(max_age=0, limit=10)
+        index.suggest("a")
+        self.analysis.title = "Graph Theory"
+        self.analysis.save()
+        # The stale index is served while a new one is built in the background
+        with patch("userportal.search.threading.Thread") as mock_thread:
+            with self.assertNumQueries(0):
+                self.assertEqual(len(index.suggest("algo")), 2)
+            mock_thread.assert_called_once_with(target=index._refresh, daemon=True)
+            index._build(blocking=False)
+            self.assertEqual(
+                [suggestion["text"] for suggestion in index.suggest("theory")],
+                ["Graph Theory"],
+            )
+
+    def test_changes_made_during_a_build_are_kept(self):
+        fetch = self.index._fetch
+
+        def fetch_then_change(queryset):
+            courses = fetch(queryset)
+            if self.index._loaded_at is None:
+                # The course changes once the build has read it
+                self.analysis.title = "Graph Theory"
+                self.analysis.save()
+                self.index.update([self.analysis.id])
+            return courses
+
+        with patch.object(self.index, "_fetch", side_effect=fetch_then_change):
+            self.assertEqual(self.texts("theory"), ["Graph Theory"])
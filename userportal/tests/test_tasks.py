@@ -1,6 +1,7 @@
 import shutil
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+from django.db import DatabaseError
 from django.test import TestCase, override_settings
 from django.core.exceptions import ObjectDoesNotExist
 
@@ -21,13 +22,17 @@ class SharedTaskTest(TestCase):
         shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
 
+    @patch("userportal.tasks.get_channel_layer")
     @patch("userportal.tasks.delete_qa_questions.delay")
-    def test_delete_qa_questions(self, mock_delay):
+    def test_delete_qa_questions(self, mock_delay, mock_get_channel_layer):
         # Prepare test data
         room_name_1, room_name_2 = "room1", "room2"
         qa_question1 = QAQuestionFactory.create(room_name=room_name_1)
         qa_question2 = QAQuestionFactory.create(room_name=room_name_2)
 
+        QAQuestionArchive.objects.create(room_name=room_name_1)
+
+        group_send = mock_get_channel_layer.return_value.group_send = AsyncMock()
         # Mock the delay method to call the actual function
         mock_delay.side_effect = lambda room_name: delete_qa_questions(room_name)
         # Call the function
@@ -39,10 +44,45 @@ class SharedTaskTest(TestCase):
         with self.assertRaises(ObjectDoesNotExist):
             qa_question1.refresh_from_db()
         self.assertFalse(QAQuestion.objects.filter(room_name=room_name_1).exists())
+        self.assertFalse(
+            QAQuestionArchive.objects.filter(room_name=room_name_1).exists()
+        )
+        # The consumers of the room are told to drop their cached history
+        group_send.assert_awaited_once_with(
+            f"{LIVE_QA_PREFIX}_{room_name_1}", {"type": MESSAGE_TYPE_QUESTIONS_DELETED}
+        )
         # Check if the other question was not deleted
         qa_question2.refresh_from_db()
         self.assertTrue(QAQuestion.objects.filter(room_name=room_name_2).exists())
 
+    @patch("userportal.tasks.archive_qa_questions.delay")
+    def test_archive_qa_questions(self, mock_delay):
+        # Prepare test data
+        ended_session = QASessionFactory.create(status=QASession.Status.ENDED)
+        active_session = QASessionFactory.create()
+        QAQuestionFactory.create_batch(2, room_name=ended_session.room_name)
+        QAQuestionFactory.create(room_name=active_session.room_name)
+
+        mock_delay.side_effect = lambda room_name: archive_qa_questions(room_name)
+        archive_qa_questions.delay(ended_session.room_name)
+        archive_qa_questions.delay(active_session.room_name)
+
+        # The questions of the ended session are moved into its archive
+        self.assertFalse(
+            QAQuestion.objects.filter(room_name=ended_session.room_name).exists()
+        )
+        archive = QAQuestionArchive.objects.get(room_name=ended_session.room_name)
+        self.assertEqual(archive.question_count, 2)
+        # The questions of the active session are left as they are
+        self.assertTrue(
+            QAQuestion.objects.filter(room_name=active_session.room_name).exists()
+        )
+        self.assertFalse(
+            QAQuestionArchive.objects.filter(
+                room_name=active_session.room_name
+            ).exists()
+        )
+
     @patch("userportal.tasks.notify_students_of_live_qa_start.delay")
     def test_notify_students_of_live_qa_start(self, mock_delay):
         # Prepare test data
@@ -62,9 +102,9 @@ class SharedTaskTest(TestCase):
         mock_delay.assert_called_once_with(course_id)
         # Check if the notifications were created
         for e in enrollments:
-            notification = Notification.objects.filter(user=e.student.user).first()
+            notification = NotificationRepository.fetch(e.student.user).first()
             self.assertIsNotNone(notification)
-            self.assertIn("live Q&A session", notification.message)
+            self.assertIn("live Q&A session", notification["message"])
 
     @override_settings(
         STORAGES={
@@ -93,9 +133,139 @@ class SharedTaskTest(TestCase):
         mock_delay.assert_called_once_with(offering.course.id, material.id)
         # Check if the notifications were created
         for e in enrollments:
-            notification = Notification.objects.filter(user=e.student.user).first()
+            notification = NotificationRepository.fetch(e.student.user).first()
             self.assertIsNotNone(notification)
-            self.assertIn("new material", notification.message)
+            self.assertIn("new material", notification["message"])
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_send_notifications_in_batches(self):
+        users = UserFactory.create_batch(5)
+        user_ids = (user.id for user in users)
+        self.assertEqual(NotificationRepository.count_unread(users[0]), 0)
+
+        with patch.object(
+            Notification.objects,
+            "bulk_create",
+            wraps=Notification.objects.bulk_create,
+        ) as mock_bulk_create:
+            created = send_notifications(user_ids, "message")
+
+        self.assertEqual(created, 5)
+        # The cached unread count of the user is kept in sync
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationRepository.count_unread(users[0]), 1)
+        self.assertEqual(
+            [len(call.args[0]) for call in mock_bulk_create.call_args_list], [2, 2, 1]
+        )
+        self.assertEqual(Notification.objects.count(), 5)
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    @patch("userportal.tasks.NotificationPublisher.publish_to_users")
+    def test_send_notifications_pushes_each_batch(self, mock_publish):
+        users = UserFactory.create_batch(3)
+
+        send_notifications([user.id for user in users], "message", "/link/", "link")
+
+        self.assertEqual(
+            [call.args for call in mock_publish.call_args_list],
+            [
+                ([users[0].id, users[1].id], "message", "/link/", "link"),
+                ([users[2].id], "message", "/link/", "link"),
+            ],
+        )
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_send_notifications_failed_batch(self):
+        users = UserFactory.create_batch(5)
+        original_bulk_create = Notification.objects.bulk_create
+
+        def bulk_create(notifications):
+            if notifications[0].user_id == users[2].id:
+                raise DatabaseError("failed")
+            return original_bulk_create(notifications)
+
+        with patch.object(Notification.objects, "bulk_create", side_effect=bulk_create):
+            with self.assertLogs("userportal.tasks", level="ERROR") as logs:
+                created = send_notifications([u.id for u in users], "message")
+
+        # The failed batch is reported, and the next batch is still sent
+        self.assertEqual(created, 3)
+        self.assertIn("batch 1 of 2 users", logs.output[0])
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_send_notifications_to_currently_enrolled_students(self):
+        current_term = AcademicTermFactory.create()
+        offering = CourseOfferingFactory.create(term=current_term)
+        EnrollmentFactory.create_batch(3, offering=offering)
+
+        with patch(
+            "userportal.tasks.NotificationPublisher.publish_to_offering"
+        ) as mock_publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                send_notifications_to_currently_enrolled_students(
+                    offering.course, "message", "/link/", "link"
+                )
+                # Nothing is pushed before the broadcast is committed
+                mock_publish.assert_not_called()
+
+        # A single broadcast is written instead of a row per student
+        self.assertFalse(Notification.objects.exists())
+        broadcast = BroadcastNotification.objects.get()
+        self.assertEqual(broadcast.offering, offering)
+        self.assertEqual(broadcast.message, "message")
+        # A single push reaches every student of the offering
+        mock_publish.assert_called_once_with(offering.id, "message", "/link/", "link")
+
+    @patch("userportal.tasks.mark_broadcast_notifications_as_read.delay")
+    def test_mark_broadcast_notifications_as_read(self, mock_delay):
+        enrollment = EnrollmentFactory.create()
+        user = enrollment.student.user
+        broadcast = NotificationRepository.create_broadcast(
+            enrollment.offering, "message", "/link/", "link"
+        )
+
+        mock_delay.side_effect = lambda user_id, broadcast_ids: (
+            mark_broadcast_notifications_as_read(user_id, broadcast_ids)
+        )
+        mark_broadcast_notifications_as_read.delay(user.id, [broadcast.id])
+
+        self.assertTrue(
+            BroadcastNotificationReceipt.objects.filter(
+                user=user, broadcast=broadcast
+            ).exists()
+        )
+
+    @override_settings(
+        STORAGES={
+            "default": {
+                "BACKEND": "django.core.files.storage.InMemoryStorage",
+            },
+        }
+    )
+    @patch("userportal.tasks.notify_students_of_new_materials.apply_async")
+    def test_material_notifications_are_merged(self, mock_apply_async):
+        offering = CourseOfferingFactory.create(term=AcademicTermFactory.create())
+        enrollment = EnrollmentFactory.create(offering=offering)
+        course = offering.course
+        MaterialFactory.create_batch(3, course=course)
+
+        # Materials added within the window are notified by a single task
+        for _ in range(3):
+            schedule_material_notification(course.id)
+        mock_apply_async.assert_called_once_with(
+            args=[course.id], countdown=settings.MATERIAL_NOTIFICATION_DIGEST_WINDOW
+        )
+
+        notify_students_of_new_materials(course.id)
+        notification = NotificationRepository.fetch(enrollment.student.user).get()
+        self.assertIn("3 new materials", notification["message"])
+        # The materials are not notified again
+        notify_students_of_new_materials(course.id)
+        self.assertEqual(BroadcastNotification.objects.count(), 1)
+
+        # The next material opens a new window
+        schedule_material_notification(course.id)
+        self.assertEqual(mock_apply_async.call_count, 2)
 
     @patch("userportal.tasks.notify_teacher_of_new_enrollment.delay")
     def test_notify_teacher_of_new_enrollment(self, mock_delay):
@@ -124,6 +294,111 @@ class SharedTaskTest(TestCase):
         self.assertIsNotNone(notification)
         self.assertIn("enrolled", notification.message)
 
+    def test_notify_tasks_are_idempotent(self):
+        offering = CourseOfferingFactory.create(term=AcademicTermFactory.create())
+        enrollment = EnrollmentFactory.create(offering=offering)
+        QASessionFactory.create(course=offering.course)
+        username = enrollment.student.user.username
+
+        # A retried or duplicated task does not notify twice
+        for _ in range(2):
+            notify_students_of_live_qa_start(offering.course.id)
+            notify_teacher_of_new_enrollment(
+                offering.course.id, offering.id, username, enrollment.id
+            )
+
+        self.assertEqual(BroadcastNotification.objects.count(), 1)
+        self.assertEqual(
+            Notification.objects.filter(user=offering.course.teacher.user).count(), 1
+        )
+
+        # Enrolling again after unenrolling is notified
+        student = enrollment.student
+        enrollment.delete()
+        enrollment = EnrollmentFactory.create(offering=offering, student=student)
+        notify_teacher_of_new_enrollment(
+            offering.course.id, offering.id, username, enrollment.id
+        )
+        self.assertEqual(
+            Notification.objects.filter(user=offering.course.teacher.user).count(), 2
+        )
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_send_notifications_retry_skips_notified_users(self):
+        users = UserFactory.create_batch(5)
+        user_ids = [user.id for user in users]
+        original_bulk_create = Notification.objects.bulk_create
+
+        def bulk_create(notifications):
+            if notifications[0].user_id == users[2].id:
+                raise DatabaseError("failed")
+            return original_bulk_create(notifications)
+
+        # With an event key, the failure is raised so that the task is retried
+        with patch.object(Notification.objects, "bulk_create", side_effect=bulk_create):
+            with self.assertLogs("userportal.tasks", level="ERROR"):
+                with self.assertRaises(DatabaseError):
+                    send_notifications(user_ids, "message", event_key="event")
+        self.assertEqual(Notification.objects.count(), 3)
+
+        # The retry only sends the failed batch
+        with patch.object(
+            Notification.objects,
+            "bulk_create",
+            wraps=Notification.objects.bulk_create,
+        ) as mock_bulk_create:
+            created = send_notifications(user_ids, "message", event_key="event")
+        self.assertEqual(created, 2)
+        self.assertEqual(mock_bulk_create.call_count, 1)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_flush_notification_reads(self):
+        notifications = NotificationFactory.create_batch(3, is_read=False)
+        enrollment = EnrollmentFactory.create()
+        user = enrollment.student.user
+        broadcast = NotificationRepository.create_broadcast(
+            enrollment.offering, "message", "/link/", "link"
+        )
+        notification_read_buffer.add(
+            notifications[0].user_id, [notifications[0].id], []
+        )
+        notification_read_buffer.add(
+            user.id, [n.id for n in notifications[1:]], [broadcast.id]
+        )
+
+        with patch.object(
+            NotificationRepository,
+            "mark_as_read",
+            wraps=NotificationRepository.mark_as_read,
+        ) as mock_mark_as_read:
+            flush_notification_reads()
+
+        # The personal notifications of every entry are updated in batches
+        self.assertEqual(
+            [len(call.args[0]) for call in mock_mark_as_read.call_args_list], [2, 1]
+        )
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+        self.assertTrue(
+            BroadcastNotificationReceipt.objects.filter(
+                user=user, broadcast=broadcast
+            ).exists()
+        )
+
+    @patch("userportal.tasks.flush_notification_reads.apply_async")
+    def test_schedule_notification_read_flush(self, mock_apply_async):
+        # Without a recent periodic flush, a single flush is scheduled
+        schedule_notification_read_flush()
+        schedule_notification_read_flush()
+        mock_apply_async.assert_called_once_with(
+            countdown=settings.NOTIFICATION_READ_FLUSH_INTERVAL
+        )
+        # Nothing is scheduled while the periodic task runs
+        cache.clear()
+        flush_notification_reads()
+        schedule_notification_read_flush()
+        mock_apply_async.assert_called_once()
+
     @patch("userportal.tasks.mark_notifications_as_read.delay")
     def test_mark_notifications_as_read(self, mock_delay):
         # Prepare test data
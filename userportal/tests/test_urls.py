@@ -159,6 +159,14 @@ class UserPortalAppUrlsTestCase(URLTestBase):
             "course-list", "/courses/", expected_class=CourseListView
         )
 
+    # /courses/suggestions/	userportal.views.course_views.course_suggestions	course-suggestions
+    def test_course_suggestions_url(self):
+        self.verifyURLConfiguration(
+            "course-suggestions",
+            "/courses/suggestions/",
+            expected_func_name="course_suggestions",
+        )
+
     # /courses/<int:pk>/	userportal.views.course_views.CourseDetailView	course-detail
     def test_course_detail_url(self):
         course_id = 1
@@ -278,6 +286,16 @@ class UserPortalAppUrlsTestCase(URLTestBase):
             kwargs={"course_id": course_id},
         )
 
+    # /courses/<int:course_id>/qa-session/questions/	userportal.views.qa_session_views.qa_session_questions	qa-session-questions
+    def test_qa_session_questions_url(self):
+        course_id = 1
+        self.verifyURLConfiguration(
+            "qa-session-questions",
+            f"/courses/{course_id}/qa-session/questions/",
+            expected_func_name="qa_session_questions",
+            kwargs={"course_id": course_id},
+        )
+
     # /courses/<int:course_id>/start-qa-session/	userportal.views.qa_session_views.start_qa_session	start-qa-session
     def test_start_qa_session_url(self):
         course_id = 1
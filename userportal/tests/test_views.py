@@ -1,10 +1,16 @@
-from django.test import TestCase
+from urllib.parse import quote
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
 
 from userportal.models import *
 from userportal.constants import *
+from userportal.buffers import notification_read_buffer
+from userportal.tests.mixins import TermTestMixin
 from userportal.tests.model_factories import *
 
 AuthUser = get_user_model()
@@ -198,6 +204,77 @@ class SignUpViewTestCase(BaseTestCase):
         self.assertFalse(AuthUser.objects.filter(username="new-student").exists())
 
 
+class CourseSuggestionsViewTestCase(BaseTestCase):
+    """Test cases for the course suggestions view."""
+
+    def test_course_suggestions(self):
+        response = self.client.get(reverse("course-suggestions"), {"q": "data sc"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "suggestions": [
+                    {
+                        "type": "course",
+                        "text": "Data Science",
+                        "course_id": self.course.id,
+                    }
+                ]
+            },
+        )
+        with self.assertNumQueries(0):
+            self.client.get(reverse("course-suggestions"), {"q": "data"})
+
+    def test_course_suggestions_follow_course_changes(self):
+        self.client.get(reverse("course-suggestions"), {"q": "data"})
+        CourseFactory.create(title="Database Systems", teacher=self.teacher_profile)
+        response = self.client.get(reverse("course-suggestions"), {"q": "data"})
+        self.assertEqual(
+            [suggestion["text"] for suggestion in response.json()["suggestions"]],
+            ["Data Science", "Database Systems"],
+        )
+
+
+class CourseDetailViewTestCase(BaseTestCase, TermTestMixin):
+    """Test cases for the course detail view."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.next_offering = CourseOfferingFactory.create(
+            course=cls.course,
+            term=cls.create_next_term(cls.offering.term),
+        )
+        cls.url = reverse("course-detail", args=[cls.course.id])
+
+    def test_course_detail_view_get_enrolled_student(self):
+        EnrollmentFactory.create(student=self.student_profile, offering=self.offering)
+        self.client.force_login(self.student_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["current_offering"], self.offering)
+        self.assertEqual(response.context["next_offering"], self.next_offering)
+        self.assertTrue(response.context["is_taking"])
+        self.assertTrue(response.context["show_enroll_button"])
+        self.assertIsNone(response.context["qa_session"])
+
+    def test_course_detail_view_get_instructor(self):
+        qa_session = QASessionFactory.create(course=self.course)
+        self.client.force_login(self.teacher_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["is_instructor"])
+        self.assertEqual(response.context["qa_session"], qa_session)
+        self.assertFalse(response.context["show_start_session_button"])
+
+    def test_course_detail_view_queries(self):
+        self.client.force_login(self.student_user)
+        self.client.get(self.url)
+        # Session, user, course with its relations and the offerings
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+
 class CourseOfferingListViewTestCase(BaseTestCase):
     """Test cases for the course offering list view."""
 
@@ -319,3 +396,100 @@ class QASessionViewTestCase(BaseTestCase):
         self.assertRedirects(
             response, reverse("login") + f"?next=/courses/{self.course.id}/qa-session/"
         )
+
+    @override_settings(LIVE_QA_HISTORY_PAGE_SIZE=2)
+    def test_qa_session_view_get_ended_paginated(self):
+        self.qa_session.status = QASession.Status.ENDED
+        self.qa_session.save()
+        now = timezone.now()
+        questions = [
+            QAQuestionFactory.create(
+                room_name=self.qa_session.room_name,
+                timestamp=now - timezone.timedelta(seconds=5 - i),
+            )
+            for i in range(5)
+        ]
+        self.client.force_login(self.teacher_user)
+
+        # The view renders the latest page only
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["questions"], questions[:2:-1])
+        next_cursor = response.context["next_cursor"]
+        self.assertIsNotNone(next_cursor)
+
+        # Older pages are served by the question list endpoint
+        questions_url = reverse("qa-session-questions", args=[self.course.id])
+        response = self.client.get(questions_url, {"cursor": next_cursor})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [q["message"] for q in data["questions"]],
+            [questions[2].text, questions[1].text],
+        )
+        response = self.client.get(questions_url, {"cursor": data["next_cursor"]})
+        data = response.json()
+        self.assertEqual([q["message"] for q in data["questions"]], [questions[0].text])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_qa_session_questions_not_enrolled_student(self):
+        self.client.force_login(self.student_user)
+        response = self.client.get(
+            reverse("qa-session-questions", args=[self.course.id])
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class NotificationListViewTestCase(BaseTestCase):
+    """Test cases for the notification list view."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        EnrollmentFactory.create(student=cls.student_profile, offering=cls.offering)
+        cls.notification = NotificationFactory.create(
+            user=cls.student_user, message="Personal notification"
+        )
+        cls.broadcast = BroadcastNotification.objects.create(
+            offering=cls.offering,
+            message="Broadcast notification",
+            link_path="/",
+            link_text="View",
+        )
+        cls.url = reverse("notification-list")
+
+    def setUp(self):
+        # The read marks are flushed by a Celery task
+        patcher = patch("userportal.views.main_views.schedule_notification_read_flush")
+        self.mock_schedule_flush = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_notification_list_view_get(self):
+        self.client.force_login(self.student_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Personal notification")
+        self.assertContains(response, "Broadcast notification")
+        # Both kinds of notification are logged to be marked as read,
+        # and a repeated view of the same page is logged once
+        self.client.get(self.url)
+        self.mock_schedule_flush.assert_called_once_with()
+        self.assertEqual(
+            notification_read_buffer.drain(),
+            [(self.student_user.id, [self.notification.id], [self.broadcast.id])],
+        )
+
+    def test_notification_list_view_keyset_pages(self):
+        NotificationFactory.create(user=self.student_user, message="Newest")
+        self.client.force_login(self.student_user)
+
+        response = self.client.get(self.url)
+        page_obj = response.context["page_obj"]
+        self.assertContains(response, "Newest")
+        self.assertTrue(page_obj.has_next())
+        self.assertContains(response, f"?after={quote(page_obj.next_cursor)}")
+
+        response = self.client.get(self.url, {"after": page_obj.next_cursor})
+        self.assertNotContains(response, "Newest")
+        self.assertEqual(len(response.context["notifications"]), 1)
+        self.assertTrue(response.context["page_obj"].has_previous())
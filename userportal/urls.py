@@ -56,6 +56,11 @@ urlpatterns = [
     ),
     # Course Views
     path("courses/", course_views.CourseListView.as_view(), name="course-list"),
+    path(
+        "courses/suggestions/",
+        course_views.course_suggestions,
+        name="course-suggestions",
+    ),
     path(
         "courses/<int:pk>/",
         course_views.CourseDetailView.as_view(),
@@ -126,4 +131,9 @@ urlpatterns = [
         qa_session_views.QASessionView.as_view(),
         name="qa-session",
     ),
+    path(
+        "courses/<int:course_id>/qa-session/questions/",
+        qa_session_views.qa_session_questions,
+        name="qa-session-questions",
+    ),
 ]
@@ -1,5 +1,12 @@
 import os
+import re
+import json
+import unicodedata
+import binascii
 from uuid import uuid4
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from django.utils import timezone
 from datetime import datetime
 
@@ -27,3 +34,81 @@ def generate_unique_room_name(course_id: int) -> str:
     timestamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
     unique_id = uuid4().hex[:8]
     return f"{course_id}_{timestamp}_{unique_id}"
+
+
+def encode_cursor(timestamp: datetime, pk: Optional[int] = None) -> str:
+    """Encode a (timestamp, id) position as an opaque, URL-safe cursor."""
+    raw = f"{timestamp.isoformat()}|{pk if pk is not None else ''}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, Optional[int]]]:
+    """
+    Decode a cursor created by encode_cursor.
+    Return None if the cursor is missing or malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, pk = raw.rsplit("|", 1)
+        timestamp = datetime.fromisoformat(timestamp)
+        if timezone.is_naive(timestamp):
+            return None
+        return timestamp, int(pk) if pk else None
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def build_question_event(
+    message_type: str,
+    message: str,
+    sender: str,
+    timestamp: datetime,
+    pk: Optional[int] = None,
+) -> dict:
+    """
+    Build a live Q&A group event. The frame sent to the clients is serialized
+    once here, and forwarded as is by every consumer of the group.
+    """
+    question = {
+        "type": message_type,
+        "message": message,
+        "sender": sender,
+        "timestamp": timestamp.isoformat(),
+        "cursor": encode_cursor(timestamp, pk),
+    }
+    return {**question, "frame": json.dumps(question)}
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most `size` items, without reading it all."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def normalize_search_text(value: str) -> str:
+    """Lowercase the text and strip its accents, so that searches ignore both."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def search_words(value: str) -> List[str]:
+    """Split the text into the normalized words it is searched by."""
+    return re.findall(r"\w+", normalize_search_text(value))
+
+
+def user_search_tokens(
+    username: str, first_name: str, last_name: str, title: str, email: str
+) -> Dict[str, Set[str]]:
+    """Get the words a user is searched by, per field: username, name and email."""
+    username = normalize_search_text(username)
+    email = normalize_search_text(email)
+    # The whole username and email are kept too, for prefixes such as "john.d"
+    tokens = {
+        "username": {username, *search_words(username)},
+        "name": set(search_words(f"{first_name} {last_name} {title or ''}")),
+        "email": {email, *search_words(email)},
+    }
+    return {field: {t[:150] for t in words if t} for field, words in tokens.items()}
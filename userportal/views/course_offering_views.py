@@ -91,14 +91,14 @@ class EnrollCourseView(UserPassesTestMixin, View):
         course = get_object_or_404(Course, pk=course_id)
         offering = get_object_or_404(CourseOffering, pk=offering_id)
 
-        _, created = Enrollment.objects.get_or_create(
+        enrollment, created = Enrollment.objects.get_or_create(
             student=request.user.student_profile, offering=offering
         )
         if created:
             messages.success(request, ENROLL_COURSE_SUCCESS_MSG)
             # Send a notification to the course teacher
             notify_teacher_of_new_enrollment.delay(
-                course.id, offering.id, request.user.username
+                course.id, offering.id, request.user.username, enrollment.id
             )
         else:
             messages.warning(request, ALREADY_ENROLLED_MSG)
@@ -2,15 +2,18 @@ from typing import Type
 
 from django.conf import settings
 from django.contrib import messages
+from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.contrib.auth import get_user_model
 from django.views.generic import ListView, DetailView
 from django.views.generic.edit import CreateView
 from django.contrib.auth.mixins import UserPassesTestMixin, LoginRequiredMixin
+from django.views.decorators.http import require_http_methods
 
 from userportal.forms import *
 from userportal.models import *
 from userportal.repositories import *
+from userportal.search import course_suggestion_index
 from userportal.views.mixins import QueryParamsMixin
 
 AuthUserType = Type[get_user_model()]
@@ -34,18 +37,33 @@ class CourseListView(QueryParamsMixin, ListView):
         return context
 
 
+@require_http_methods(["GET"])
+def course_suggestions(request):
+    """Suggest course titles and teacher names for the search being typed."""
+    return JsonResponse(
+        {"suggestions": course_suggestion_index.suggest(request.GET.get("q", ""))}
+    )
+
+
 class CourseDetailView(DetailView):
     """Detail view for a course."""
 
     model = Course
     template_name = "userportal/course_detail.html"
 
+    def get_queryset(self):
+        return CourseRepository.fetch_with_details()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         course = self.object
-        # Add course offering data
-        context.update(self.get_course_offerings_context(course))
+        # Add course offering data, with the student's enrollment status
+        current_offering, next_offering = (
+            CourseOfferingRepository.fetch_current_and_next(course, user)
+        )
+        context["current_offering"] = current_offering
+        context["next_offering"] = next_offering
         # Return early for anonymous users
         if user.is_anonymous:
             return context
@@ -54,36 +72,22 @@ class CourseDetailView(DetailView):
         context.update(self.get_qa_session_context(course))
         # Add request user's data
         if user.is_student():
-            context.update(self.get_student_context(user.student_profile, context))
+            context["is_taking"] = bool(
+                current_offering and current_offering.is_enrolled
+            )
+            context["show_enroll_button"] = not (
+                next_offering and next_offering.is_enrolled
+            )
         elif user.is_teacher():
-            context["is_instructor"] = user.teacher_profile == course.teacher
+            context["is_instructor"] = course.teacher.user_id == user.id
 
         return context
 
-    @staticmethod
-    def get_course_offerings_context(course: Course) -> dict:
-        """Get the current and next course offerings for the given course."""
-        return {
-            "next_offering": CourseOfferingRepository.fetch_next(course),
-            "current_offering": CourseOfferingRepository.fetch_current(course),
-        }
-
-    @staticmethod
-    def get_student_context(profile: StudentProfile, context: dict) -> dict:
-        """Get the student's enrollment status for the current and next course offerings."""
-        return {
-            "is_taking": EnrollmentRepository.is_enrolled(
-                profile, context["current_offering"]
-            ),
-            "show_enroll_button": not EnrollmentRepository.is_enrolled(
-                profile, context["next_offering"]
-            ),
-        }
-
     @staticmethod
     def get_qa_session_context(course: Course) -> dict:
         """Get the active or ended QA session for the course."""
-        qa_session = QASessionRepository.fetch(course)
+        # The session is fetched with the course, if there is one
+        qa_session = getattr(course, "qa_session", None)
         return {
             "qa_session": qa_session,
             "show_start_session_button": not qa_session or qa_session.is_ended(),
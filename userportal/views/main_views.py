@@ -8,7 +8,9 @@ from django.contrib.auth.decorators import login_required
 from userportal.models import *
 from userportal.forms import *
 from userportal.repositories import *
-from userportal.tasks import mark_notifications_as_read
+from userportal.buffers import notification_read_buffer
+from userportal.tasks import schedule_notification_read_flush
+from userportal.views.mixins import KeysetPaginationMixin
 
 
 def top(request: HttpRequest) -> HttpResponse:
@@ -58,7 +60,7 @@ def _handle_teacher_view(teacher: TeacherProfile) -> dict:
     }
 
 
-class NotificationListView(ListView):
+class NotificationListView(KeysetPaginationMixin, ListView):
     """List of notifications for the current user."""
 
     model = Notification
@@ -70,17 +72,33 @@ class NotificationListView(ListView):
     def get_queryset(self):
         return NotificationRepository.fetch(self.request.user)
 
+    def get_keyset_source(self, queryset):
+        # The union is rebuilt with the keyset filter of the page
+        user = self.request.user
+        return lambda keyset, newest_first: NotificationRepository.fetch(
+            user, keyset, newest_first
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Search for new notifications, and mark them as read asynchronously
+        # Search for new notifications, and mark them as read later
         page_obj = context.get("page_obj")
         if page_obj:
-            unread_notification_ids = [
-                notification.id
-                for notification in page_obj.object_list
-                if not notification.is_read
-            ]
-            if unread_notification_ids:
-                # Mark the notifications as read asynchronously
-                mark_notifications_as_read.delay(unread_notification_ids)
+            unread_notification_ids = {
+                NOTIFICATION_KIND_PERSONAL: [],
+                NOTIFICATION_KIND_BROADCAST: [],
+            }
+            for notification in page_obj.object_list:
+                if not notification["is_read"]:
+                    unread_notification_ids[notification["kind"]].append(
+                        notification["id"]
+                    )
+            # Log the notifications to be marked as read in bulk later.
+            # Repeated views of the same page are logged once
+            if any(unread_notification_ids.values()) and notification_read_buffer.add(
+                self.request.user.id,
+                unread_notification_ids[NOTIFICATION_KIND_PERSONAL],
+                unread_notification_ids[NOTIFICATION_KIND_BROADCAST],
+            ):
+                schedule_notification_read_flush()
         return context
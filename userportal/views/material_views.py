@@ -33,11 +33,12 @@ class CreateMaterialView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 
     def form_valid(self, form):
         try:
-            material = MaterialRepository.create(
+            MaterialRepository.create(
                 form.cleaned_data, self.course, self.request.FILES
             )
-            # Asynchronously send notifications to students enrolled in the course
-            notify_students_of_material_creation.delay(self.course.id, material.id)
+            # Notify students enrolled in the course, together with the
+            # other materials added shortly after
+            schedule_material_notification(self.course.id)
             messages.success(
                 self.request, CREATED_SUCCESS_MSG.format(entity="material")
             )
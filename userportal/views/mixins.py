@@ -1,3 +1,6 @@
+from userportal.paginators import KeysetPaginator
+
+
 class QueryParamsMixin:
     """Mixin to add query params to context"""
 
@@ -5,7 +8,25 @@ class QueryParamsMixin:
         """Add query params to context"""
         context = super().get_context_data(**kwargs)
         query_params = self.request.GET.copy()
-        if "page" in query_params:
-            del query_params["page"]
+        for param in ("page", "after", "before"):
+            if param in query_params:
+                del query_params[param]
         context["query_params"] = query_params.urlencode()
         return context
+
+
+class KeysetPaginationMixin:
+    """Mixin to paginate a list view with KeysetPaginator"""
+
+    def get_keyset_source(self, queryset):
+        """Get the source of the paginator, the queryset by default"""
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        """Get the page following the `after` cursor, or preceding the `before` cursor"""
+        paginator = KeysetPaginator(self.get_keyset_source(queryset), page_size)
+        page = paginator.page(
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
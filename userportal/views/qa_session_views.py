@@ -1,8 +1,12 @@
+from typing import List, Optional, Tuple
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
+from django.conf import settings
 from django.db import transaction
+from django.http import JsonResponse
 from django.contrib import messages
+from django.core.exceptions import PermissionDenied
 from django.views.generic import DetailView
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth.mixins import UserPassesTestMixin
@@ -13,6 +17,8 @@ from userportal.tasks import *
 from userportal.models import *
 from userportal.repositories import *
 from userportal.permissions import PermissionChecker
+from userportal.buffers import qa_question_buffer
+from userportal.utils import build_question_event, encode_cursor, decode_cursor
 
 
 @login_required(login_url="login")
@@ -83,13 +89,58 @@ class QASessionView(UserPassesTestMixin, DetailView):
         )
 
         if self.object.is_ended():
-            context["questions"] = QAQuestion.objects.filter(
-                room_name=self.object.room_name
+            # Only the latest questions are rendered, older ones are loaded on scroll
+            context["questions"], context["next_cursor"] = _fetch_question_page(
+                self.object.room_name
             )
 
         return context
 
 
+@login_required(login_url="login")
+@require_http_methods(["GET"])
+def qa_session_questions(request, course_id):
+    """List a page of questions of a QA session, newest first."""
+    course = get_object_or_404(Course, pk=course_id)
+    if not PermissionChecker.can_join_live_qa(request.user, course.id):
+        raise PermissionDenied
+    qa_session = get_object_or_404(QASession, course=course)
+    cursor = decode_cursor(request.GET.get("cursor"))
+    questions, next_cursor = _fetch_question_page(qa_session.room_name, cursor)
+    return JsonResponse(
+        {
+            "questions": [
+                {
+                    "message": question.text,
+                    "sender": question.sender,
+                    "timestamp": question.timestamp.isoformat(),
+                }
+                for question in questions
+            ],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+def _fetch_question_page(
+    room_name: str, cursor: Optional[Tuple[datetime, Optional[int]]] = None
+) -> Tuple[List[QAQuestion], Optional[str]]:
+    """
+    Fetch a page of questions posted before the cursor, newest first,
+    and the cursor of the next page if there is one.
+    """
+    page_size = settings.LIVE_QA_HISTORY_PAGE_SIZE
+    questions = QAQuestionRepository.fetch_before(
+        room_name, cursor, limit=page_size + 1
+    )
+    if len(questions) <= page_size:
+        return questions, None
+    last_question = questions[page_size - 1]
+    return questions[:page_size], encode_cursor(
+        last_question.timestamp, last_question.id
+    )
+
+
 @login_required(login_url="login")
 @require_http_methods(["POST"])
 def end_qa_session(request, course_id):
@@ -106,7 +157,13 @@ def end_qa_session(request, course_id):
         messages.error(request, ERR_FAILED_TO_END_SESSION.format(exception=e))
         return redirect("qa-session", course_id=course.id)
 
+    # Save the questions posted right before the end of the session
+    qa_question_buffer.flush(close_comment.room_name)
     _send_close_message(close_comment)
+    # Move the questions out of the QAQuestion table once the session is quiet
+    archive_qa_questions.apply_async(
+        args=[close_comment.room_name], countdown=settings.LIVE_QA_ARCHIVE_DELAY
+    )
     messages.success(request, QA_SESSION_END_SUCCESS_MSG)
     return redirect("course-detail", pk=course.id)
 
@@ -126,10 +183,11 @@ def _send_close_message(close_comment: QAQuestion) -> None:
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
         f"{LIVE_QA_PREFIX}_{close_comment.room_name}",
-        {
-            "type": MESSAGE_TYPE_CLOSE,
-            "message": close_comment.text,
-            "sender": close_comment.sender,
-            "timestamp": close_comment.timestamp.isoformat(),
-        },
+        build_question_event(
+            MESSAGE_TYPE_CLOSE,
+            close_comment.text,
+            close_comment.sender,
+            close_comment.timestamp,
+            close_comment.id,
+        ),
     )